@@ -0,0 +1,763 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+from array import array
+from RedBlackTree import BLACK, RED, RedBlackTreeView
+
+# typecode of the index arrays, 32 bits are enough for 2 ** 31 - 1 nodes
+INDEX_TYPE = 'i'
+
+
+class ArrayNode(object):
+    # a node is only a view of one slot of the parallel arrays
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __str__(self):
+        return "<class ArrayNode ({}, {}, {}, {})>".format(self.key, self.value, self.get_color(), self.size_tree)
+    __repr__ = __str__
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayNode) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    @property
+    def key(self):
+        return self.tree.key_array[self.index]
+
+    @property
+    def value(self):
+        return self.tree.value_array[self.index]
+
+    @value.setter
+    def value(self, value):
+        if self.index:
+            self.tree.value_array[self.index] = value
+
+    @property
+    def color(self):
+        return self.tree.color_array[self.index]
+
+    @property
+    def size_tree(self):
+        return self.tree.size_array[self.index]
+
+    @property
+    def parent(self):
+        parent = self.tree.parent_array[self.index]
+        return ArrayNode(self.tree, parent) if parent else None
+
+    @property
+    def left_child(self):
+        return ArrayNode(self.tree, self.tree.left_array[self.index])
+
+    @property
+    def right_child(self):
+        return ArrayNode(self.tree, self.tree.right_array[self.index])
+
+    def get_color(self):
+        """
+        Return the color name of the node.
+
+        """
+        if self.color:
+            return "RED"
+        else:
+            return "BLACK"
+
+    def show_info(self):
+        """
+        Print all information of the node.
+
+        """
+        if self.index and not self.parent:
+            print("######### ROOT #########")
+        print("------------------------")
+        print("key: %s" % self.key)
+        print("value: %s" % self.value)
+        print("color: %s" % self.get_color())
+        if self.index:
+            print("left_child: %s" % self.left_child.key)
+            print("right_child: %s" % self.right_child.key)
+            print("parent: %s" % self.parent.key if self.parent else "parent: None")
+            print("size_tree: %s" % self.size_tree)
+        print("------------------------")
+
+    def get_info_in_tuple(self):
+        """
+        Return a tuple of basic information (key, value, color, size_tree).
+
+        """
+        return self.key, self.value, self.get_color(), self.size_tree
+
+
+class ArrayRedBlackTree(object):
+    def __init__(self):
+        """
+        Red-black tree with the same interface as RedBlackTree, but stores the nodes as integer indices into parallel
+        arrays (struct of arrays) instead of one object per node. Slot 0 is the NIL sentinel.
+
+        """
+        self.key_array = [None]
+        self.value_array = [None]
+        self.left_array = array(INDEX_TYPE, [0])
+        self.right_array = array(INDEX_TYPE, [0])
+        self.parent_array = array(INDEX_TYPE, [0])
+        self.size_array = array(INDEX_TYPE, [0])
+        self.color_array = bytearray([BLACK])
+        self.free_slots = []
+        self.root_index = 0
+
+    def __str__(self):
+        return "<class ArrayRedBlackTree of size {}>".format(self.size)
+    __repr__ = __str__
+
+    def __iter__(self):
+        """
+        Iterate over all nodes in ascending order of keys.
+
+        """
+        return self.__walk(reverse=False)
+
+    def __reversed__(self):
+        """
+        Iterate over all nodes in descending order of keys.
+
+        """
+        return self.__walk(reverse=True)
+
+    def keys(self):
+        """
+        Return a view of all keys in ascending order.
+
+        """
+        return RedBlackTreeView(self, 'keys')
+
+    def values(self):
+        """
+        Return a view of all values in ascending order of keys.
+
+        """
+        return RedBlackTreeView(self, 'values')
+
+    def items(self):
+        """
+        Return a view of all (key, value) pairs in ascending order of keys.
+
+        """
+        return RedBlackTreeView(self, 'items')
+
+    def __getitem__(self, item):
+        """
+        Make class as a list, return the node with ith smallest key.
+        Args:
+            item: index of the list
+
+        """
+        return self.select(item)
+
+    @property
+    def root(self):
+        """
+        Return the root node.
+
+        """
+        return ArrayNode(self, self.root_index)
+
+    @property
+    def size(self):
+        """
+        Return the size of the tree.
+
+        """
+        return self.size_array[self.root_index]
+
+    def __walk(self, reverse=False, lo=None, hi=None, inclusive=(True, True)):
+        """
+        Stack based in-order walk between the bounds, see RedBlackTreeIterator.
+
+        """
+        key_array = self.key_array
+        first_array, second_array = (self.right_array, self.left_array) if reverse else \
+            (self.left_array, self.right_array)
+
+        def before_start(key):
+            if reverse:
+                return hi is not None and (key > hi or (key == hi and not inclusive[1]))
+            return lo is not None and (key < lo or (key == lo and not inclusive[0]))
+
+        def past_end(key):
+            if reverse:
+                return lo is not None and (key < lo or (key == lo and not inclusive[0]))
+            return hi is not None and (key > hi or (key == hi and not inclusive[1]))
+
+        stack = []
+        index = self.root_index
+        while True:
+            while index:
+                if before_start(key_array[index]):
+                    index = second_array[index]
+                else:
+                    stack.append(index)
+                    index = first_array[index]
+
+            if not stack:
+                return
+            index = stack.pop()
+            if past_end(key_array[index]):
+                return
+            yield ArrayNode(self, index)
+            index = second_array[index]
+
+    def __alloc(self, key, value, color):
+        """
+        Allocate a slot for a new node, reusing freed slots first.
+
+        Returns:
+            index: index of the new node
+
+        """
+        if self.free_slots:
+            index = self.free_slots.pop()
+            self.key_array[index] = key
+            self.value_array[index] = value
+            self.left_array[index] = 0
+            self.right_array[index] = 0
+            self.parent_array[index] = 0
+            self.size_array[index] = 1
+            self.color_array[index] = color
+        else:
+            index = len(self.key_array)
+            self.key_array.append(key)
+            self.value_array.append(value)
+            self.left_array.append(0)
+            self.right_array.append(0)
+            self.parent_array.append(0)
+            self.size_array.append(1)
+            self.color_array.append(color)
+
+        return index
+
+    def __free(self, index):
+        """
+        Release the slot of a deleted node.
+
+        """
+        self.key_array[index] = None
+        self.value_array[index] = None
+        self.free_slots.append(index)
+
+    def __search(self, key, print_path=False):
+        """
+        Search for a certain key.
+
+        Returns:
+            index: index of the node, 0 if it doesn't exist
+
+        """
+        index = self.root_index
+        key_array = self.key_array
+        while index:
+            node_key = key_array[index]
+            if node_key == key:
+                break
+            next_index = self.left_array[index] if key <= node_key else self.right_array[index]
+            if print_path:
+                root_string = "(root)" if not self.parent_array[index] else ""
+                print(root_string + "({}, {}, {}) -> ({}, {}, {})".format(
+                    node_key, self.value_array[index], ArrayNode(self, index).get_color(),
+                    key_array[next_index], self.value_array[next_index], ArrayNode(self, next_index).get_color()))
+            index = next_index
+
+        return index
+
+    def __min(self, index):
+        while self.left_array[index]:
+            index = self.left_array[index]
+        return index
+
+    def __max(self, index):
+        while self.right_array[index]:
+            index = self.right_array[index]
+        return index
+
+    def __rotation(self, index, right_rotation=False):
+        """
+        Rotate around a certain node.
+        Args:
+            index: index of the node to be rotated
+            right_rotation: True for right rotation, False for left rotation
+
+        """
+        left_array, right_array, parent_array = self.left_array, self.right_array, self.parent_array
+        if right_rotation:
+            left_array, right_array = right_array, left_array
+
+        # written as a left rotation, the arrays are swapped for a right rotation
+        parent = parent_array[index]
+        neighbor = right_array[index]
+        if parent:
+            if self.left_array[parent] == index:
+                self.left_array[parent] = neighbor
+            else:
+                self.right_array[parent] = neighbor
+        else:
+            self.root_index = neighbor
+
+        inner = left_array[neighbor]
+        right_array[index] = inner
+        if inner:
+            parent_array[inner] = index
+        parent_array[index] = neighbor
+        parent_array[neighbor] = parent
+        left_array[neighbor] = index
+
+        size_array = self.size_array
+        size_array[neighbor] = size_array[index]
+        size_array[index] = size_array[self.left_array[index]] + size_array[self.right_array[index]] + 1
+
+    def __fix_double_reds(self, index):
+        """
+        Method to fix the problem of double reds.
+        Args:
+            index: index of the underlying red node, i.e. its parent is also red
+
+        """
+        color_array, parent_array, left_array = self.color_array, self.parent_array, self.left_array
+        while True:
+            parent = parent_array[index]
+            grand_parent = parent_array[parent]
+            parent_is_left = left_array[grand_parent] == parent
+            uncle = self.right_array[grand_parent] if parent_is_left else left_array[grand_parent]
+
+            # Case 3.1: uncle node is RED
+            if color_array[uncle] == RED:
+                color_array[parent] = BLACK
+                color_array[uncle] = BLACK
+                color_array[grand_parent] = RED
+                if not parent_array[grand_parent]:
+                    color_array[grand_parent] = BLACK
+                    return
+                if color_array[parent_array[grand_parent]] != RED:
+                    return
+                index = grand_parent
+
+            # Case 3.2: uncle node is BLACK
+            else:
+                # Case 3.2.1: need first a local rotation
+                if (left_array[parent] == index) != parent_is_left:
+                    self.__rotation(parent, right_rotation=not parent_is_left)
+                    parent = index
+
+                # Case 3.2.2: no need for a local rotation
+                self.__rotation(grand_parent, right_rotation=parent_is_left)
+                color_array[parent] = BLACK
+                color_array[grand_parent] = RED
+                return
+
+    def __delete_check(self, index, parent):
+        """
+        Method to check the problem during deletion.
+        Args:
+            index: index of the problem node (maybe 0)
+            parent: index of its parent
+
+        """
+        color_array, left_array, right_array = self.color_array, self.left_array, self.right_array
+        while parent and color_array[index] == BLACK:
+            node_is_left = left_array[parent] == index
+            cousin = right_array[parent] if node_is_left else left_array[parent]
+
+            # Case 2: the cousin node is red
+            if color_array[cousin] == RED:
+                self.__rotation(parent, right_rotation=not node_is_left)
+                color_array[cousin] = BLACK
+                color_array[parent] = RED
+                continue
+
+            outer_child = right_array[cousin] if node_is_left else left_array[cousin]
+            inner_child = left_array[cousin] if node_is_left else right_array[cousin]
+
+            # Case 3: the cousin node is black, its outer child node is red
+            if color_array[outer_child] == RED:
+                self.__rotation(parent, right_rotation=not node_is_left)
+                color_array[outer_child] = BLACK
+                color_array[cousin] = color_array[parent]
+                color_array[parent] = BLACK
+                return
+
+            # Case 4: the cousin node is black, its inner child node is red
+            elif color_array[inner_child] == RED:
+                self.__rotation(cousin, right_rotation=node_is_left)
+                color_array[inner_child] = BLACK
+                color_array[cousin] = RED
+
+            # Case 5: the cousin node and its children nodes are black, the parent node is red
+            elif color_array[parent] == RED:
+                color_array[parent] = BLACK
+                color_array[cousin] = RED
+                return
+
+            # Case 6: the cousin node and its children nodes are black, the parent node is also black
+            else:
+                color_array[cousin] = RED
+                index = parent
+                parent = self.parent_array[parent]
+
+        if index:
+            color_array[index] = BLACK
+
+    def __update_size_tree(self, index, delta):
+        """
+        Add delta to size_tree of all nodes along the path from the node to the root.
+
+        """
+        size_array, parent_array = self.size_array, self.parent_array
+        while index:
+            size_array[index] += delta
+            index = parent_array[index]
+
+    def __transplant(self, old_index, new_index):
+        """
+        Replace the subtree rooted at old_index by the subtree rooted at new_index.
+
+        """
+        parent = self.parent_array[old_index]
+        if not parent:
+            self.root_index = new_index
+        elif self.left_array[parent] == old_index:
+            self.left_array[parent] = new_index
+        else:
+            self.right_array[parent] = new_index
+
+        if new_index:
+            self.parent_array[new_index] = parent
+
+    def __check_node(self, index):
+        """
+        Check whether a node exists.
+
+        """
+        if not index:
+            raise IndexError("Node doesn't exist!")
+
+    def check_balance(self, output_information=True):
+        """
+        Check whether the tree is balance, i.e. all paths have the same number of black nodes along the path.
+
+        """
+        num_black_nodes_ref = None
+        stack = [(self.root_index, 0)]
+        while stack:
+            index, num_black_nodes = stack.pop()
+            if not index:
+                if num_black_nodes_ref is None:
+                    num_black_nodes_ref = num_black_nodes
+                elif num_black_nodes != num_black_nodes_ref:
+                    raise ValueError("The tree is not balance!")
+                continue
+            num_black_nodes += self.color_array[index] == BLACK
+            stack.append((self.left_array[index], num_black_nodes))
+            stack.append((self.right_array[index], num_black_nodes))
+
+        if output_information:
+            print("Balance test success!")
+
+    def check_color(self, output_information=True):
+        """
+        Check whether the color of the tree is correct, including root check and check of double reds.
+
+        """
+        if self.color_array[self.root_index] != BLACK:
+            raise ValueError("The root is not black!")
+
+        stack = [self.root_index]
+        while stack:
+            index = stack.pop()
+            if not index:
+                continue
+            if self.color_array[index] == RED and self.color_array[self.parent_array[index]] == RED:
+                raise ValueError("The tree has double red!")
+            stack.append(self.left_array[index])
+            stack.append(self.right_array[index])
+
+        if output_information:
+            print("Color test success!")
+
+    def check_all(self, output_information=True):
+        """
+        Check balance and the color of the tree.
+        Args:
+            output_information: True for printing the success message, and vice versa
+
+        """
+        self.check_balance(output_information)
+        self.check_color(output_information)
+
+    def get_node(self, key, print_path=False):
+        """
+        Get the node with the given key.
+        Args:
+            key: the key of the node
+            print_path: True for printing the searching path, and vice versa
+
+        Returns:
+            search_node: class ArrayNode
+
+        """
+        index = self.__search(key, print_path=print_path)
+        self.__check_node(index)
+
+        return ArrayNode(self, index)
+
+    def search(self, key, print_path=False):
+        """
+        Search for a certain key. Print the information of the node.
+        Args:
+            key: the key of the node to be searched
+            print_path: True for printing the searching path, and vice versa
+
+        """
+        index = self.__search(key, print_path=print_path)
+        if not index:
+            print("Node doesn't exist!")
+        else:
+            node = ArrayNode(self, index)
+            print("ID: {}\nValue: {}\nColor: {}".format(node.key, node.value, node.get_color()))
+
+    def select(self, index):
+        """
+        Select a certain index of node in an ascending order, i.e. return the node with the ith smallest key.
+        Args:
+            index: ith smallest key
+
+        Returns:
+            check_node: the result of selection, class ArrayNode
+
+        """
+        if index > self.size or index <= 0:
+            raise IndexError("The index is out of range!")
+
+        check_index = self.root_index
+        while True:
+            size_left_tree = self.size_array[self.left_array[check_index]]
+            if size_left_tree == index - 1:
+                break
+            elif size_left_tree >= index:
+                check_index = self.left_array[check_index]
+            else:
+                index -= size_left_tree + 1
+                check_index = self.right_array[check_index]
+
+        return ArrayNode(self, check_index)
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Lazily iterate over the nodes with lo <= key < hi (bounds adjustable by inclusive). O(log n + k).
+
+        Returns:
+            iterator of ArrayNode
+
+        """
+        return self.__walk(reverse=reverse, lo=lo, hi=hi, inclusive=inclusive)
+
+    def __count_less(self, key, inclusive=False):
+        """
+        Count the keys smaller than the given key with the help of size_tree. O(log n).
+
+        """
+        count = 0
+        index = self.root_index
+        while index:
+            node_key = self.key_array[index]
+            if node_key < key or (inclusive and node_key == key):
+                count += self.size_array[self.left_array[index]] + 1
+                index = self.right_array[index]
+            else:
+                index = self.left_array[index]
+
+        return count
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key.
+
+        """
+        return self.__count_less(key)
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Count the keys with lo <= key < hi (bounds adjustable by inclusive) in O(log n).
+
+        """
+        count_hi = self.size if hi is None else self.__count_less(hi, inclusive=inclusive[1])
+        count_lo = 0 if lo is None else self.__count_less(lo, inclusive=not inclusive[0])
+
+        return max(count_hi - count_lo, 0)
+
+    def get_predecessor(self, key):
+        """
+        Get the predecessor the of given node.
+        Args:
+            key: the key of the node to be searched
+
+        Returns:
+            pred_node: predecessor of the node, class ArrayNode, with key None if there is no predecessor
+
+        """
+        index = self.__search(key)
+        self.__check_node(index)
+
+        if self.left_array[index]:
+            return ArrayNode(self, self.__max(self.left_array[index]))
+
+        parent = self.parent_array[index]
+        while parent and self.left_array[parent] == index:
+            index = parent
+            parent = self.parent_array[parent]
+
+        return ArrayNode(self, parent)
+
+    def get_successor(self, key):
+        """
+        Get the successor the of given node.
+        Args:
+            key: the key of the node to be searched
+
+        Returns:
+            succ_node: successor of the node, class ArrayNode, with key None if there is no successor
+
+        """
+        index = self.__search(key)
+        self.__check_node(index)
+
+        if self.right_array[index]:
+            return ArrayNode(self, self.__min(self.right_array[index]))
+
+        parent = self.parent_array[index]
+        while parent and self.right_array[parent] == index:
+            index = parent
+            parent = self.parent_array[parent]
+
+        return ArrayNode(self, parent)
+
+    def insert(self, key, value):
+        """
+        Insert a node with key and value.
+        Args:
+            key: key of the node to be inserted
+            value: value of the node to be inserted
+
+        """
+        parent = 0
+        index = self.root_index
+        key_array = self.key_array
+        while index:
+            parent = index
+            index = self.left_array[index] if key <= key_array[index] else self.right_array[index]
+
+        insert_index = self.__alloc(key, value, RED)
+
+        # Case 1: root node
+        if not parent:
+            self.root_index = insert_index
+            self.color_array[insert_index] = BLACK
+            return
+
+        self.parent_array[insert_index] = parent
+        if key <= key_array[parent]:
+            self.left_array[parent] = insert_index
+        else:
+            self.right_array[parent] = insert_index
+        self.__update_size_tree(parent, 1)
+
+        # Case 3: parent node is RED, solve the two-red problem
+        if self.color_array[parent] == RED:
+            self.__fix_double_reds(insert_index)
+
+    def delete(self, key):
+        """
+        Delete a node with the given key.
+        Args:
+            key: the key of the node to be deleted
+
+        """
+        index = self.__search(key)
+        self.__check_node(index)
+        left_array, right_array, parent_array = self.left_array, self.right_array, self.parent_array
+
+        # Case 1 and 2: the node has at most one child node, replace it by the child
+        if not left_array[index] or not right_array[index]:
+            removed_color = self.color_array[index]
+            child = left_array[index] or right_array[index]
+            parent = parent_array[index]
+            self.__update_size_tree(parent, -1)
+            self.__transplant(index, child)
+
+        # Case 3: the node has two children nodes, move its predecessor node into its place
+        else:
+            pred = self.__max(left_array[index])
+            removed_color = self.color_array[pred]
+            child = left_array[pred]
+            self.__update_size_tree(parent_array[pred], -1)
+
+            if parent_array[pred] == index:
+                parent = pred
+            else:
+                parent = parent_array[pred]
+                self.__transplant(pred, child)
+                left_array[pred] = left_array[index]
+                parent_array[left_array[pred]] = pred
+
+            self.__transplant(index, pred)
+            right_array[pred] = right_array[index]
+            parent_array[right_array[pred]] = pred
+            self.color_array[pred] = self.color_array[index]
+            self.size_array[pred] = self.size_array[index]
+
+        if removed_color == BLACK:
+            self.__delete_check(child, parent)
+
+        self.__free(index)
+
+    def str_single_path(self, node):
+        """
+        Return the information string of a certain path with the given end node.
+        Args:
+            node: the end node of the path, class ArrayNode
+
+        Returns:
+            path_str: path information
+
+        """
+        path = []
+        while node:
+            path.append(" -> " + str(node.get_info_in_tuple()))
+            node = node.parent
+
+        return "".join(reversed(path))
+
+    def show_paths(self):
+        """
+        Show all paths of the tree, from root to NULL leafs.
+
+        """
+        print("------------------------")
+        print("######### ALL PATHS #########")
+
+        if self.size == 0:
+            print("Empty tree!")
+        else:
+            for node in self:
+                if node.size_tree == 1:
+                    print("|" + self.str_single_path(node))
+
+        print("------------------------")
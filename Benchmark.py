@@ -0,0 +1,830 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import argparse
+import bisect
+import functools
+import gc
+import heapq
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from RedBlackTree import RedBlackTree
+from ArrayRedBlackTree import ArrayRedBlackTree
+from ConcurrentRedBlackTree import ConcurrentRedBlackTree
+from DurableRedBlackTree import DurableRedBlackTree
+from RedBlackTreeMap import RedBlackTreeMap
+from BoundedRedBlackTree import BoundedRedBlackTree
+
+try:
+    from sortedcontainers import SortedDict
+except ImportError:
+    SortedDict = None
+
+BACKENDS = [
+    ("RedBlackTree", RedBlackTree),
+    ("ArrayRedBlackTree", ArrayRedBlackTree),
+]
+
+SUITE_ORDERS = ["sequential", "random", "zipfian", "adversarial"]
+SUITE_OPERATIONS = ["insert", "get_node", "select", "predecessor", "successor", "range", "iterate", "delete"]
+# number of keys in every range scan of the suite
+RANGE_SPAN = 100
+
+
+def random_keys(size, seed=0):
+    """
+    Return a list of distinct random integer keys.
+
+    """
+    return random.Random(seed).sample(range(size * 10), size)
+
+
+def bytes_per_entry(tree_class, keys):
+    """
+    Measure the heap memory held by a tree filled with the given keys, divided by the number of keys.
+    The keys themselves are allocated before the measurement starts and are not counted.
+
+    """
+    tracemalloc.start()
+    tree = tree_class()
+    for key in keys:
+        tree.insert(key, None)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return current / len(keys)
+
+
+def benchmark_memory(args):
+    keys = random_keys(args.size, args.seed)
+    print("memory of {} random keys".format(args.size))
+    for name, tree_class in BACKENDS:
+        print("{:<20} {:>8.1f} bytes/entry".format(name, bytes_per_entry(tree_class, keys)))
+
+
+def benchmark_batch(args):
+    keys = random_keys(args.size + args.batch, args.seed)
+    if args.clustered:
+        # the keys of the batch are neighbours in the tree
+        keys.sort()
+        middle = args.size // 2
+        keys = keys[:middle] + keys[middle + args.batch:] + keys[middle:middle + args.batch]
+    base_items = [(key, None) for key in keys[:args.size]]
+    batch_items = [(key, None) for key in keys[args.size:]]
+    print("batch of {} {} keys into a tree of {} keys".format(args.batch, "clustered" if args.clustered else "random",
+                                                               args.size))
+
+    tree = RedBlackTree.build_from_sorted(sorted(base_items))
+    gc.collect()
+    start = time.perf_counter()
+    for key, value in batch_items:
+        tree.insert(key, value)
+    loop_insert = time.perf_counter() - start
+
+    tree = RedBlackTree.build_from_sorted(sorted(base_items))
+    gc.collect()
+    start = time.perf_counter()
+    tree.insert_many(batch_items)
+    batch_insert = time.perf_counter() - start
+
+    gc.collect()
+    start = time.perf_counter()
+    for key, _ in batch_items:
+        tree.delete(key)
+    loop_delete = time.perf_counter() - start
+
+    tree.insert_many(batch_items)
+    gc.collect()
+    start = time.perf_counter()
+    tree.delete_many([key for key, _ in batch_items])
+    batch_delete = time.perf_counter() - start
+
+    # new values for existing keys
+    update_items = [(key, 0) for key, _ in batch_items]
+    tree.insert_many(batch_items)
+    gc.collect()
+    start = time.perf_counter()
+    for key, value in update_items:
+        tree.get_node(key).value = value
+    loop_update = time.perf_counter() - start
+
+    gc.collect()
+    start = time.perf_counter()
+    tree.update(update_items)
+    batch_update = time.perf_counter() - start
+
+    for name, loop_time, batch_time in [("insert", loop_insert, batch_insert), ("delete", loop_delete, batch_delete),
+                                        ("update", loop_update, batch_update)]:
+        print("{:<8} loop {:>8.3f} s   batch {:>8.3f} s   speedup {:>5.2f}x".format(
+            name, loop_time, batch_time, loop_time / batch_time))
+
+
+class LockedRedBlackTree(object):
+    def __init__(self):
+        """
+        Baseline for the concurrent benchmark, a RedBlackTree behind one threading.Lock.
+
+        """
+        self.tree = RedBlackTree()
+        self.lock = threading.Lock()
+
+    def get_node(self, key):
+        with self.lock:
+            return self.tree.get_node(key)
+
+    def insert(self, key, value):
+        with self.lock:
+            self.tree.insert(key, value)
+
+    def delete(self, key):
+        with self.lock:
+            self.tree.delete(key)
+
+
+def read_throughput(tree, keys, num_threads, duration):
+    """
+    Run num_threads readers calling get_node and one writer calling insert/delete for duration seconds.
+
+    Returns:
+        reads per second of all readers together
+
+    """
+    stop = threading.Event()
+    counts = [0] * num_threads
+
+    def reader(position):
+        rnd = random.Random(position)
+        count = 0
+        while not stop.is_set():
+            for _ in range(100):
+                tree.get_node(keys[rnd.randrange(len(keys))])
+            count += 100
+        counts[position] = count
+
+    def writer():
+        key = -1
+        while not stop.is_set():
+            tree.insert(key, None)
+            tree.delete(key)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(num_threads)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return sum(counts) / duration
+
+
+def benchmark_concurrent(args):
+    keys = random_keys(args.size, args.seed)
+    modes = [
+        ("threading.Lock", LockedRedBlackTree),
+        ("readers-writer lock", lambda: ConcurrentRedBlackTree(fine_grained=False)),
+        ("fine grained", lambda: ConcurrentRedBlackTree()),
+    ]
+    print("reads/s of get_node with one concurrent writer, {} keys".format(args.size))
+    print("{:<20}".format("threads") + "".join("{:>12}".format(n) for n in args.threads))
+    for name, factory in modes:
+        tree = factory()
+        for key in keys:
+            tree.insert(key, None)
+        results = [read_throughput(tree, keys, n, args.duration) for n in args.threads]
+        print("{:<20}".format(name) + "".join("{:>12.0f}".format(result) for result in results))
+
+
+def benchmark_micro(args):
+    keys = random_keys(args.size, args.seed)
+    skewed_keys = list(range(args.size))
+    print("ns/op, {} keys".format(args.size))
+
+    def time_per_op(function, arguments):
+        gc.collect()
+        start = time.perf_counter()
+        for argument in arguments:
+            function(argument)
+        return (time.perf_counter() - start) / len(arguments) * 1e9
+
+    for order, order_keys in [("random", keys), ("ascending", skewed_keys)]:
+        tree = RedBlackTree()
+        results = [("insert", time_per_op(lambda key: tree.insert(key, None), order_keys)),
+                   ("get_node", time_per_op(tree.get_node, order_keys)),
+                   ("select", time_per_op(tree.select, range(1, args.size + 1))),
+                   ("delete", time_per_op(tree.delete, order_keys))]
+        print("{:<10}".format(order) + "".join("{:>10} {:>7.0f}".format(name, ns) for name, ns in results))
+
+
+def benchmark_durable(args):
+    keys = random_keys(args.size, args.seed)
+    modes = [("in-memory", None, None)] + [("fsync={} group={}".format(fsync, group), fsync, group)
+                                           for fsync in args.fsync for group in args.group]
+    print("inserts/s of {} random keys, snapshot every {}".format(args.size, args.snapshot_every))
+    for name, fsync, group in modes:
+        directory = tempfile.mkdtemp()
+        try:
+            if fsync is None:
+                tree = RedBlackTree()
+            else:
+                tree = DurableRedBlackTree(directory, fsync=fsync, group_commit=group,
+                                           snapshot_every=args.snapshot_every)
+            gc.collect()
+            start = time.perf_counter()
+            for key in keys:
+                tree.insert(key, None)
+            if fsync is not None:
+                tree.close()
+            duration = time.perf_counter() - start
+        finally:
+            shutil.rmtree(directory)
+        print("{:<26} {:>10.0f} inserts/s".format(name, args.size / duration))
+
+
+def benchmark_mapping(args):
+    keys = random_keys(args.size, args.seed)
+    lookups = random.Random(args.seed + 1).choices(keys, k=args.size)
+    modes = [("dict", dict), ("RedBlackTreeMap", RedBlackTreeMap),
+             ("RedBlackTreeMap index", lambda: RedBlackTreeMap(hash_index=True))]
+    print("{} random keys, set overwrites existing keys".format(args.size))
+    for name, factory in modes:
+        tracemalloc.start()
+        mapping = factory()
+        for key in keys:
+            mapping[key] = None
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results = []
+        for operation, function, arguments in [("set", mapping.__setitem__, keys),
+                                               ("get", mapping.__getitem__, lookups),
+                                               ("in", mapping.__contains__, lookups)]:
+            gc.collect()
+            start = time.perf_counter()
+            if operation == "set":
+                for key in arguments:
+                    function(key, None)
+            else:
+                for key in arguments:
+                    function(key)
+            results.append((operation, len(arguments) / (time.perf_counter() - start)))
+        print("{:<22} {:>7.1f} bytes/entry".format(name, memory / args.size) +
+              "".join("{:>6} {:>10.0f}/s".format(operation, ops) for operation, ops in results))
+
+
+def record_sort_key(record):
+    """
+    Sort key of the records of the keys benchmark, (name ignoring case, id), a typical costly extraction.
+
+    """
+    return record[1].casefold(), record[0]
+
+
+def record_cmp(record, other):
+    """
+    Comparison function of two records, by their record_sort_key.
+
+    """
+    key, other_key = record_sort_key(record), record_sort_key(other)
+    return (key > other_key) - (key < other_key)
+
+
+@functools.total_ordering
+class UncachedRecord(object):
+    __slots__ = ('record',)
+
+    def __init__(self, record):
+        """
+        Record deriving its sort key again at every comparison, like keys without a cached sort key.
+
+        """
+        self.record = record
+
+    def __eq__(self, other):
+        return record_sort_key(self.record) == record_sort_key(other.record)
+
+    def __lt__(self, other):
+        return record_sort_key(self.record) < record_sort_key(other.record)
+
+
+def benchmark_keys(args):
+    rnd = random.Random(args.seed)
+    ids = random_keys(args.size, args.seed)
+    records = [(record_id, "Name{:x}".format(rnd.getrandbits(32))) for record_id in ids]
+    print("ns/op, {} keys".format(args.size))
+
+    def time_per_op(function, arguments):
+        gc.collect()
+        start = time.perf_counter()
+        for argument in arguments:
+            function(argument)
+        return (time.perf_counter() - start) / len(arguments) * 1e9
+
+    modes = [("raw int keys", RedBlackTree, ids),
+             ("raw tuple keys", RedBlackTree, [record_sort_key(record) for record in records]),
+             ("key=", lambda: RedBlackTree(key=record_sort_key), records),
+             ("cmp=", lambda: RedBlackTree(cmp=record_cmp), records),
+             ("uncached records", RedBlackTree, [UncachedRecord(record) for record in records])]
+    for name, factory, keys in modes:
+        tree = factory()
+        results = [("insert", time_per_op(lambda key: tree.insert(key, None), keys)),
+                   ("get_node", time_per_op(tree.get_node, keys)),
+                   ("rank", time_per_op(tree.rank, keys)),
+                   ("delete", time_per_op(tree.delete, keys))]
+        print("{:<18}".format(name) + "".join("{:>10} {:>7.0f}".format(operation, ns) for operation, ns in results))
+
+
+def benchmark_parallel(args):
+    keys = random_keys(args.size, args.seed)
+    items = [(key, key) for key in keys]
+    print("{} random keys, {} cores".format(args.size, os.cpu_count()))
+
+    gc.collect()
+    start = time.perf_counter()
+    RedBlackTree.from_items(items)
+    serial = time.perf_counter() - start
+    print("{:<22} {:>8.2f} s".format("from_items", serial))
+
+    for workers in args.workers:
+        gc.collect()
+        start = time.perf_counter()
+        tree = RedBlackTree.parallel_build(items, workers=workers)
+        seconds = time.perf_counter() - start
+        assert tree.size == args.size
+        print("{:<22} {:>8.2f} s {:>6.2f}x".format("parallel_build {}".format(workers), seconds, serial / seconds))
+
+
+def benchmark_bounded(args):
+    keys = random_keys(args.size, args.seed)
+    print("inserts/s of {} random keys into a cache of {} keys".format(args.size, args.max_size))
+
+    def trimmed_insert(tree, key):
+        # the manual loop: find the smallest key and delete it by key
+        tree.insert(key, None)
+        if tree.size > args.max_size:
+            tree.delete(tree.select(1).key)
+
+    modes = [("select(1) + delete", RedBlackTree, trimmed_insert),
+             ("bounded min", lambda: BoundedRedBlackTree(args.max_size, 'min'), None),
+             ("bounded max", lambda: BoundedRedBlackTree(args.max_size, 'max'), None),
+             ("bounded lru", lambda: BoundedRedBlackTree(args.max_size, 'lru'), None),
+             ("bounded min ttl", lambda: BoundedRedBlackTree(args.max_size, 'min', ttl=1e-4), None)]
+    for name, factory, insert in modes:
+        tree = factory()
+        gc.collect()
+        start = time.perf_counter()
+        if insert is None:
+            for key in keys:
+                tree.insert(key, None)
+        else:
+            for key in keys:
+                insert(tree, key)
+        seconds = time.perf_counter() - start
+        print("{:<22} {:>10.0f}/s   size {}".format(name, args.size / seconds, tree.size))
+
+
+def benchmark_priority_queue(args):
+    keys = random_keys(args.size * 2, args.seed)
+    initial, pushed = keys[:args.size], keys[args.size:]
+    print("ns/op of a priority queue of {} keys, push + pop after a warm-up".format(args.size))
+
+    def time_per_op(function, arguments):
+        gc.collect()
+        start = time.perf_counter()
+        for argument in arguments:
+            function(argument)
+        return (time.perf_counter() - start) / len(arguments) * 1e9
+
+    heap = list(initial)
+    heapq.heapify(heap)
+    results = [("peek", time_per_op(lambda _: heap[0], pushed)),
+               ("push+pop min", time_per_op(lambda key: heapq.heapreplace(heap, key), pushed))]
+    print("{:<26}".format("heapq") + "".join("{:>14} {:>7.0f}".format(name, ns) for name, ns in results))
+
+    def select_pop(tree, index):
+        node = tree.select(index)
+        tree.delete(node.key)
+
+    def push_pop(tree, pop, key):
+        pop(tree)
+        tree.insert(key, None)
+
+    for name, peek, pop_min, pop_max in [
+            ("RedBlackTree select", lambda tree: tree.select(1), lambda tree: select_pop(tree, 1),
+             lambda tree: select_pop(tree, tree.size)),
+            ("RedBlackTree peek/pop", RedBlackTree.peek_min, RedBlackTree.pop_min, RedBlackTree.pop_max)]:
+        tree = RedBlackTree.from_items((key, None) for key in initial)
+        results = [("peek", time_per_op(lambda _: peek(tree), pushed)),
+                   ("push+pop min", time_per_op(lambda key: push_pop(tree, pop_min, key), pushed)),
+                   ("push+pop max", time_per_op(lambda key: push_pop(tree, pop_max, key), pushed))]
+        print("{:<26}".format(name) + "".join("{:>14} {:>7.0f}".format(name, ns) for name, ns in results))
+
+
+class TreeSubject(object):
+    def __init__(self):
+        """
+        Subject of the benchmark suite, a RedBlackTree. Every subject supports insert, delete, get, select,
+        predecessor, successor, range and iterate, or sets the unsupported ones to None.
+
+        """
+        self.tree = RedBlackTree()
+
+    def insert(self, key):
+        self.tree.insert(key, key)
+
+    def delete(self, key):
+        self.tree.delete(key)
+
+    def get(self, key):
+        return self.tree.get_node(key)
+
+    def select(self, index):
+        return self.tree.select(index + 1)
+
+    def predecessor(self, key):
+        return self.tree.get_predecessor(key)
+
+    def successor(self, key):
+        return self.tree.get_successor(key)
+
+    def range(self, lo, hi):
+        return sum(1 for _ in self.tree.range(lo, hi))
+
+    def iterate(self):
+        return sum(1 for _ in self.tree)
+
+
+class DictSubject(object):
+    select = predecessor = successor = range = None
+
+    def __init__(self):
+        """
+        Baseline of the benchmark suite, a dict. Unordered, so there is no select, predecessor, successor or range.
+
+        """
+        self.data = {}
+
+    def insert(self, key):
+        self.data[key] = key
+
+    def delete(self, key):
+        del self.data[key]
+
+    def get(self, key):
+        return self.data[key]
+
+    def iterate(self):
+        return sum(1 for _ in self.data)
+
+
+class BisectSubject(object):
+    def __init__(self):
+        """
+        Baseline of the benchmark suite, a sorted list of keys and a list of values kept in line with bisect.
+        Insert and delete are O(n) memmoves.
+
+        """
+        self.keys = []
+        self.values = []
+
+    def insert(self, key):
+        position = bisect.bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.values.insert(position, key)
+
+    def delete(self, key):
+        position = bisect.bisect_left(self.keys, key)
+        del self.keys[position]
+        del self.values[position]
+
+    def get(self, key):
+        return self.values[bisect.bisect_left(self.keys, key)]
+
+    def select(self, index):
+        return self.values[index]
+
+    def predecessor(self, key):
+        position = bisect.bisect_left(self.keys, key)
+        return self.keys[position - 1] if position else None
+
+    def successor(self, key):
+        position = bisect.bisect_right(self.keys, key)
+        return self.keys[position] if position < len(self.keys) else None
+
+    def range(self, lo, hi):
+        return sum(1 for _ in self.values[bisect.bisect_left(self.keys, lo):bisect.bisect_left(self.keys, hi)])
+
+    def iterate(self):
+        return sum(1 for _ in zip(self.keys, self.values))
+
+
+class SortedDictSubject(object):
+    def __init__(self):
+        """
+        Baseline of the benchmark suite, sortedcontainers.SortedDict, only if sortedcontainers is installed.
+
+        """
+        self.data = SortedDict()
+
+    def insert(self, key):
+        self.data[key] = key
+
+    def delete(self, key):
+        del self.data[key]
+
+    def get(self, key):
+        return self.data[key]
+
+    def select(self, index):
+        return self.data.peekitem(index)
+
+    def predecessor(self, key):
+        position = self.data.bisect_left(key)
+        return self.data.peekitem(position - 1) if position else None
+
+    def successor(self, key):
+        position = self.data.bisect_right(key)
+        return self.data.peekitem(position) if position < len(self.data) else None
+
+    def range(self, lo, hi):
+        return sum(1 for _ in self.data.irange(lo, hi, inclusive=(True, False)))
+
+    def iterate(self):
+        return sum(1 for _ in self.data.items())
+
+
+def suite_subjects():
+    """
+    Return the (name, factory) pairs of all subjects of the suite, sortedcontainers only if installed.
+
+    """
+    subjects = [("RedBlackTree", TreeSubject), ("dict", DictSubject), ("bisect", BisectSubject)]
+    if SortedDict is not None:
+        subjects.append(("SortedDict", SortedDictSubject))
+
+    return subjects
+
+
+def zipf_indices(size, count, rnd, exponent=1.1):
+    """
+    Draw count indices in [0, size) with P(i) proportional to 1 / (i + 1) ** exponent.
+
+    """
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, size + 1):
+        total += rank ** -exponent
+        cum_weights.append(total)
+
+    return rnd.choices(range(size), cum_weights=cum_weights, k=count)
+
+
+def suite_keys(order, size, seed):
+    """
+    Return the insertion order and the lookup order of the keys 0 .. size - 1 for one key order.
+    sequential: ascending. random: a random permutation. zipfian: random insertion, lookups skewed to a few hot keys.
+    adversarial: zigzag 0, size - 1, 1, size - 2, ... which alternates rebalancing on both spines of the tree.
+
+    Returns:
+        insert_keys: permutation of all keys
+        lookup_keys: size keys, with repetitions if zipfian
+
+    """
+    rnd = random.Random(seed)
+    if order == "sequential":
+        insert_keys = list(range(size))
+        return insert_keys, insert_keys
+    elif order == "adversarial":
+        insert_keys = [key for pair in zip(range(size), range(size - 1, -1, -1)) for key in pair][:size]
+        return insert_keys, insert_keys
+
+    insert_keys = rnd.sample(range(size), size)
+    if order == "random":
+        return insert_keys, rnd.sample(insert_keys, size)
+    hot_keys = rnd.sample(range(size), size)
+    return insert_keys, [hot_keys[index] for index in zipf_indices(size, size, rnd)]
+
+
+def measure_latencies(function, arguments):
+    """
+    Call the function with every argument and measure the latency of every call.
+
+    Returns:
+        result: dict of the number of ops, ops/s, p50 and p99 latency in ns, timer overhead included
+
+    """
+    latencies = []
+    append = latencies.append
+    clock = time.perf_counter_ns
+    gc.collect()
+    gc.disable()
+    try:
+        for argument in arguments:
+            start = clock()
+            function(argument)
+            append(clock() - start)
+    finally:
+        gc.enable()
+
+    latencies.sort()
+    ops = len(latencies)
+    return {"ops": ops, "ops_per_s": ops * 1e9 / max(sum(latencies), 1),
+            "p50_ns": latencies[ops // 2], "p99_ns": latencies[min(ops * 99 // 100, ops - 1)]}
+
+
+def run_subject(factory, order, size, seed):
+    """
+    Run all operations of the suite on one subject, one key order and one size.
+
+    Returns:
+        results: dict of operation name -> measure_latencies result, None for an unsupported operation
+
+    """
+    insert_keys, lookup_keys = suite_keys(order, size, seed)
+    rnd = random.Random(seed + 1)
+    subject = factory()
+    results = {"insert": measure_latencies(subject.insert, insert_keys),
+               "get_node": measure_latencies(subject.get, lookup_keys)}
+    for name, function, arguments in [
+            ("select", subject.select, [rnd.randrange(size) for _ in range(size)]),
+            ("predecessor", subject.predecessor, lookup_keys),
+            ("successor", subject.successor, lookup_keys),
+            ("range", lambda lo: subject.range(lo, lo + RANGE_SPAN), lookup_keys[:max(size // RANGE_SPAN, 1)])]:
+        results[name] = measure_latencies(function, arguments) if getattr(subject, name) else None
+
+    gc.collect()
+    start = time.perf_counter_ns()
+    subject.iterate()
+    duration = time.perf_counter_ns() - start
+    results["iterate"] = {"ops": size, "ops_per_s": size * 1e9 / max(duration, 1), "p50_ns": None, "p99_ns": None}
+
+    results["delete"] = measure_latencies(subject.delete, insert_keys)
+    return results
+
+
+def peak_memory(factory, size, seed):
+    """
+    Peak heap memory in bytes while inserting size random keys into a new subject.
+
+    """
+    insert_keys, _ = suite_keys("random", size, seed)
+    tracemalloc.start()
+    subject = factory()
+    for key in insert_keys:
+        subject.insert(key)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak
+
+
+def git_commit():
+    """
+    Return the commit hash of the benchmarked code, None outside of a git repository. Git runs in the directory of
+    this file, so the hash doesn't depend on where the benchmark is started.
+
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_suite(args):
+    subjects = [(name, factory) for name, factory in suite_subjects()
+                if args.subjects is None or name in args.subjects]
+    report = {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "seed": args.seed, "results": [], "memory": []}
+
+    for size in args.sizes:
+        for name, factory in subjects:
+            if not args.no_memory:
+                report["memory"].append({"subject": name, "size": size,
+                                         "peak_bytes": peak_memory(factory, size, args.seed)})
+            for order in args.orders:
+                for operation, result in run_subject(factory, order, size, args.seed).items():
+                    if result is not None:
+                        report["results"].append(dict(subject=name, order=order, size=size, operation=operation,
+                                                      **result))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+def benchmark_compare(args):
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+
+    def index(report):
+        return {(r["subject"], r["order"], r["size"], r["operation"]): r["ops_per_s"] for r in report["results"]}
+
+    old_results, new_results = index(old), index(new)
+    print("ops/s {} -> {}".format(old["commit"], new["commit"]))
+    for entry in sorted(set(old_results) & set(new_results), key=str):
+        print("{:<14} {:<12} {:>9} {:<12} {:>12.0f} {:>12.0f} {:>7.2f}x".format(
+            *entry, old_results[entry], new_results[entry], new_results[entry] / old_results[entry]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of RedBlackTree.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    memory_parser = subparsers.add_parser("memory", help="bytes per entry of every backend")
+    memory_parser.add_argument("--size", type=int, default=100000)
+    memory_parser.add_argument("--seed", type=int, default=0)
+    memory_parser.set_defaults(func=benchmark_memory)
+
+    batch_parser = subparsers.add_parser("batch", help="insert_many/delete_many/update against a loop")
+    batch_parser.add_argument("--size", type=int, default=100000)
+    batch_parser.add_argument("--batch", type=int, default=50000)
+    batch_parser.add_argument("--clustered", action="store_true", help="batch keys next to each other in the tree")
+    batch_parser.add_argument("--seed", type=int, default=0)
+    batch_parser.set_defaults(func=benchmark_batch)
+
+    concurrent_parser = subparsers.add_parser("concurrent", help="read throughput of ConcurrentRedBlackTree")
+    concurrent_parser.add_argument("--size", type=int, default=100000)
+    concurrent_parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    concurrent_parser.add_argument("--duration", type=float, default=2.0)
+    concurrent_parser.add_argument("--seed", type=int, default=0)
+    concurrent_parser.set_defaults(func=benchmark_concurrent)
+
+    micro_parser = subparsers.add_parser("micro", help="ns/op of insert, get_node, select and delete")
+    micro_parser.add_argument("--size", type=int, default=100000)
+    micro_parser.add_argument("--seed", type=int, default=0)
+    micro_parser.set_defaults(func=benchmark_micro)
+
+    durable_parser = subparsers.add_parser("durable", help="write throughput of DurableRedBlackTree")
+    durable_parser.add_argument("--size", type=int, default=20000)
+    durable_parser.add_argument("--fsync", nargs="+", default=["never", "interval", "always"])
+    durable_parser.add_argument("--group", type=int, nargs="+", default=[1, 100])
+    durable_parser.add_argument("--snapshot-every", type=int, default=100000)
+    durable_parser.add_argument("--seed", type=int, default=0)
+    durable_parser.set_defaults(func=benchmark_durable)
+
+    mapping_parser = subparsers.add_parser("mapping", help="RedBlackTreeMap with and without hash index against dict")
+    mapping_parser.add_argument("--size", type=int, default=100000)
+    mapping_parser.add_argument("--seed", type=int, default=0)
+    mapping_parser.set_defaults(func=benchmark_mapping)
+
+    keys_parser = subparsers.add_parser("keys", help="key functions and comparators against raw keys")
+    keys_parser.add_argument("--size", type=int, default=100000)
+    keys_parser.add_argument("--seed", type=int, default=0)
+    keys_parser.set_defaults(func=benchmark_keys)
+
+    parallel_parser = subparsers.add_parser("parallel", help="parallel_build with 1 to N workers against from_items")
+    parallel_parser.add_argument("--size", type=int, default=1000000)
+    parallel_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parallel_parser.add_argument("--seed", type=int, default=0)
+    parallel_parser.set_defaults(func=benchmark_parallel)
+
+    bounded_parser = subparsers.add_parser("bounded", help="BoundedRedBlackTree against a manual trim loop")
+    bounded_parser.add_argument("--size", type=int, default=200000)
+    bounded_parser.add_argument("--max-size", type=int, default=10000)
+    bounded_parser.add_argument("--seed", type=int, default=0)
+    bounded_parser.set_defaults(func=benchmark_bounded)
+
+    queue_parser = subparsers.add_parser("queue", help="peek_min/pop_min/pop_max against heapq")
+    queue_parser.add_argument("--size", type=int, default=100000)
+    queue_parser.add_argument("--seed", type=int, default=0)
+    queue_parser.set_defaults(func=benchmark_priority_queue)
+
+    suite_parser = subparsers.add_parser("suite", help="JSON report of all operations against dict/bisect baselines")
+    suite_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    suite_parser.add_argument("--orders", nargs="+", choices=SUITE_ORDERS, default=SUITE_ORDERS)
+    suite_parser.add_argument("--subjects", nargs="+", default=None,
+                              help="RedBlackTree, dict, bisect, SortedDict (default: all available)")
+    suite_parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory pass")
+    suite_parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.set_defaults(func=benchmark_suite)
+
+    compare_parser = subparsers.add_parser("compare", help="ops/s ratios of two suite JSON reports")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.set_defaults(func=benchmark_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from RedBlackTree import RedBlackTree
+
+EVICTION_POLICIES = ('min', 'max', 'lru')
+# the expiry heap is rebuilt once it holds this many times more entries than live deadlines
+EXPIRY_COMPACTION_FACTOR = 2
+
+
+class BoundedRedBlackTree(object):
+    def __init__(self, max_size, eviction='min', ttl=None, clock=time.monotonic):
+        """
+        Ordered cache on a RedBlackTree holding at most max_size distinct keys. A dict from every key to its node
+        (ordered by recency for 'lru') overwrites existing keys without a search and keeps the keys of the tree
+        distinct. The nodes to evict come from the index or the cached extremes of the tree (peek_min, peek_max),
+        the ones to expire from the index, and both are deleted with delete_node without a search.
+        Expired entries are swept lazily from a heap of deadlines at the start of every operation.
+        Args:
+            max_size: largest number of keys, the insert of one more key evicts one
+            eviction: 'min' for evicting the smallest key, 'max' for the largest key, 'lru' for the least
+                recently inserted or read key
+            ttl: default seconds an entry lives after its insert, None for no expiry
+            clock: function returning the current time in seconds
+
+        """
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError("The eviction policy must be one of {}!".format(EVICTION_POLICIES))
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1!")
+
+        self.max_size = max_size
+        self.eviction = eviction
+        self.ttl = ttl
+        self.clock = clock
+        # the index keeps the keys distinct, so the tree needs no lookup of its duplicate policy
+        self.tree = RedBlackTree()
+        self.index = OrderedDict() if eviction == 'lru' else {}
+        # the live deadline of every expiring key, and a heap of (deadline, sequence, key) with stale entries
+        self.deadlines = {}
+        self.expiry = []
+        self.sequence = itertools.count()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __str__(self):
+        return "<class BoundedRedBlackTree of size {} / {} ({})>".format(self.size, self.max_size, self.eviction)
+    __repr__ = __str__
+
+    def __sweep(self):
+        """
+        Delete the entries whose deadline has passed, O(log n) each.
+
+        """
+        expiry = self.expiry
+        if not expiry:
+            return
+
+        now = self.clock()
+        while expiry and expiry[0][0] <= now:
+            deadline, _, key = heapq.heappop(expiry)
+            # a stale entry of a key that was deleted, or inserted again with a new deadline
+            if self.deadlines.get(key) == deadline:
+                self.__remove(key)
+                self.expirations += 1
+
+        if len(expiry) > EXPIRY_COMPACTION_FACTOR * len(self.deadlines) + 16:
+            self.expiry = [(deadline, next(self.sequence), key) for key, deadline in self.deadlines.items()]
+            heapq.heapify(self.expiry)
+
+    def __remove(self, key):
+        """
+        Delete the node of an existing key from the tree and the indices without searching it.
+
+        Returns:
+            (key, value): the deleted entry
+
+        """
+        node = self.index.pop(key)
+        if self.deadlines:
+            self.deadlines.pop(key, None)
+        entry = node.key, node.value
+        self.tree.delete_node(node)
+
+        return entry
+
+    def __evict(self):
+        """
+        Delete the entry chosen by the eviction policy.
+
+        Returns:
+            (key, value): the evicted entry
+
+        """
+        if self.eviction == 'lru':
+            key = next(iter(self.index))
+        elif self.eviction == 'min':
+            key = self.tree.peek_min().key
+        else:
+            key = self.tree.peek_max().key
+        self.evictions += 1
+
+        return self.__remove(key)
+
+    def insert(self, key, value, ttl=None):
+        """
+        Insert a key with a value, or overwrite the value of an existing key, and evict an entry if the tree is full.
+        Args:
+            key: the key
+            value: the value
+            ttl: seconds until the entry expires, None for the default ttl of the tree
+
+        Returns:
+            evicted: list of the evicted (key, value) pairs, the new entry itself for a full tree with the
+                policy 'min' (or 'max') and a key smaller (or larger) than all others
+
+        """
+        self.__sweep()
+        node = self.index.get(key)
+        if node is not None:
+            node.value = value
+            if self.eviction == 'lru':
+                self.index.move_to_end(key)
+        else:
+            self.index[key] = self.tree.insert(key, value)
+
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None:
+            if self.deadlines:
+                self.deadlines.pop(key, None)
+        else:
+            deadline = self.clock() + ttl
+            self.deadlines[key] = deadline
+            heapq.heappush(self.expiry, (deadline, next(self.sequence), key))
+
+        evicted = []
+        while len(self.index) > self.max_size:
+            evicted.append(self.__evict())
+
+        return evicted
+
+    def delete(self, key):
+        """
+        Delete a key. Raises IndexError if it doesn't exist.
+
+        Returns:
+            value: the value of the key
+
+        """
+        self.__sweep()
+        if key not in self.index:
+            raise IndexError("Node doesn't exist!")
+
+        return self.__remove(key)[1]
+
+    def expire(self):
+        """
+        Sweep the expired entries now instead of at the next operation.
+
+        Returns:
+            count: number of entries expired so far
+
+        """
+        self.__sweep()
+        return self.expirations
+
+    def get(self, key, default=None):
+        """
+        Return the value of a key in O(1), or the default if it doesn't exist or has expired. A read counts as a use
+        for 'lru'.
+
+        """
+        self.__sweep()
+        node = self.index.get(key)
+        if node is None:
+            return default
+        if self.eviction == 'lru':
+            self.index.move_to_end(key)
+
+        return node.value
+
+    def __contains__(self, key):
+        self.__sweep()
+        return key in self.index
+
+    def __len__(self):
+        self.__sweep()
+        return len(self.index)
+
+    @property
+    def size(self):
+        """
+        Return the number of live entries.
+
+        """
+        return len(self)
+
+    def __iter__(self):
+        self.__sweep()
+        return iter(self.tree)
+
+    def __reversed__(self):
+        self.__sweep()
+        return reversed(self.tree)
+
+    def keys(self):
+        self.__sweep()
+        return self.tree.keys()
+
+    def values(self):
+        self.__sweep()
+        return self.tree.values()
+
+    def items(self):
+        self.__sweep()
+        return self.tree.items()
+
+    def get_node(self, key):
+        """
+        Get the node with the given key, without counting as a use for 'lru'.
+
+        """
+        self.__sweep()
+        node = self.index.get(key)
+        if node is None:
+            raise IndexError("Node doesn't exist!")
+
+        return node
+
+    def select(self, index):
+        """
+        Return the node with the ith smallest key.
+
+        """
+        self.__sweep()
+        return self.tree.select(index)
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Lazily iterate over the nodes with lo <= key < hi (bounds adjustable by inclusive).
+
+        """
+        self.__sweep()
+        return self.tree.range(lo, hi, inclusive=inclusive, reverse=reverse)
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key.
+
+        """
+        self.__sweep()
+        return self.tree.rank(key)
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Count the keys with lo <= key < hi (bounds adjustable by inclusive).
+
+        """
+        self.__sweep()
+        return self.tree.count_range(lo, hi, inclusive=inclusive)
@@ -0,0 +1,239 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import threading
+from contextlib import contextmanager
+from RedBlackTree import RedBlackTree, NodeRBT
+from PersistentRedBlackTree import PersistentRedBlackTree
+
+
+class ReadWriteLock(object):
+    def __init__(self):
+        """
+        Readers-writer lock, any number of readers or one writer. Waiting writers block new readers, so that a
+        stream of readers can't starve the writers. Not reentrant.
+
+        """
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def detached_copy(node):
+    """
+    Copy the key, value, color and subtree size of a node without its links, so that later writes to the tree, which
+    reuse and reset the nodes, can't change it.
+
+    Returns:
+        copy: class NodeRBT
+
+    """
+    copy = NodeRBT(node.key, node.value, node.color)
+    copy.sort_key = node.sort_key
+    copy.size_tree = node.size_tree
+
+    return copy
+
+
+class ConcurrentRedBlackTree(object):
+    def __init__(self, fine_grained=True):
+        """
+        Thread-safe red-black tree. Writers are always serialized.
+        Args:
+            fine_grained: True for a PersistentRedBlackTree, reads take the current version in O(1) without any
+                lock and never wait for a writer. False for a RedBlackTree behind a readers-writer lock, reads run in
+                parallel with each other but not with a write, and return detached copies of the nodes.
+
+        """
+        self.fine_grained = fine_grained
+        if fine_grained:
+            self.tree = PersistentRedBlackTree()
+            self.write_lock = threading.Lock()
+        else:
+            self.tree = RedBlackTree()
+            self.lock = ReadWriteLock()
+
+    def __str__(self):
+        return "<class ConcurrentRedBlackTree of size {}>".format(self.size)
+    __repr__ = __str__
+
+    @contextmanager
+    def __reading(self):
+        """
+        Context of a read, returns the tree to read from.
+
+        """
+        if self.fine_grained:
+            yield self.tree.snapshot()
+        else:
+            with self.lock.read_locked():
+                yield self.tree
+
+    @contextmanager
+    def __writing(self):
+        """
+        Context of a write, returns the tree to write to.
+
+        """
+        if self.fine_grained:
+            with self.write_lock:
+                yield self.tree
+        else:
+            with self.lock.write_locked():
+                yield self.tree
+
+    def __iter__(self):
+        """
+        Iterate over a consistent snapshot of all nodes in ascending order of keys. Copies all nodes into a list
+        under the read lock, unless fine grained.
+
+        """
+        with self.__reading() as tree:
+            return iter(tree) if self.fine_grained else iter([detached_copy(node) for node in tree])
+
+    @property
+    def size(self):
+        """
+        Return the size of the tree.
+
+        """
+        with self.__reading() as tree:
+            return tree.size
+
+    def __read_node(self, method, *args):
+        """
+        Call a read method returning a node, and copy the node before the read lock is released unless fine grained.
+
+        """
+        with self.__reading() as tree:
+            node = getattr(tree, method)(*args)
+            return node if self.fine_grained else detached_copy(node)
+
+    def snapshot(self):
+        """
+        Return a consistent read-only copy of the tree, O(1) if fine grained and O(n) otherwise.
+
+        Returns:
+            snapshot: class PersistentRedBlackTree if fine grained, else class RedBlackTree
+
+        """
+        with self.__reading() as tree:
+            if self.fine_grained:
+                return tree
+            return RedBlackTree.build_from_sorted(list(tree.items()))
+
+    def get_node(self, key):
+        """
+        Get the node with the given key.
+
+        """
+        return self.__read_node('get_node', key)
+
+    def select(self, index):
+        """
+        Return the node with the ith smallest key.
+
+        """
+        return self.__read_node('select', index)
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Return the (key, value) pairs with lo <= key < hi (bounds adjustable by inclusive) of one consistent version.
+
+        Returns:
+            items: list of (key, value) pairs
+
+        """
+        with self.__reading() as tree:
+            return [(node.key, node.value) for node in tree.range(lo, hi, inclusive=inclusive, reverse=reverse)]
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key.
+
+        """
+        with self.__reading() as tree:
+            return tree.rank(key)
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Count the keys with lo <= key < hi (bounds adjustable by inclusive).
+
+        """
+        with self.__reading() as tree:
+            return tree.count_range(lo, hi, inclusive=inclusive)
+
+    def get_predecessor(self, key):
+        """
+        Get the predecessor the of given node.
+
+        """
+        return self.__read_node('get_predecessor', key)
+
+    def get_successor(self, key):
+        """
+        Get the successor the of given node.
+
+        """
+        return self.__read_node('get_successor', key)
+
+    def insert(self, key, value):
+        """
+        Insert a node with key and value.
+
+        """
+        with self.__writing() as tree:
+            tree.insert(key, value)
+
+    def delete(self, key):
+        """
+        Delete a node with the given key.
+
+        """
+        with self.__writing() as tree:
+            tree.delete(key)
@@ -0,0 +1,367 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import os
+import pickle
+import struct
+import time
+import zlib
+from RedBlackTree import RedBlackTree
+
+# log record: length of the payload, crc32 of everything after it, log sequence number (lsn), operation, payload
+RECORD_HEADER = struct.Struct('<II')
+RECORD_BODY = struct.Struct('<QB')
+INSERT = 1
+DELETE = 2
+FSYNC_POLICIES = ('always', 'interval', 'never')
+# a snapshot holds all operations up to its lsn, a log segment the ones after the lsn in its name
+SNAPSHOT_NAME = 'snapshot-{:020d}.rbt'
+SEGMENT_NAME = 'wal-{:020d}.log'
+
+
+def sync_directory(directory):
+    """
+    fsync a directory, so that created, renamed and deleted files in it are durable.
+
+    """
+    if hasattr(os, 'O_DIRECTORY'):
+        descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+def list_files(directory, pattern):
+    """
+    Return the (lsn, path) pairs of the files in a directory named like SNAPSHOT_NAME or SEGMENT_NAME, sorted by lsn.
+
+    """
+    prefix, suffix = pattern.split('{:020d}')
+    files = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix) and name[len(prefix):-len(suffix)].isdigit():
+            files.append((int(name[len(prefix):-len(suffix)]), os.path.join(directory, name)))
+
+    return sorted(files)
+
+
+def read_records(path):
+    """
+    Read the valid records of a log segment, up to the first torn or corrupted one.
+
+    Returns:
+        records: list of (lsn, operation, payload)
+        valid_length: length of the valid part of the file
+
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    records = []
+    position = 0
+    while position + RECORD_HEADER.size + RECORD_BODY.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, position)
+        start = position + RECORD_HEADER.size
+        end = start + RECORD_BODY.size + length
+        if end > len(data) or zlib.crc32(data[start:end]) != crc:
+            break
+        lsn, operation = RECORD_BODY.unpack_from(data, start)
+        records.append((lsn, operation, data[start + RECORD_BODY.size:end]))
+        position = end
+
+    return records, position
+
+
+class DurableRedBlackTree(object):
+    def __init__(self, directory, fsync='always', group_commit=1, fsync_interval=1.0, snapshot_every=100000):
+        """
+        RedBlackTree whose inserts and deletes are appended to a write-ahead log in a directory. On opening, the
+        tree is rebuilt from the latest snapshot and the tail of the log after it. Not thread-safe.
+        Args:
+            directory: directory of the snapshots and log segments, created if missing
+            fsync: 'always' for an fsync at every commit, 'interval' for at most one every fsync_interval seconds,
+                'never' for leaving it to the operating system
+            group_commit: number of operations buffered before they are written to the log together,
+                the buffered ones are lost by a crash unless commit is called
+            fsync_interval: seconds between two fsyncs of the policy 'interval'
+            snapshot_every: number of logged operations after which a snapshot is taken and the log is truncated,
+                None for snapshots only by calling snapshot
+
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("The fsync policy must be one of {}!".format(FSYNC_POLICIES))
+        if group_commit < 1:
+            raise ValueError("group_commit must be at least 1!")
+
+        self.directory = directory
+        self.fsync = fsync
+        self.group_commit = group_commit
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.buffer = []
+        self.unsynced = False
+        self.last_fsync = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        self.__recover()
+
+    def __str__(self):
+        return "<class DurableRedBlackTree of size {} at lsn {}>".format(self.size, self.lsn)
+    __repr__ = __str__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __recover(self):
+        """
+        Load the latest snapshot, replay the log records after it and open the last log segment for appending.
+        A torn or corrupted record ends the log, it and everything after it are removed.
+
+        """
+        snapshots = list_files(self.directory, SNAPSHOT_NAME)
+        if snapshots:
+            self.snapshot_lsn, path = snapshots[-1]
+            self.tree = RedBlackTree.load(path)
+        else:
+            self.snapshot_lsn = 0
+            self.tree = RedBlackTree()
+        self.lsn = self.snapshot_lsn
+
+        segments = list_files(self.directory, SEGMENT_NAME)
+        for position, (_, path) in enumerate(segments):
+            records, valid_length = read_records(path)
+            for lsn, operation, payload in records:
+                if lsn > self.lsn:
+                    self.__apply(operation, payload)
+                    self.lsn = lsn
+
+            if valid_length < os.path.getsize(path):
+                with open(path, 'r+b') as file:
+                    file.truncate(valid_length)
+                    os.fsync(file.fileno())
+                for _, later_path in segments[position + 1:]:
+                    os.remove(later_path)
+                segments = segments[:position + 1]
+                break
+
+        self.operations_since_snapshot = self.lsn - self.snapshot_lsn
+        path = segments[-1][1] if segments else os.path.join(self.directory, SEGMENT_NAME.format(self.lsn))
+        self.log = open(path, 'ab')
+        sync_directory(self.directory)
+
+    def __apply(self, operation, payload):
+        """
+        Apply one logged operation to the tree.
+
+        """
+        if operation == INSERT:
+            self.tree.insert(*pickle.loads(payload))
+        elif operation == DELETE:
+            self.tree.delete(pickle.loads(payload))
+        else:
+            raise ValueError("Unknown log operation {}!".format(operation))
+
+    def __append(self, operation, payload):
+        """
+        Buffer one log record and write the group if it is full, without fsync. If the write fails, the record is
+        dropped again and the error is raised, so the caller can leave the tree unchanged.
+
+        """
+        body = RECORD_BODY.pack(self.lsn + 1, operation) + payload
+        self.buffer.append(RECORD_HEADER.pack(len(payload), zlib.crc32(body)) + body)
+        if len(self.buffer) >= self.group_commit:
+            try:
+                self.__write()
+            except BaseException:
+                self.buffer.pop()
+                raise
+        self.lsn += 1
+        self.operations_since_snapshot += 1
+
+    def __logged(self):
+        """
+        Finish an operation whose record is appended and applied: fsync according to the policy and take a
+        snapshot if one is due.
+
+        """
+        if not self.buffer:
+            self.commit()
+        if self.snapshot_every and self.operations_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def __write(self):
+        """
+        Write the buffered records to the log. A partly written group is cut off again, so the log keeps ending
+        with a whole record.
+
+        """
+        if not self.buffer:
+            return
+        position = self.log.tell()
+        try:
+            self.log.write(b"".join(self.buffer))
+            self.log.flush()
+        except BaseException:
+            self.log.truncate(position)
+            self.log.seek(position)
+            raise
+        self.buffer.clear()
+        self.unsynced = True
+
+    def commit(self):
+        """
+        Write the buffered records to the log and fsync according to the policy. With fsync 'always', every
+        operation before the commit survives a crash.
+
+        """
+        self.__write()
+        if self.unsynced and (self.fsync == 'always' or (
+                self.fsync == 'interval' and time.monotonic() - self.last_fsync >= self.fsync_interval)):
+            os.fsync(self.log.fileno())
+            self.unsynced = False
+            self.last_fsync = time.monotonic()
+
+    def snapshot(self):
+        """
+        Write a snapshot of the tree at the current lsn, start a new log segment after it, and remove the older
+        snapshots and segments.
+
+        """
+        self.commit()
+        if self.fsync != 'never' and self.unsynced:
+            os.fsync(self.log.fileno())
+            self.unsynced = False
+
+        path = os.path.join(self.directory, SNAPSHOT_NAME.format(self.lsn))
+        temporary_path = path + '.tmp'
+        self.tree.dump(temporary_path)
+        with open(temporary_path, 'rb') as file:
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+        self.log.close()
+        self.log = open(os.path.join(self.directory, SEGMENT_NAME.format(self.lsn)), 'ab')
+        sync_directory(self.directory)
+
+        for lsn, old_path in list_files(self.directory, SNAPSHOT_NAME) + list_files(self.directory, SEGMENT_NAME):
+            if lsn < self.lsn:
+                os.remove(old_path)
+        self.snapshot_lsn = self.lsn
+        self.operations_since_snapshot = 0
+
+    def close(self):
+        """
+        Commit the buffered records, fsync unless the policy is 'never', and close the log.
+
+        """
+        if self.log.closed:
+            return
+        self.commit()
+        if self.fsync != 'never' and self.unsynced:
+            os.fsync(self.log.fileno())
+        self.log.close()
+
+    def insert(self, key, value):
+        """
+        Insert a node with key and value, and log it. The tree is unchanged if the key and value cannot be
+        pickled or the log cannot be written.
+
+        """
+        payload = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        node = self.tree.insert(key, value)
+        try:
+            self.__append(INSERT, payload)
+        except BaseException:
+            self.tree.delete_node(node)
+            raise
+        self.__logged()
+
+    def delete(self, key):
+        """
+        Delete a node with the given key, and log it. Raises IndexError without logging if it doesn't exist.
+        The tree is unchanged if the key cannot be pickled or the log cannot be written.
+
+        """
+        payload = pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL)
+        node = self.tree.get_node(key)
+        self.__append(DELETE, payload)
+        self.tree.delete_node(node)
+        self.__logged()
+
+    @property
+    def size(self):
+        """
+        Return the size of the tree.
+
+        """
+        return self.tree.size
+
+    def __iter__(self):
+        return iter(self.tree)
+
+    def __reversed__(self):
+        return reversed(self.tree)
+
+    def keys(self):
+        return self.tree.keys()
+
+    def values(self):
+        return self.tree.values()
+
+    def items(self):
+        return self.tree.items()
+
+    def get_node(self, key):
+        """
+        Get the node with the given key.
+
+        """
+        return self.tree.get_node(key)
+
+    def select(self, index):
+        """
+        Return the node with the ith smallest key.
+
+        """
+        return self.tree.select(index)
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Lazily iterate over the nodes with lo <= key < hi (bounds adjustable by inclusive).
+
+        """
+        return self.tree.range(lo, hi, inclusive=inclusive, reverse=reverse)
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key.
+
+        """
+        return self.tree.rank(key)
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Count the keys with lo <= key < hi (bounds adjustable by inclusive).
+
+        """
+        return self.tree.count_range(lo, hi, inclusive=inclusive)
+
+    def get_predecessor(self, key):
+        """
+        Get the predecessor the of given node.
+
+        """
+        return self.tree.get_predecessor(key)
+
+    def get_successor(self, key):
+        """
+        Get the successor the of given node.
+
+        """
+        return self.tree.get_successor(key)
@@ -0,0 +1,135 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+from RedBlackTree import RedBlackTree, Monoid, NIL
+
+# every subtree keeps the largest end of its intervals
+MAX_END = Monoid(max, float('-inf'), lambda key, value: key[1])
+
+
+def check_interval(interval):
+    """
+    Check that an interval is a (lo, hi) pair with lo <= hi.
+
+    """
+    lo, hi = interval
+    if hi < lo:
+        raise ValueError("The interval ({}, {}) ends before it starts!".format(lo, hi))
+
+
+def check_intervals(items):
+    """
+    Check the intervals of (interval, value) pairs before any of them is inserted.
+
+    Returns:
+        items: list of the pairs
+
+    """
+    items = list(items)
+    for interval, _ in items:
+        check_interval(interval)
+
+    return items
+
+
+class IntervalTree(RedBlackTree):
+    def __init__(self, augmentation=None, duplicates='allow', key=None, cmp=None):
+        """
+        RedBlackTree of closed intervals, the keys are (lo, hi) pairs ordered by lo and then hi. The MAX_END
+        augmentation keeps the largest hi of every subtree through the rotations and fixups of RedBlackTree.
+        Args:
+            augmentation: None or MAX_END, the tree always keeps MAX_END
+            duplicates: policy for inserting an existing interval, see RedBlackTree
+            key: must be None, the intervals are ordered by themselves
+            cmp: must be None
+
+        """
+        if augmentation not in (None, MAX_END):
+            raise ValueError("An IntervalTree keeps the augmentation MAX_END!")
+        if key is not None or cmp is not None:
+            raise ValueError("An IntervalTree orders the intervals themselves, it has no key function!")
+        super().__init__(augmentation=MAX_END, duplicates=duplicates)
+
+    def __str__(self):
+        return "<class IntervalTree of size {}>".format(self.size)
+    __repr__ = __str__
+
+    def check_key(self, key):
+        """
+        Check the interval of every node made by the builders of RedBlackTree, load and join.
+
+        """
+        check_interval(key)
+
+    @classmethod
+    def from_intervals(cls, items, presorted=False):
+        """
+        Bulk load a tree from (interval, value) pairs, alias of from_items.
+
+        """
+        return cls.from_items(items, presorted=presorted)
+
+    def insert(self, key, value, finger=None):
+        """
+        Insert an interval with a value.
+        Args:
+            key: (lo, hi) pair, lo <= hi
+            value: value of the interval
+            finger: a node of the tree near the key, the search starts from it instead of the root
+
+        Returns:
+            node: the inserted node
+
+        """
+        check_interval(key)
+        return super().insert(key, value, finger)
+
+    def insert_many(self, items):
+        """
+        Insert a batch of (interval, value) pairs, see RedBlackTree.insert_many. Nothing is inserted if any interval
+        is invalid.
+
+        """
+        super().insert_many(check_intervals(items))
+
+    def update(self, mapping):
+        """
+        Set the values of a batch of intervals, see RedBlackTree.update. Nothing is changed if any interval is invalid.
+
+        """
+        super().update(check_intervals(mapping.items() if hasattr(mapping, 'items') else mapping))
+
+    def overlapping(self, lo, hi=None):
+        """
+        Lazily iterate over the nodes of the intervals overlapping a point or the closed window [lo, hi], in
+        ascending order. O(min(n, k log n)) for k results: subtrees whose largest end is before lo are skipped and the
+        iteration stops at the first interval starting after hi, but every result may cost a descent of O(log n).
+        Args:
+            lo: the point, or the start of the window
+            hi: the end of the window, None for a point
+
+        Returns:
+            iterator of NodeRBT
+
+        """
+        if hi is None:
+            hi = lo
+        stack = []
+        node = self.root
+        while True:
+            while node is not NIL and node.aggregate >= lo:
+                stack.append(node)
+                node = node.left_child
+            if not stack:
+                return
+
+            node = stack.pop()
+            start, end = node.key
+            if start > hi:
+                return
+            if end >= lo:
+                yield node
+            node = node.right_child
@@ -0,0 +1,390 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import bisect
+import mmap
+import pickle
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from RedBlackTree import NodeRBT, NIL, RED, BLACK, RedBlackTreeView
+
+# File layout, all sections are preceded by their length and padded to 8 bytes:
+#   header: magic, version, byte order, key column code, value column code, has structure, natural order, size,
+#       natural order is False if the tree had a key function, the keys are then not sorted by themselves
+#   key column, value column: one section of 8 byte numbers for the codes 'q' (int64) and 'd' (float),
+#       or a section of n + 1 int64 offsets and a section of data for 's' (utf-8), 'y' (bytes) and 'p' (pickle)
+#   structure (optional): n / 8 bytes of color bits and n bytes of depths of the nodes in ascending order
+MAGIC = b'RBT1'
+VERSION = 2
+HEADER = struct.Struct('<4sB1s1s1s??Q')
+LENGTH = struct.Struct('<Q')
+BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+DECODERS = {b's': lambda data: str(data, 'utf-8'), b'y': bytes, b'p': pickle.loads}
+
+
+def column_code(objects):
+    """
+    Return the code of the most compact column for a list of keys or values.
+
+    """
+    types = set(map(type, objects))
+    if types <= {int} and (not objects or INT64_MIN <= min(objects) and max(objects) <= INT64_MAX):
+        return b'q'
+    elif types == {float}:
+        return b'd'
+    elif types == {str}:
+        return b's'
+    elif types == {bytes}:
+        return b'y'
+
+    return b'p'
+
+
+def encode_column(objects):
+    """
+    Encode a list of keys or values as a column.
+
+    Returns:
+        code: column code
+        sections: list of bytes-like sections of the column
+
+    """
+    code = column_code(objects)
+    if code in (b'q', b'd'):
+        return code, [array(code.decode(), objects)]
+
+    if code == b's':
+        encoded = [obj.encode('utf-8') for obj in objects]
+    elif code == b'y':
+        encoded = objects
+    else:
+        encoded = [pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL) for obj in objects]
+    offsets = array('q', accumulate(map(len, encoded), initial=0))
+
+    return code, [offsets, b''.join(encoded)]
+
+
+def encode_structure(root, size):
+    """
+    Encode the shape and the colors of a tree, in ascending order of the keys.
+
+    Returns:
+        sections: color bits and depths of all nodes
+
+    """
+    colors = bytearray((size + 7) // 8)
+    depths = bytearray(size)
+    index = 0
+    stack = []
+    node, depth = root, 0
+    while stack or node is not NIL:
+        while node is not NIL:
+            stack.append((node, depth))
+            node, depth = node.left_child, depth + 1
+        node, depth = stack.pop()
+        if node.color == RED:
+            colors[index >> 3] |= 1 << (index & 7)
+        depths[index] = depth
+        index += 1
+        node, depth = node.right_child, depth + 1
+
+    return [colors, depths]
+
+
+def write_snapshot(path, tree, structure=True):
+    """
+    Write the nodes of a tree to a binary file, see the file layout above.
+    Args:
+        path: path of the file
+        tree: class RedBlackTree
+        structure: True for also writing the shape and colors, so that load rebuilds the very same tree
+
+    """
+    keys, values = [], []
+    for node in tree:
+        keys.append(node.key)
+        values.append(node.value)
+    key_code, key_sections = encode_column(keys)
+    value_code, value_sections = encode_column(values)
+    sections = key_sections + value_sections
+    if structure:
+        sections += encode_structure(tree.root, len(keys))
+
+    with open(path, 'wb') as file:
+        natural_order = tree.key_function is None
+        file.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, key_code, value_code, structure, natural_order, len(keys)))
+        position = HEADER.size
+        for section in sections:
+            data = memoryview(section).cast('B')
+            padding = -(position + LENGTH.size) % 8
+            file.write(b'\0' * padding + LENGTH.pack(len(data)))
+            file.write(data)
+            position += padding + LENGTH.size + len(data)
+
+
+def read_snapshot(buffer):
+    """
+    Parse a binary snapshot without copying the data.
+    Args:
+        buffer: bytes or mmap of the file
+
+    Returns:
+        keys: key column, indexable and bisectable
+        values: value column
+        structure: None, or (color bits, depths)
+        natural_order: False if the keys are sorted by the key function of the dumped tree instead of themselves
+
+    """
+    view = memoryview(buffer)
+    magic, version, byte_order, key_code, value_code, has_structure, natural_order, size = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a red-black tree snapshot!")
+    position = HEADER.size
+    if byte_order != BYTE_ORDER:
+        raise ValueError("The snapshot has a different byte order!")
+
+    def read_section():
+        nonlocal position
+        position += -(position + LENGTH.size) % 8
+        length, = LENGTH.unpack_from(view, position)
+        position += LENGTH.size + length
+        return view[position - length:position]
+
+    def read_column(code):
+        if code in (b'q', b'd'):
+            return read_section().cast(code.decode())
+        return Column(code, read_section().cast('q'), read_section())
+
+    keys = read_column(key_code)
+    values = read_column(value_code)
+    structure = (read_section(), read_section()) if has_structure else None
+    if len(keys) != size or len(values) != size:
+        raise ValueError("The snapshot is truncated!")
+
+    return keys, values, structure, natural_order
+
+
+def link_structure(nodes, colors, depths):
+    """
+    Link the nodes in ascending order back into the tree they were written from, given the colors and depths.
+    In ascending order, the parent of a node is the nearest neighbor with a smaller depth, so one stack of the
+    right spine rebuilds the tree in O(n) like a Cartesian tree.
+
+    Returns:
+        root: root of the tree, NIL if empty
+
+    """
+    # the right spine of the nodes linked so far, and their depths
+    stack = []
+    stack_depths = []
+    for index, (node, depth) in enumerate(zip(nodes, depths)):
+        node.color = RED if colors[index >> 3] >> (index & 7) & 1 else BLACK
+        node.right_child = NIL
+        last = NIL
+        while stack_depths and stack_depths[-1] > depth:
+            stack_depths.pop()
+            last = stack.pop()
+            last.size_tree = last.left_child.size_tree + last.right_child.size_tree + 1
+        node.left_child = last
+        if last is not NIL:
+            last.parent = node
+        if stack:
+            stack[-1].right_child = node
+            node.parent = stack[-1]
+        stack.append(node)
+        stack_depths.append(depth)
+
+    while stack:
+        last = stack.pop()
+        last.size_tree = last.left_child.size_tree + last.right_child.size_tree + 1
+
+    return last if nodes else NIL
+
+
+class Column(object):
+    def __init__(self, code, offsets, data):
+        """
+        Read-only sequence of variable length objects in a snapshot, decoded on access.
+        Args:
+            code: 's', 'y' or 'p'
+            offsets: memoryview of n + 1 int64 offsets into data
+            data: memoryview of the encoded objects
+
+        """
+        self.decode = DECODERS[code]
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        return self.decode(self.data[self.offsets[index]:self.offsets[index + 1]])
+
+    def tolist(self):
+        return [self[index] for index in range(len(self))]
+
+    def release(self):
+        self.offsets.release()
+        self.data.release()
+
+
+class MappedRedBlackTree(object):
+    def __init__(self, path):
+        """
+        Read-only tree served straight from a memory-mapped snapshot written by RedBlackTree.dump. The keys are
+        sorted, so queries are binary searches on the file and no nodes are built, except the ones returned.
+        Args:
+            path: path of the snapshot
+
+        """
+        with open(path, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.key_column, self.value_column, self.structure, natural_order = read_snapshot(self.mmap)
+        if not natural_order:
+            self.close()
+            raise ValueError("The snapshot is sorted by a key function, a mapped tree can only binary search keys "
+                             "sorted by themselves!")
+
+    def __str__(self):
+        return "<class MappedRedBlackTree of size {}>".format(self.size)
+    __repr__ = __str__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Release the columns and unmap the file.
+
+        """
+        for column in [self.key_column, self.value_column] + list(self.structure or ()):
+            column.release()
+        self.mmap.close()
+
+    @property
+    def size(self):
+        """
+        Return the size of the tree.
+
+        """
+        return len(self.key_column)
+
+    def __node(self, index):
+        """
+        Build the node at a certain index in ascending order, with its color if the snapshot has one.
+
+        """
+        color = BLACK
+        if self.structure:
+            color = self.structure[0][index >> 3] >> (index & 7) & 1
+        node = NodeRBT(self.key_column[index], self.value_column[index], color)
+        node.left_child = node.right_child = NIL
+        return node
+
+    def __iter__(self):
+        return (self.__node(index) for index in range(self.size))
+
+    def __reversed__(self):
+        return (self.__node(index) for index in range(self.size - 1, -1, -1))
+
+    def keys(self):
+        return RedBlackTreeView(self, 'keys')
+
+    def values(self):
+        return RedBlackTreeView(self, 'values')
+
+    def items(self):
+        return RedBlackTreeView(self, 'items')
+
+    def __find(self, key):
+        """
+        Return the index of the first node with the key, raise IndexError if it doesn't exist.
+
+        """
+        index = bisect.bisect_left(self.key_column, key)
+        if index == self.size or self.key_column[index] != key:
+            raise IndexError("Node doesn't exist!")
+
+        return index
+
+    def get_node(self, key):
+        """
+        Get the node with the given key.
+
+        """
+        return self.__node(self.__find(key))
+
+    def select(self, index):
+        """
+        Return the node with the ith smallest key.
+
+        """
+        if index > self.size or index <= 0:
+            raise IndexError("The index is out of range!")
+
+        return self.__node(index - 1)
+
+    def __bounds(self, lo, hi, inclusive):
+        """
+        Return the index range of the nodes with lo <= key < hi (bounds adjustable by inclusive).
+
+        """
+        start, end = 0, self.size
+        if lo is not None:
+            start = (bisect.bisect_left if inclusive[0] else bisect.bisect_right)(self.key_column, lo)
+        if hi is not None:
+            end = (bisect.bisect_right if inclusive[1] else bisect.bisect_left)(self.key_column, hi)
+
+        return start, max(end, start)
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Lazily iterate over the nodes with lo <= key < hi (bounds adjustable by inclusive). O(log n + k).
+
+        """
+        start, end = self.__bounds(lo, hi, inclusive)
+        indices = range(end - 1, start - 1, -1) if reverse else range(start, end)
+        return (self.__node(index) for index in indices)
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key.
+
+        """
+        return bisect.bisect_left(self.key_column, key)
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Count the keys with lo <= key < hi (bounds adjustable by inclusive) in O(log n).
+
+        """
+        start, end = self.__bounds(lo, hi, inclusive)
+        return end - start
+
+    def get_predecessor(self, key):
+        """
+        Get the predecessor the of given node.
+
+        """
+        index = self.__find(key)
+        return self.__node(index - 1) if index else NodeRBT(None, None)
+
+    def get_successor(self, key):
+        """
+        Get the successor the of given node.
+
+        """
+        index = self.__find(key) + 1
+        return self.__node(index) if index < self.size else NodeRBT(None, None)
@@ -0,0 +1,112 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from RedBlackTree import sort_key_function
+from MappedRedBlackTree import Column, encode_column
+
+# number of sampled keys per partition for choosing the splitters
+OVERSAMPLING = 32
+# smaller inputs are built in the calling process, starting a pool would cost more than the sort
+MIN_PARALLEL_SIZE = 50000
+
+
+def choose_splitters(keys, partitions, sort_key, seed=0):
+    """
+    Choose the keys splitting the items into partitions of about the same size, from a random sample.
+    Args:
+        keys: list of keys
+        partitions: number of partitions
+        sort_key: function deriving the sort key of a key
+        seed: seed of the sample
+
+    Returns:
+        splitters: list of partitions - 1 keys, ascending by sort key
+
+    """
+    sample = random.Random(seed).sample(keys, min(len(keys), partitions * OVERSAMPLING))
+    sample.sort(key=sort_key)
+
+    return [sample[len(sample) * i // partitions] for i in range(1, partitions)]
+
+
+def sort_partition(column, lo=None, hi=None, key=None, cmp=None):
+    """
+    Sort one partition in a worker process. Every worker gets the keys of all items as one encoded column and picks
+    the items of its own range, so that the parent neither partitions the items nor pickles any (key, value) tuple.
+    The result is the sorted order of the item indices, the parent links the nodes in that order.
+    Args:
+        column: encoded column of the keys of all items, see encode_column
+        lo: splitter key starting the range, None for no lower bound
+        hi: splitter key ending the range, not included, None for no upper bound
+        key: key function of the tree, must be picklable
+        cmp: comparison function of the tree, must be picklable
+
+    Returns:
+        (order, sort_keys): array of the indices of the items in the range, sorted by key and then by index,
+            sort_keys is the encoded column of their sort keys, None unless there is a key function
+
+    """
+    keys = decode_column(column)
+    key_function = sort_key_function(key, cmp)
+    if key_function is None:
+        sort_keys = keys
+    else:
+        sort_keys = [key_function(item_key) for item_key in keys]
+        lo = None if lo is None else key_function(lo)
+        hi = None if hi is None else key_function(hi)
+
+    order = [index for index in range(len(sort_keys)) if (lo is None or not sort_keys[index] < lo) and
+             (hi is None or sort_keys[index] < hi)]
+    # the sort is stable, equal keys keep the given order
+    order.sort(key=sort_keys.__getitem__)
+    # the wrappers of cmp_to_key can't be pickled, they are rebuilt cheaply by the parent
+    sorted_keys = encode_column([sort_keys[index] for index in order]) if key is not None else None
+
+    return array('q', order), sorted_keys
+
+
+def decode_column(column):
+    """
+    Decode a column encoded by encode_column back into a list.
+
+    """
+    code, sections = column
+    if code in (b'q', b'd'):
+        return sections[0].tolist()
+
+    offsets, data = sections
+    return Column(code, memoryview(offsets), memoryview(data)).tolist()
+
+
+def sorted_partitions(items, workers=None, key=None, cmp=None):
+    """
+    Sort the items in range partitions on a pool of worker processes.
+    Args:
+        items: list of (key, value) pairs
+        workers: number of worker processes, None for os.cpu_count()
+        key: key function of the tree, must be picklable
+        cmp: comparison function of the tree, must be picklable
+
+    Returns:
+        generator of (order, sort_keys) of every partition in ascending order, order is the list of the indices of
+        its items sorted by key, sort_keys the list of their sort keys, None unless there is a key function. Each
+        partition is yielded as soon as it is sorted
+
+    """
+    workers = workers or os.cpu_count()
+    keys = [item[0] for item in items]
+    splitters = choose_splitters(keys, workers, sort_key_function(key, cmp))
+    column = encode_column(keys)
+    bounds = [None] + splitters + [None]
+
+    with ProcessPoolExecutor(workers) as executor:
+        for order, sort_keys in executor.map(sort_partition, [column] * workers, bounds[:-1], bounds[1:],
+                                             [key] * workers, [cmp] * workers):
+            yield order.tolist(), None if sort_keys is None else decode_column(sort_keys)
@@ -0,0 +1,479 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+from RedBlackTree import BLACK, RED, NIL, NodeRBT, RedBlackTreeIterator, RedBlackTreeView
+
+
+def make_node(color, left, key, value, right):
+    """
+    Create a new node of a persistent tree. The node has no parent pointer and is never modified afterwards,
+    so it can be shared by any number of versions.
+
+    Returns:
+        node: class NodeRBT
+
+    """
+    node = NodeRBT(key, value, color)
+    node.left_child = left
+    node.right_child = right
+    node.size_tree = left.size_tree + right.size_tree + 1
+
+    return node
+
+
+def balance(left, key, value, right):
+    """
+    Rebuild a black node whose children may contain a double red, the result may be red (Kahrs).
+
+    """
+    if left.color == RED and right.color == RED:
+        return make_node(RED, make_node(BLACK, left.left_child, left.key, left.value, left.right_child), key, value,
+                         make_node(BLACK, right.left_child, right.key, right.value, right.right_child))
+    if left.color == RED:
+        if left.left_child.color == RED:
+            outer = left.left_child
+            return make_node(RED, make_node(BLACK, outer.left_child, outer.key, outer.value, outer.right_child),
+                             left.key, left.value, make_node(BLACK, left.right_child, key, value, right))
+        if left.right_child.color == RED:
+            inner = left.right_child
+            return make_node(RED, make_node(BLACK, left.left_child, left.key, left.value, inner.left_child),
+                             inner.key, inner.value, make_node(BLACK, inner.right_child, key, value, right))
+    if right.color == RED:
+        if right.right_child.color == RED:
+            outer = right.right_child
+            return make_node(RED, make_node(BLACK, left, key, value, right.left_child), right.key, right.value,
+                             make_node(BLACK, outer.left_child, outer.key, outer.value, outer.right_child))
+        if right.left_child.color == RED:
+            inner = right.left_child
+            return make_node(RED, make_node(BLACK, left, key, value, inner.left_child), inner.key, inner.value,
+                             make_node(BLACK, inner.right_child, right.key, right.value, right.right_child))
+
+    return make_node(BLACK, left, key, value, right)
+
+
+def paint_red(node):
+    """
+    Return a red copy of a non-empty black node.
+
+    """
+    if node is NIL or node.color != BLACK:
+        raise IndexError("Unknown delete case detected!")
+
+    return make_node(RED, node.left_child, node.key, node.value, node.right_child)
+
+
+def balance_left(left, key, value, right):
+    """
+    Rebalance after the black height of the left subtree dropped by one.
+
+    """
+    if left.color == RED:
+        return make_node(RED, make_node(BLACK, left.left_child, left.key, left.value, left.right_child), key, value,
+                         right)
+    if right is not NIL and right.color == BLACK:
+        return balance(left, key, value, paint_red(right))
+    if right.color == RED and right.left_child is not NIL and right.left_child.color == BLACK:
+        inner = right.left_child
+        return make_node(RED, make_node(BLACK, left, key, value, inner.left_child), inner.key, inner.value,
+                         balance(inner.right_child, right.key, right.value, paint_red(right.right_child)))
+
+    raise IndexError("Unknown delete case detected!")
+
+
+def balance_right(left, key, value, right):
+    """
+    Rebalance after the black height of the right subtree dropped by one.
+
+    """
+    if right.color == RED:
+        return make_node(RED, left, key, value,
+                         make_node(BLACK, right.left_child, right.key, right.value, right.right_child))
+    if left is not NIL and left.color == BLACK:
+        return balance(paint_red(left), key, value, right)
+    if left.color == RED and left.right_child is not NIL and left.right_child.color == BLACK:
+        inner = left.right_child
+        return make_node(RED, balance(paint_red(left.left_child), left.key, left.value, inner.left_child),
+                         inner.key, inner.value, make_node(BLACK, inner.right_child, key, value, right))
+
+    raise IndexError("Unknown delete case detected!")
+
+
+def append(left, right):
+    """
+    Merge the two children of a deleted node, all keys of left are not larger than the keys of right.
+
+    """
+    if left is NIL:
+        return right
+    if right is NIL:
+        return left
+
+    if left.color == RED and right.color == RED:
+        middle = append(left.right_child, right.left_child)
+        if middle.color == RED:
+            return make_node(RED, make_node(RED, left.left_child, left.key, left.value, middle.left_child),
+                             middle.key, middle.value,
+                             make_node(RED, middle.right_child, right.key, right.value, right.right_child))
+        return make_node(RED, left.left_child, left.key, left.value,
+                         make_node(RED, middle, right.key, right.value, right.right_child))
+
+    if left.color == BLACK and right.color == BLACK:
+        middle = append(left.right_child, right.left_child)
+        if middle.color == RED:
+            return make_node(RED, make_node(BLACK, left.left_child, left.key, left.value, middle.left_child),
+                             middle.key, middle.value,
+                             make_node(BLACK, middle.right_child, right.key, right.value, right.right_child))
+        return balance_left(left.left_child, left.key, left.value,
+                            make_node(BLACK, middle, right.key, right.value, right.right_child))
+
+    if right.color == RED:
+        return make_node(RED, append(left, right.left_child), right.key, right.value, right.right_child)
+
+    return make_node(RED, left.left_child, left.key, left.value, append(left.right_child, right))
+
+
+class PersistentRedBlackTree(object):
+    def __init__(self, root=NIL):
+        """
+        Persistent (immutable) red-black tree. A write copies only the O(log n) nodes on its path and leaves all
+        existing nodes untouched, so every version keeps sharing the rest of the structure. The nodes have no
+        parent pointers, the fixups are the functional ones of Okasaki and Kahrs.
+        Args:
+            root: root node of an existing version, only for snapshot
+
+        """
+        self.root = root
+
+    def __str__(self):
+        return "<class PersistentRedBlackTree of size {}>".format(self.root.size_tree)
+    __repr__ = __str__
+
+    def __iter__(self):
+        """
+        Iterate over all nodes in ascending order of keys.
+
+        """
+        return RedBlackTreeIterator(self)
+
+    def __reversed__(self):
+        """
+        Iterate over all nodes in descending order of keys.
+
+        """
+        return RedBlackTreeIterator(self, reverse=True)
+
+    def keys(self):
+        """
+        Return a view of all keys in ascending order.
+
+        """
+        return RedBlackTreeView(self, 'keys')
+
+    def values(self):
+        """
+        Return a view of all values in ascending order of keys.
+
+        """
+        return RedBlackTreeView(self, 'values')
+
+    def items(self):
+        """
+        Return a view of all (key, value) pairs in ascending order of keys.
+
+        """
+        return RedBlackTreeView(self, 'items')
+
+    def __getitem__(self, item):
+        """
+        Make class as a list, return the node with ith smallest key.
+        Args:
+            item: index of the list
+
+        """
+        return self.select(item)
+
+    @property
+    def size(self):
+        """
+        Return the size of the tree.
+
+        """
+        return self.root.size_tree
+
+    def snapshot(self):
+        """
+        Return the current version in O(1). Later writes to this tree don't change the snapshot.
+
+        Returns:
+            snapshot: class PersistentRedBlackTree
+
+        """
+        return PersistentRedBlackTree(self.root)
+
+    def __search(self, key):
+        """
+        Search for a certain key.
+
+        Returns:
+            node: the node with the key, NIL if it doesn't exist
+
+        """
+        node = self.root
+        while node is not NIL and node.key != key:
+            node = node.left_child if key < node.key else node.right_child
+
+        return node
+
+    def check_balance(self, output_information=True):
+        """
+        Check whether the tree is balance, i.e. all paths have the same number of black nodes along the path.
+
+        """
+        num_black_nodes_ref = None
+        stack = [(self.root, 0)]
+        while stack:
+            node, num_black_nodes = stack.pop()
+            if node is NIL:
+                if num_black_nodes_ref is None:
+                    num_black_nodes_ref = num_black_nodes
+                elif num_black_nodes != num_black_nodes_ref:
+                    raise ValueError("The tree is not balance!")
+                continue
+            num_black_nodes += node.color == BLACK
+            stack.append((node.left_child, num_black_nodes))
+            stack.append((node.right_child, num_black_nodes))
+
+        if output_information:
+            print("Balance test success!")
+
+    def check_color(self, output_information=True):
+        """
+        Check whether the color of the tree is correct, including root check and check of double reds.
+
+        """
+        if self.root.color != BLACK:
+            raise ValueError("The root is not black!")
+
+        stack = [self.root] if self.root is not NIL else []
+        while stack:
+            node = stack.pop()
+            for child in (node.left_child, node.right_child):
+                if child is not NIL:
+                    if node.color == RED and child.color == RED:
+                        raise ValueError("The tree has double red!")
+                    stack.append(child)
+
+        if output_information:
+            print("Color test success!")
+
+    def check_all(self, output_information=True):
+        """
+        Check balance and the color of the tree.
+        Args:
+            output_information: True for printing the success message, and vice versa
+
+        """
+        self.check_balance(output_information)
+        self.check_color(output_information)
+
+    def get_node(self, key):
+        """
+        Get the node with the given key.
+        Args:
+            key: the key of the node
+
+        Returns:
+            search_node: class NodeRBT, must not be modified
+
+        """
+        search_node = self.__search(key)
+        if search_node is NIL:
+            raise IndexError("Node doesn't exist!")
+
+        return search_node
+
+    def select(self, index):
+        """
+        Select a certain index of node in an ascending order, i.e. return the node with the ith smallest key.
+        Args:
+            index: ith smallest key
+
+        Returns:
+            check_node: the result of selection, class NodeRBT
+
+        """
+        if index > self.root.size_tree or index <= 0:
+            raise IndexError("The index is out of range!")
+
+        check_node = self.root
+        while True:
+            size_left_tree = check_node.left_child.size_tree
+            if size_left_tree == index - 1:
+                return check_node
+            elif size_left_tree >= index:
+                check_node = check_node.left_child
+            else:
+                index -= size_left_tree + 1
+                check_node = check_node.right_child
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Lazily iterate over the nodes with lo <= key < hi (bounds adjustable by inclusive). O(log n + k).
+
+        Returns:
+            iterator of NodeRBT, class RedBlackTreeIterator
+
+        """
+        return RedBlackTreeIterator(self, reverse=reverse, lo=lo, hi=hi, inclusive=inclusive)
+
+    def __count_less(self, key, inclusive=False):
+        """
+        Count the keys smaller than the given key with the help of size_tree. O(log n).
+
+        """
+        count = 0
+        node = self.root
+        while node is not NIL:
+            if node.key < key or (inclusive and node.key == key):
+                count += node.left_child.size_tree + 1
+                node = node.right_child
+            else:
+                node = node.left_child
+
+        return count
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key.
+
+        """
+        return self.__count_less(key)
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Count the keys with lo <= key < hi (bounds adjustable by inclusive) in O(log n).
+
+        """
+        count_hi = self.root.size_tree if hi is None else self.__count_less(hi, inclusive=inclusive[1])
+        count_lo = 0 if lo is None else self.__count_less(lo, inclusive=not inclusive[0])
+
+        return max(count_hi - count_lo, 0)
+
+    def get_predecessor(self, key):
+        """
+        Get the predecessor the of given node, the last ancestor turned right from is remembered on the way down.
+        Args:
+            key: the key of the node to be searched
+
+        Returns:
+            pred_node: predecessor of the node, class NodeRBT, with key None if there is no predecessor
+
+        """
+        pred_node = NIL
+        node = self.root
+        while node is not NIL and node.key != key:
+            if key < node.key:
+                node = node.left_child
+            else:
+                pred_node = node
+                node = node.right_child
+        if node is NIL:
+            raise IndexError("Node doesn't exist!")
+
+        if node.left_child is not NIL:
+            pred_node = node.left_child
+            while pred_node.right_child is not NIL:
+                pred_node = pred_node.right_child
+
+        return pred_node if pred_node is not NIL else NodeRBT(None, None)
+
+    def get_successor(self, key):
+        """
+        Get the successor the of given node, the last ancestor turned left from is remembered on the way down.
+        Args:
+            key: the key of the node to be searched
+
+        Returns:
+            succ_node: successor of the node, class NodeRBT, with key None if there is no successor
+
+        """
+        succ_node = NIL
+        node = self.root
+        while node is not NIL and node.key != key:
+            if key < node.key:
+                succ_node = node
+                node = node.left_child
+            else:
+                node = node.right_child
+        if node is NIL:
+            raise IndexError("Node doesn't exist!")
+
+        if node.right_child is not NIL:
+            succ_node = node.right_child
+            while succ_node.left_child is not NIL:
+                succ_node = succ_node.left_child
+
+        return succ_node if succ_node is not NIL else NodeRBT(None, None)
+
+    def insert(self, key, value):
+        """
+        Insert a node with key and value, copying only the path to the new node.
+        Args:
+            key: key of the node to be inserted
+            value: value of the node to be inserted
+
+        Returns:
+            version: the new version, class PersistentRedBlackTree
+
+        """
+        def insert_into(node):
+            if node is NIL:
+                return make_node(RED, NIL, key, value, NIL)
+            if key <= node.key:
+                left, right = insert_into(node.left_child), node.right_child
+            else:
+                left, right = node.left_child, insert_into(node.right_child)
+            if node.color == BLACK:
+                return balance(left, node.key, node.value, right)
+            return make_node(RED, left, node.key, node.value, right)
+
+        root = insert_into(self.root)
+        if root.color == RED:
+            root = make_node(BLACK, root.left_child, root.key, root.value, root.right_child)
+        self.root = root
+
+        return self.snapshot()
+
+    def delete(self, key):
+        """
+        Delete a node with the given key, copying only the path to the node and the nodes rebalanced around it.
+        Args:
+            key: the key of the node to be deleted
+
+        Returns:
+            version: the new version, class PersistentRedBlackTree
+
+        """
+        if self.__search(key) is NIL:
+            raise IndexError("Node doesn't exist!")
+
+        def delete_from(node):
+            if key < node.key:
+                if node.left_child.color == BLACK:
+                    return balance_left(delete_from(node.left_child), node.key, node.value, node.right_child)
+                return make_node(RED, delete_from(node.left_child), node.key, node.value, node.right_child)
+            if key > node.key:
+                if node.right_child.color == BLACK:
+                    return balance_right(node.left_child, node.key, node.value, delete_from(node.right_child))
+                return make_node(RED, node.left_child, node.key, node.value, delete_from(node.right_child))
+            return append(node.left_child, node.right_child)
+
+        root = delete_from(self.root)
+        if root.color == RED:
+            root = make_node(BLACK, root.left_child, root.key, root.value, root.right_child)
+        self.root = root
+
+        return self.snapshot()
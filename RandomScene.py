@@ -0,0 +1,283 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import random
+import sys
+from RedBlackTree import RedBlackTree, DUPLICATE_POLICIES, SUM, NIL
+
+# randomized checks of RedBlackTree against a model, a dict of every key to the list of its values: one value per
+# node for 'allow', the values of the single node for 'multimap' and the single value otherwise. All nodes of a key
+# share one value for 'allow', so that any of them may be deleted. After every operation the invariants, the size,
+# the order of the keys, the black height and the aggregates are checked, every check raises AssertionError on failure
+seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+random.seed(seed)
+num_steps = 300
+max_key = 1000
+
+
+def height(node):
+    return 0 if node is NIL else 1 + max(height(node.left_child), height(node.right_child))
+
+
+def entries(tree, model):
+    """
+    Return the expected (key, value) pair of every node in ascending order.
+
+    """
+    if tree.duplicates == 'allow':
+        return [(key, value) for key in sorted(model) for value in model[key]]
+    if tree.duplicates == 'multimap':
+        return [(key, model[key]) for key in sorted(model)]
+    return [(key, model[key][0]) for key in sorted(model)]
+
+
+def check(tree, model):
+    """
+    Check the tree against the model.
+
+    """
+    report = tree.check_invariants()
+    assert report, report.violations
+    expected = entries(tree, model)
+    assert tree.size == len(expected), (tree.size, len(expected))
+    values = (lambda value: list(value)) if tree.duplicates == 'multimap' else (lambda value: value)
+    assert [(node.key, values(node.value)) for node in tree] == expected
+    # a subtree of black height bh holds at least 2 ** bh - 1 nodes, and no path is longer than 2 * bh
+    assert 2 ** report.black_height - 1 <= tree.size
+    assert height(tree.root) <= 2 * report.black_height
+    if tree.augmentation is not None:
+        lo, hi = sorted(random.randint(0, max_key) for _ in range(2))
+        inclusive = (random.random() < 0.5, random.random() < 0.5)
+        assert tree.aggregate() == sum(sum(values) for values in model.values())
+        assert tree.aggregate(lo, hi, inclusive) == sum(sum(model[key]) for key in model
+                                                        if inside(key, lo, hi, inclusive))
+
+
+def inside(key, lo, hi, inclusive):
+    return (lo < key or (inclusive[0] and key == lo)) and (key < hi or (inclusive[1] and key == hi))
+
+
+def random_key(model, existing):
+    """
+    Return a random key, one of the model if existing and the model isn't empty.
+
+    """
+    if existing and model:
+        return random.choice(list(model))
+    return random.randint(0, max_key)
+
+
+def random_batch(model, size, existing=0.5, clustered=False):
+    """
+    Return a list of random keys, near each other if clustered.
+
+    """
+    if clustered:
+        start = random.randint(0, max_key)
+        return [min(start + random.randint(0, size), max_key) for _ in range(size)]
+    return [random_key(model, random.random() < existing) for _ in range(size)]
+
+
+def model_insert(policy, model, key, value):
+    """
+    Insert into the model like RedBlackTree.insert, the policy 'reject' is checked by the caller.
+
+    """
+    if policy in ('allow', 'multimap'):
+        values = model.setdefault(key, [])
+        values.append(values[0] if values and policy == 'allow' else value)
+    else:
+        model[key] = [value]
+
+
+def model_delete(policy, model, key):
+    """
+    Delete one node of a key from the model.
+
+    """
+    if policy == 'allow' and len(model[key]) > 1:
+        model[key].pop()
+    else:
+        del model[key]
+
+
+def model_range(model, lo, hi, inclusive):
+    return {key: list(values) for key, values in model.items() if inside(key, lo, hi, inclusive)}
+
+
+def value_for(policy, model, key):
+    """
+    Return a new random value, the shared value of the key for 'allow'.
+
+    """
+    if policy == 'allow' and key in model:
+        return model[key][0]
+    return random.randint(0, 100)
+
+
+def step_insert(tree, model):
+    key = random_key(model, random.random() < 0.3)
+    value = value_for(tree.duplicates, model, key)
+    if tree.duplicates == 'reject' and key in model:
+        try:
+            tree.insert(key, value)
+        except ValueError:
+            return tree
+        raise AssertionError("the existing key {} was inserted".format(key))
+    tree.insert(key, value)
+    model_insert(tree.duplicates, model, key, value)
+    return tree
+
+
+def step_delete(tree, model):
+    if not model:
+        try:
+            tree.delete(0)
+        except IndexError:
+            return tree
+        raise AssertionError("a key of the empty tree was deleted")
+    key = random_key(model, True)
+    tree.delete(key)
+    model_delete(tree.duplicates, model, key)
+    return tree
+
+
+def step_insert_many(tree, model):
+    keys = random_batch(model, random.randint(0, 40), existing=0.2, clustered=random.random() < 0.5)
+    items = [(key, value_for(tree.duplicates, model, key)) for key in keys]
+    if tree.duplicates == 'allow':
+        # all nodes of a new key share the value of its first item
+        shared = {}
+        items = [(key, shared.setdefault(key, value)) for key, value in items]
+    if tree.duplicates == 'reject' and (len(set(keys)) < len(keys) or any(key in model for key in keys)):
+        try:
+            tree.insert_many(items)
+        except ValueError:
+            return tree
+        raise AssertionError("the batch {} was inserted".format(keys))
+    tree.insert_many(items)
+    for key, value in items:
+        model_insert(tree.duplicates, model, key, value)
+    return tree
+
+
+def step_delete_many(tree, model):
+    if random.random() < 0.3:
+        # neighbouring keys, deleted as a range if there are enough of them
+        keys = sorted(model)
+        start = random.randint(0, len(keys))
+        keys = keys[start:start + random.randint(0, 60)]
+    else:
+        keys = random_batch(model, random.randint(0, 40), existing=1)
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    nodes = {key: len(values) if tree.duplicates == 'allow' else 1 for key, values in model.items()}
+    if any(count > nodes.get(key, 0) for key, count in counts.items()):
+        try:
+            tree.delete_many(keys)
+        except IndexError:
+            return tree
+        raise AssertionError("the missing keys of {} were deleted".format(keys))
+    tree.delete_many(keys)
+    for key in keys:
+        model_delete(tree.duplicates, model, key)
+    return tree
+
+
+def step_update(tree, model):
+    keys = random_batch(model, random.randint(0, 40), clustered=random.random() < 0.5)
+    pairs = [(key, random.randint(0, 100)) for key in keys]
+    if tree.duplicates == 'reject' and any(key in model for key in keys):
+        try:
+            tree.update(pairs)
+        except ValueError:
+            return tree
+        raise AssertionError("the batch {} was updated".format(keys))
+    tree.update(pairs)
+    for key, value in pairs:
+        model[key] = [value] * len(model[key]) if tree.duplicates == 'allow' and key in model else [value]
+    return tree
+
+
+def step_split(tree, model):
+    key = random_key(model, random.random() < 0.5)
+    left_inclusive = random.random() < 0.5
+    left, right = tree.split(key, left_inclusive)
+    check(tree, {})
+    left_model = model_range(model, -1, key, (False, left_inclusive))
+    right_model = model_range(model, key, max_key + 1, (not left_inclusive, False))
+    check(left, left_model)
+    check(right, right_model)
+    # join with the smallest node of the right tree as pivot, or concatenate
+    if right.size and tree.duplicates != 'multimap' and random.random() < 0.5:
+        pivot = right.pop_min()
+        model_delete(tree.duplicates, right_model, pivot[0])
+        check(right, right_model)
+        tree = RedBlackTree.join(left, pivot, right)
+    else:
+        tree = RedBlackTree.concatenate(left, right)
+    check(left, {})
+    check(right, {})
+    return tree
+
+
+def step_delete_range(tree, model):
+    lo, hi = sorted(random_key(model, random.random() < 0.5) for _ in range(2))
+    inclusive = (random.random() < 0.5, random.random() < 0.5)
+    removed = tree.delete_range(lo, hi, inclusive)
+    removed_model = model_range(model, lo, hi, inclusive)
+    check(removed, removed_model)
+    for key in removed_model:
+        del model[key]
+    return tree
+
+
+def step_cursor(tree, model):
+    key = random_key(model, random.random() < 0.5)
+    cursor = tree.cursor(key)
+    keys = [key for key, _ in entries(tree, model)]
+    position = next((index for index, other in enumerate(keys) if other >= key), len(keys))
+    assert cursor.key == (keys[position] if position < len(keys) else None)
+    for _ in range(random.randint(0, 10)):
+        if random.random() < 0.5:
+            cursor.next()
+            position = position + 1 if position < len(keys) else 0
+        else:
+            cursor.prev()
+            position = position - 1 if position > 0 else len(keys)
+        assert cursor.key == (keys[position] if position < len(keys) else None)
+
+    if cursor.node is not None and random.random() < 0.5:
+        key = cursor.key
+        following = cursor.delete()
+        model_delete(tree.duplicates, model, key)
+        assert following is None or following.key >= key
+    else:
+        key = random_key(model, random.random() < 0.3)
+        value = value_for(tree.duplicates, model, key)
+        if tree.duplicates == 'reject' and key in model:
+            return tree
+        node = cursor.insert(key, value)
+        model_insert(tree.duplicates, model, key, value)
+        assert node.key == key and cursor.node is node
+    return tree
+
+
+# batches of new keys come more often, so that the tree grows to a few hundred nodes
+steps = [step_insert, step_delete, step_insert_many, step_insert_many, step_insert_many, step_delete_many, step_update,
+         step_split, step_delete_range, step_cursor]
+for policy in DUPLICATE_POLICIES:
+    for augmentation in (None, SUM):
+        tree = RedBlackTree(augmentation=augmentation, duplicates=policy)
+        model = {}
+        for _ in range(num_steps):
+            step = random.choice(steps)
+            tree = step(tree, model)
+            check(tree, model)
+        print("{} ({}): {} steps, {} nodes at the end".format(
+            policy, "sum" if augmentation else "no augmentation", num_steps, tree.size))
+print("seed {}: all checks passed".format(seed))
@@ -0,0 +1,220 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import threading
+from DurableRedBlackTree import DurableRedBlackTree, SNAPSHOT_NAME, SEGMENT_NAME, list_files, read_records
+from ConcurrentRedBlackTree import ConcurrentRedBlackTree
+
+# checks of the crash recovery of DurableRedBlackTree and the consistency of ConcurrentRedBlackTree,
+# every check raises AssertionError on failure
+random.seed(0)
+num_nodes = 50
+
+
+def write_tree(directory, keys, snapshot_every=None):
+    """
+    Insert the keys with their string as value, each insert is written to the log at once.
+
+    """
+    with DurableRedBlackTree(directory, fsync='never', snapshot_every=snapshot_every) as tree:
+        for key in keys:
+            tree.insert(key, str(key))
+
+
+def reopen_keys(directory):
+    """
+    Reopen a directory as after a crash, check the tree and return its keys.
+
+    """
+    with DurableRedBlackTree(directory, fsync='never', snapshot_every=None) as tree:
+        tree.tree.check_all(output_information=False)
+        assert all(node.value == str(node.key) for node in tree)
+        return list(tree.keys())
+
+
+def segment_paths(directory):
+    return [path for _, path in list_files(directory, SEGMENT_NAME)]
+
+
+key_list = random.sample(range(1000, 2000), num_nodes)
+print("key list: {}".format(key_list))
+workspace = tempfile.mkdtemp()
+
+# torn tail: half of the last record is written before the crash, the record is cut off
+directory = os.path.join(workspace, 'torn')
+write_tree(directory, key_list)
+log_path = segment_paths(directory)[-1]
+full_length = os.path.getsize(log_path)
+with open(log_path, 'r+b') as file:
+    file.truncate(full_length - 3)
+assert reopen_keys(directory) == sorted(key_list[:-1])
+assert os.path.getsize(log_path) == read_records(log_path)[1]
+print("torn tail: {} of {} keys recovered".format(num_nodes - 1, num_nodes))
+
+# garbage after the last record, e.g. a preallocated block, is cut off
+directory = os.path.join(workspace, 'garbage')
+write_tree(directory, key_list)
+log_path = segment_paths(directory)[-1]
+with open(log_path, 'ab') as file:
+    file.write(bytes(random.getrandbits(8) for _ in range(100)))
+assert reopen_keys(directory) == sorted(key_list)
+assert os.path.getsize(log_path) == full_length
+print("garbage tail: all {} keys recovered".format(num_nodes))
+
+# corrupted record: a flipped byte in the middle ends the log there
+directory = os.path.join(workspace, 'corrupted')
+write_tree(directory, key_list)
+log_path = segment_paths(directory)[-1]
+corrupt_position = full_length * 2 // 3
+with open(log_path, 'r+b') as file:
+    file.seek(corrupt_position)
+    byte = file.read(1)
+    file.seek(corrupt_position)
+    file.write(bytes([byte[0] ^ 0xff]))
+recovered = reopen_keys(directory)
+assert recovered == sorted(key_list[:len(recovered)]) and len(recovered) < num_nodes
+print("corrupted record: the first {} keys recovered".format(len(recovered)))
+
+# segment rotation: a snapshot starts a new segment after its lsn and removes the older files
+directory = os.path.join(workspace, 'rotation')
+write_tree(directory, key_list, snapshot_every=20)
+snapshots = list_files(directory, SNAPSHOT_NAME)
+segments = list_files(directory, SEGMENT_NAME)
+assert [lsn for lsn, _ in snapshots] == [40] and [lsn for lsn, _ in segments] == [40]
+assert [record[0] for record in read_records(segments[0][1])[0]] == list(range(41, num_nodes + 1))
+assert reopen_keys(directory) == sorted(key_list)
+print("rotation: snapshot and segment at lsn 40, {} records after it".format(num_nodes - 40))
+
+# records up to the snapshot lsn are skipped: an old segment left by a crash during a snapshot is not replayed,
+# the tree allows duplicate keys, so a replayed insert would show up twice
+directory = os.path.join(workspace, 'skip')
+write_tree(directory, key_list[:30])
+old_segment = segment_paths(directory)[0]
+shutil.copy(old_segment, os.path.join(workspace, 'old.log'))
+with DurableRedBlackTree(directory, fsync='never', snapshot_every=None) as tree:
+    tree.snapshot()
+    for key in key_list[30:]:
+        tree.insert(key, str(key))
+shutil.copy(os.path.join(workspace, 'old.log'), old_segment)
+assert len(segment_paths(directory)) == 2
+assert reopen_keys(directory) == sorted(key_list)
+print("skip: the records of lsn 1 to 30 before the snapshot are not replayed")
+
+# a corrupted earlier segment drops all later segments, their records depend on the lost ones
+os.remove(list_files(directory, SNAPSHOT_NAME)[0][1])
+with open(old_segment, 'r+b') as file:
+    file.seek(os.path.getsize(old_segment) // 2)
+    file.write(b'\0' * 8)
+recovered = reopen_keys(directory)
+assert recovered == sorted(key_list[:len(recovered)]) and len(recovered) < 30
+assert segment_paths(directory) == [old_segment]
+print("later segments: dropped after a corrupted segment, the first {} keys recovered".format(len(recovered)))
+
+# group commit: buffered records are lost by a crash, the committed ones survive
+directory = os.path.join(workspace, 'group')
+tree = DurableRedBlackTree(directory, fsync='never', group_commit=8, snapshot_every=None)
+for key in key_list[:20]:
+    tree.insert(key, str(key))
+tree.log.close()
+assert reopen_keys(directory) == sorted(key_list[:16])
+print("group commit: 16 of 20 keys committed in groups of 8")
+
+# failed logging: an unpicklable value or a failed write leaves the tree and the log unchanged
+directory = os.path.join(workspace, 'failed')
+write_tree(directory, key_list[:10])
+log_length = os.path.getsize(segment_paths(directory)[-1])
+with DurableRedBlackTree(directory, fsync='never', snapshot_every=None) as tree:
+    for key, value in ((key_list[10], threading.Lock()), (key_list[11], lambda: None)):
+        try:
+            tree.insert(key, value)
+        except (TypeError, AttributeError, pickle.PicklingError):
+            pass
+        else:
+            raise AssertionError("the unpicklable value of key {} was inserted".format(key))
+        assert tree.size == 10 and tree.lsn == 10
+
+    class FailingLog(object):
+        def __init__(self, log):
+            self.log = log
+
+        def __getattr__(self, name):
+            return getattr(self.log, name)
+
+        def write(self, data):
+            self.log.write(data[:len(data) // 2])
+            raise OSError("disk full")
+
+    tree.log = FailingLog(tree.log)
+    for operation, args in ((tree.insert, (key_list[12], str(key_list[12]))), (tree.delete, (key_list[0],))):
+        try:
+            operation(*args)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("the failed write of {} was not raised".format(args))
+        assert tree.size == 10 and tree.lsn == 10 and not tree.buffer
+    tree.log = tree.log.log
+    tree.tree.check_all(output_information=False)
+assert os.path.getsize(segment_paths(directory)[-1]) == log_length
+assert reopen_keys(directory) == sorted(key_list[:10])
+print("failed logging: unpicklable values and failed writes leave the tree and the log unchanged")
+
+shutil.rmtree(workspace)
+
+# consistent iteration: an iterator and the returned nodes keep their keys while the tree is emptied
+for fine_grained in (True, False):
+    treeCRBT = ConcurrentRedBlackTree(fine_grained=fine_grained)
+    for key in key_list:
+        treeCRBT.insert(key, str(key))
+    iterator = iter(treeCRBT)
+    nodes = [treeCRBT.get_node(key_list[0]), treeCRBT.select(1), treeCRBT.get_successor(min(key_list))]
+    for key in key_list:
+        treeCRBT.delete(key)
+    assert [node.key for node in iterator] == sorted(key_list)
+    assert [node.key for node in nodes] == [key_list[0], min(key_list), sorted(key_list)[1]]
+    assert treeCRBT.size == 0
+    print("consistent iteration (fine_grained={}): {} keys".format(fine_grained, num_nodes))
+
+# readers and a writer: every read sees one consistent version
+for fine_grained in (True, False):
+    treeCRBT = ConcurrentRedBlackTree(fine_grained=fine_grained)
+    for key in key_list:
+        treeCRBT.insert(key, str(key))
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        try:
+            while not stop.is_set():
+                keys = [node.key for node in treeCRBT]
+                assert keys == sorted(keys) and None not in keys
+                items = treeCRBT.range(1000, 2000)
+                assert all(value == str(key) for key, value in items)
+                node = treeCRBT.select(1)
+                assert node.value == str(node.key)
+        except Exception as error:
+            errors.append(error)
+
+    def writer():
+        for _ in range(2000):
+            key = random.randint(2000, 3000)
+            treeCRBT.insert(key, str(key))
+            treeCRBT.delete(key)
+        stop.set()
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    assert sorted(key for key, _ in treeCRBT.range()) == sorted(key_list)
+    print("readers and writer (fine_grained={}): no inconsistent read".format(fine_grained))
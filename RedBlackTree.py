@@ -4,19 +4,64 @@
 # Github homepage: https://github.com/Krokette29
 #################################################################
 
+import bisect
+import functools
+import itertools
+from collections import deque
+import operator
+import os
+import time
+
 BLACK = 0
 RED = 1
 
+# batches of at least size / BATCH_REBUILD_FACTOR keys are merged with the list of all nodes in O(n + m), and the
+# tree is relinked if nodes are added or removed, smaller ones are located key by key
+BATCH_REBUILD_FACTOR = 3
+# runs of at least this many new nodes of a batch between the same two nodes update size_tree and the aggregates of
+# their ancestors once per run instead of once per node
+MIN_REFRESH_RUN = 8
+# runs of at least this many neighbouring nodes of a batch are deleted by splitting and concatenating in O(log n)
+MIN_RANGE_DELETE = 32
+
+# what insert does with a key that already exists: 'allow' adds another node, 'reject' raises ValueError,
+# 'overwrite' replaces the value, 'multimap' appends the value to the deque of values of the single node of the key
+DUPLICATE_POLICIES = ('allow', 'reject', 'overwrite', 'multimap')
+
+# the cached sort key of a node, all comparisons are made between sort keys
+SORT_KEY = operator.attrgetter('sort_key')
+
+# counters of RedBlackTree.stats, see RedBlackTree.enable_stats
+STATS_COUNTERS = (
+    'comparisons', 'rotations_left', 'rotations_right', 'recolorings', 'size_tree_updates',
+    'insert_case_3_1', 'insert_case_3_2_1', 'insert_case_3_2_2',
+    'delete_red_child', 'delete_case_1', 'delete_case_2', 'delete_case_3', 'delete_case_4', 'delete_case_5',
+    'delete_case_6', 'nodes_allocated', 'nodes_freed',
+)
+# public operations passed to the timing hook, the ones changing the size also count nodes allocated and freed
+TIMED_OPERATIONS = ('get_node', 'search', 'select', 'range', 'rank', 'count_range', 'get_predecessor',
+                    'get_successor', 'split', 'insert', 'insert_many', 'update', 'delete', 'delete_node',
+                    'delete_one', 'delete_all', 'delete_many', 'delete_range', 'pop_min', 'pop_max')
+SIZE_CHANGING_OPERATIONS = ('insert', 'insert_many', 'update', 'delete', 'delete_node', 'delete_one', 'delete_all',
+                            'delete_many', 'delete_range', 'pop_min', 'pop_max')
+
 
 class NodeRBT(object):
+    # no per-instance __dict__, which is most of the memory of a node
+    __slots__ = ('key', 'value', 'parent', 'left_child', 'right_child', 'color', 'size_tree', 'aggregate',
+                 'sort_key')
+
     def __init__(self, key=None, value=None, color=BLACK):
         self.key = key
+        # the key itself, or the key derived by the key function of the tree, computed once per node
+        self.sort_key = key
         self.value = value
         self.parent = None
         self.left_child = None
         self.right_child = None
         self.color = color
         self.size_tree = 0
+        self.aggregate = None
 
     def __str__(self):
         return "<class NodeRBT ({}, {}, {}, {})>".format(self.key, self.value, self.get_color(), self.size_tree)
@@ -37,7 +82,7 @@ class NodeRBT(object):
         Print all information of the node.
 
         """
-        if not self.parent and self.key:
+        if not self.parent and self is not NIL:
             print("######### ROOT #########")
         print("------------------------")
         print("key: %s" % self.key)
@@ -66,668 +111,2727 @@ class NodeRBT(object):
 
         """
         self.key = None
+        self.sort_key = None
         self.value = None
         self.parent = None
         self.left_child = None
         self.right_child = None
         self.color = BLACK
         self.size_tree = 0
+        self.aggregate = None
 
 
-class RedBlackTree(object):
-    def __init__(self):
-        self.root = NodeRBT(None, None, BLACK)
-
-    def __str__(self):
-        return "<class RedBlackTree of size {}>".format(self.root.size_tree)
-    __repr__ = __str__
+# shared black sentinel for all NULL leafs (CLRS), it is never modified and can be shared by all trees
+NIL = NodeRBT(None, None, BLACK)
 
-    def __iter__(self):
-        """
-        Initialization of for loop.
 
-        """
-        self.pointer = 0
-        return self
+def sort_key_function(key=None, cmp=None):
+    """
+    Return the function deriving the sort key of a key like sorted() does, None for ordering the keys themselves.
+    Args:
+        key: function of one key, returning its sort key
+        cmp: old-style comparison function of two keys, returning a negative number, zero or a positive number
 
-    def __next__(self):
-        """
-        Next item of for loop.
+    """
+    if key is not None and cmp is not None:
+        raise ValueError("Give either a key function or a comparison function, not both!")
 
-        """
-        self.pointer += 1
-        if self.pointer > self.root.size_tree:
-            raise StopIteration
+    return functools.cmp_to_key(cmp) if cmp is not None else key
 
-        return self.select(self.pointer)
 
-    def __getitem__(self, item):
+class Monoid(object):
+    def __init__(self, combine, identity, measure=None):
         """
-        Make class as a list, return the node with ith smallest key.
+        Augmentation of a RedBlackTree, every node keeps the aggregate of its subtree in NodeRBT.aggregate.
         Args:
-            item: index of the list
+            combine: associative function of two aggregates, called in ascending order of the keys
+            identity: aggregate of an empty subtree, combine(identity, a) == combine(a, identity) == a
+            measure: function (key, value) -> aggregate of a single node, None for the value itself. For the
+                duplicate policy 'multimap', the measures of all values of a node are combined.
 
         """
-        return self.select(item)
+        self.combine = combine
+        self.identity = identity
+        self.measure = measure if measure else lambda key, value: value
 
-    @property
-    def size(self):
-        """
-        Return the size of the tree.
+    def __str__(self):
+        return "<class Monoid ({}, {})>".format(getattr(self.combine, '__name__', self.combine), self.identity)
+    __repr__ = __str__
 
-        """
-        return self.root.size_tree
 
-    def __compare(self, key=None, method='compare', source=None, print_path=False):
+# common augmentations over the values
+SUM = Monoid(operator.add, 0)
+MIN = Monoid(min, float('inf'))
+MAX = Monoid(max, float('-inf'))
+
+
+class RedBlackTreeIterator(object):
+    def __init__(self, tree, reverse=False, lo=None, hi=None, inclusive=(True, True)):
         """
-        Main compare function to go through a path.
+        In-order iterator over the nodes of a tree. Each iterator keeps its own stack of pending nodes,
+        so several iterators can walk the same tree at the same time.
         Args:
-            key: input key to search
-            method:
-                - 'compare' for basic insertion
-                - 'search' for search for a certain key
-                - 'min' for search for min key
-                - 'max' for search for max key
-            source: source node, only for recursion
-            print_path: True for printing the searching path, and vice versa
+            tree: class RedBlackTree
+            reverse: True for descending order, False for ascending order
+            lo: lower bound of the sort keys, None for no lower bound
+            hi: upper bound of the sort keys, None for no upper bound
+            inclusive: tuple of two booleans, whether lo and hi themselves are included
 
-        Returns:
-            parent_node: parent node of the compare node
-            compare_node: the final node when the search ends, None for 'compare', target node for the other nodes
+        """
+        self.reverse = reverse
+        self.lo = lo
+        self.hi = hi
+        self.inclusive = inclusive
+        self.stack = []
+        self.__push_path(tree.root)
+
+    def __iter__(self):
+        return self
 
+    def __next__(self):
         """
-        compare_node = source if source else self.root
-        parent_node = None
+        Return the next node. Amortized O(1), every node is pushed and popped at most once.
 
-        while compare_node.key:
-            parent_node = compare_node
+        """
+        if not self.stack:
+            raise StopIteration
 
-            # method search
-            if method == 'search':
-                if parent_node.key == key:
-                    # when the method is search, compare_node is the result
-                    parent_node = parent_node.parent
-                    break
+        node = self.stack.pop()
+        if self.__past_end(node.sort_key):
+            self.stack = []
+            raise StopIteration
 
-            # for method compare and search
-            if method == 'compare' or method == 'search':
-                compare_node = parent_node.left_child if key <= parent_node.key else parent_node.right_child
+        self.__push_path(node.left_child if self.reverse else node.right_child)
 
-            # method min
-            if method == 'min':
-                compare_node = parent_node.left_child
+        return node
 
-            # method max
-            if method == 'max':
-                compare_node = parent_node.right_child
+    def __below_lo(self, key):
+        return self.lo is not None and (key < self.lo or (key == self.lo and not self.inclusive[0]))
 
-            if print_path:
-                try:
-                    root_string = "(root)" if not parent_node.parent else ""
-                    print(root_string + "({}, {}, {}) -> ({}, {}, {})".format(
-                        parent_node.key, parent_node.value, parent_node.get_color(),
-                        compare_node.key, compare_node.value, compare_node.get_color()))
-                except AttributeError:
-                    pass
+    def __above_hi(self, key):
+        return self.hi is not None and (key > self.hi or (key == self.hi and not self.inclusive[1]))
 
-        return parent_node, compare_node
+    def __before_start(self, key):
+        return self.__above_hi(key) if self.reverse else self.__below_lo(key)
 
-    def __rotation(self, node, right_rotation=False):
+    def __past_end(self, key):
+        return self.__below_lo(key) if self.reverse else self.__above_hi(key)
+
+    def __push_path(self, node):
         """
-        Rotate around a certain node.
+        Push the node and its left (right when reversed) spine onto the stack, skipping the nodes before the start
+        bound. Only the subtrees that may contain keys inside the bounds are entered.
         Args:
-            node: the node to be rotated, class NodeRBT
-            right_rotation: True for right rotation, False for left rotation
+            node: root of the subtree to be visited next
 
         """
-        # left rotation
-        if not right_rotation:
-            # update parent
-            parent = node.parent
-            neighbor = node.right_child
-            if parent:
-                if node.key <= parent.key:
-                    parent.left_child = neighbor
-                else:
-                    parent.right_child = node.right_child
-            # if no parent, means the grandparent node is the root
+        while node is not NIL:
+            if self.__before_start(node.sort_key):
+                node = node.left_child if self.reverse else node.right_child
             else:
-                self.root = neighbor
+                self.stack.append(node)
+                node = node.right_child if self.reverse else node.left_child
 
-            # update node
-            node.parent = neighbor
-            node.right_child = neighbor.left_child
 
-            # update child tree of neighbor
-            if neighbor.key:
-                neighbor.left_child.parent = node
+class RedBlackTreeView(object):
+    def __init__(self, tree, kind):
+        """
+        Iterable view over the keys, values or (key, value) items of a tree.
+        Args:
+            tree: class RedBlackTree, or any tree supporting iter() and reversed() over its nodes
+            kind: 'keys', 'values' or 'items'
 
-            # update neighbor
-            neighbor.parent = parent
-            neighbor.left_child = node
+        """
+        self.tree = tree
+        self.kind = kind
 
-            # correct size of tree
-            node.size_tree -= neighbor.size_tree
-            if node.right_child:
-                node.size_tree += node.right_child.size_tree
-                neighbor.size_tree -= node.right_child.size_tree
-            neighbor.size_tree += node.size_tree
+    def __str__(self):
+        return "<class RedBlackTreeView ({}) of size {}>".format(self.kind, len(self))
+    __repr__ = __str__
 
-        # right rotation
-        else:
-            # update parent
-            parent = node.parent
-            neighbor = node.left_child
-            if parent:
-                if node.key <= parent.key:
-                    parent.left_child = neighbor
-                else:
-                    parent.right_child = node.left_child
-            else:
-                self.root = neighbor
+    def __len__(self):
+        return self.tree.size
 
-            # update node
-            node.parent = neighbor
-            node.left_child = neighbor.right_child
+    def __iter__(self):
+        return self.__project(iter(self.tree))
 
-            # update child tree of neighbor
-            if neighbor.key:
-                neighbor.right_child.parent = node
+    def __reversed__(self):
+        return self.__project(reversed(self.tree))
 
-            # update neighbor
-            neighbor.parent = parent
-            neighbor.right_child = node
+    def __project(self, iterator):
+        """
+        Map the nodes of an iterator to keys, values or items.
+
+        """
+        if self.kind == 'keys':
+            return (node.key for node in iterator)
+        elif self.kind == 'values':
+            return (node.value for node in iterator)
+        else:
+            return ((node.key, node.value) for node in iterator)
 
-            # correct size of tree
-            node.size_tree -= neighbor.size_tree
-            if node.left_child:
-                node.size_tree += node.left_child.size_tree
-                neighbor.size_tree -= node.left_child.size_tree
-            neighbor.size_tree += node.size_tree
 
-    def __fix_double_reds(self, node):
+class Cursor(object):
+    def __init__(self, tree, node=None):
         """
-        Method to fix the problem of double reds.
+        A position in a tree, for walking and changing it near the current node without searching from the root.
+        The position is None when the cursor is off the ends, next then goes to the smallest node and prev to the
+        largest. Deleting the current node other than by the cursor invalidates the cursor.
         Args:
-            node: the underlying red node, i.e. its parent is also red
+            tree: class RedBlackTree
+            node: the current node, None for off the ends
 
         """
-        grand_parent_node = node.parent.parent
-        parent_node = node.parent
+        self.tree = tree
+        self.node = node
 
-        if grand_parent_node.left_child.color == grand_parent_node.right_child.color:
-            uncle_node_red = True
-        else:
-            uncle_node_red = False
+    def __str__(self):
+        return "<class Cursor at {}>".format(self.node.get_info_in_tuple() if self.node else None)
+    __repr__ = __str__
+
+    @property
+    def key(self):
+        return self.node.key if self.node else None
 
-        # Case 3.1: uncle node is RED
-        if uncle_node_red:
-            grand_parent_node.left_child.color = BLACK
-            grand_parent_node.right_child.color = BLACK
-            grand_parent_node.color = RED
+    @property
+    def value(self):
+        return self.node.value if self.node else None
 
-            # if the grand parent node is the root, change color to BLACK
-            if not grand_parent_node.parent:
-                grand_parent_node.color = BLACK
+    def next(self):
+        """
+        Move to the successor in amortized O(1).
 
-            else:
-                # detect whether the new two-red problem comes up
-                if grand_parent_node.parent.color == RED:
-                    self.__fix_double_reds(grand_parent_node)
+        Returns:
+            node: the new current node, None past the largest node
 
-        # Case 3.2: uncle node is BLACK
+        """
+        node = self.node
+        if node is None:
+            node = self.tree.root
+            if node is NIL:
+                return None
+            while node.left_child is not NIL:
+                node = node.left_child
+        elif node.right_child is not NIL:
+            node = node.right_child
+            while node.left_child is not NIL:
+                node = node.left_child
         else:
-            # Case 3.2.1: need first a local rotation
-            if (node.key <= parent_node.key) != (parent_node.key <= grand_parent_node.key):
-                self.__rotation(parent_node, right_rotation=(node.key <= parent_node.key))
-                node = parent_node
-                parent_node = parent_node.parent
+            while node.parent and node is node.parent.right_child:
+                node = node.parent
+            node = node.parent
 
-            # Case 3.2.2: no need for a local rotation
-            self.__rotation(grand_parent_node, right_rotation=(parent_node.key <= grand_parent_node.key))
-            parent_node.color = BLACK
-            grand_parent_node.color = RED
+        self.node = node
+        return node
 
-    def __delete_check(self, node):
+    def prev(self):
         """
-        Method to check the problem during deletion.
-        Args:
-            node: problem node during deletion
+        Move to the predecessor in amortized O(1).
+
+        Returns:
+            node: the new current node, None before the smallest node
 
         """
-        # Case 1: the node is the root
-        if not node.parent:
-            node.color = BLACK
+        node = self.node
+        if node is None:
+            node = self.tree.root
+            if node is NIL:
+                return None
+            while node.right_child is not NIL:
+                node = node.right_child
+        elif node.left_child is not NIL:
+            node = node.left_child
+            while node.right_child is not NIL:
+                node = node.right_child
         else:
-            parent = node.parent
-            # if the node is a null leaf node, then the cousin node is the right child node of parent node
-            if node.key:
-                cousin = parent.left_child if node.key > parent.key else parent.right_child
-            else:
-                if not node.parent.left_child.key:
-                    cousin = parent.right_child
-                else:
-                    cousin = parent.left_child
-
-            # Case 2: the cousin node is red
-            if cousin.color == RED:
-                if parent.left_child == cousin:
-                    right_rotation = True
-                else:
-                    right_rotation = False
-                self.__rotation(parent, right_rotation)
-                cousin.color = BLACK
-                parent.color = RED
-                self.__delete_check(node)
-
-            else:
-                if node.key:
-                    outer_child = cousin.left_child if node.key > parent.key else cousin.right_child
-                    inner_child = cousin.right_child if node.key > parent.key else cousin.left_child
-                else:
-                    if not node.parent.left_child.key:
-                        outer_child = cousin.right_child
-                        inner_child = cousin.left_child
-                    else:
-                        outer_child = cousin.left_child
-                        inner_child = cousin.right_child
-
-                # Case 3: the cousin node is black, its outer child node is red
-                if outer_child and outer_child.color == RED:
-                    if node.key:
-                        self.__rotation(parent, node.key > parent.key)
-                    else:
-                        if not node.parent.right_child.key:
-                            self.__rotation(parent, right_rotation=True)
-                        else:
-                            self.__rotation(parent)
-
-                    outer_child.color = BLACK
-                    cousin.color = parent.color
-                    parent.color = BLACK
-
-                # Case 4: the cousin node is black, its inner child node is red
-                elif inner_child and inner_child.color == RED:
-                    if parent.right_child == cousin:
-                        right_rotation = True
-                    else:
-                        right_rotation = False
-                    self.__rotation(cousin, right_rotation)
-                    inner_child.color = BLACK
-                    cousin.color = RED
-                    self.__delete_check(node)
-
-                # Case 5: the cousin node and its children nodes are black, the parent node is red
-                elif parent.color == RED:
-                    parent.color = BLACK
-                    cousin.color = RED
-
-                # Case 6: the cousin node and its children nodes are black, the parent node is also black
-                elif parent.color == BLACK:
-                    cousin.color = RED
-                    self.__delete_check(parent)
+            while node.parent and node is node.parent.left_child:
+                node = node.parent
+            node = node.parent
 
-                else:
-                    raise IndexError("Unknown delete case detected!")
+        self.node = node
+        return node
 
-    def __update_size_tree(self, node, delete=False):
+    def seek(self, key):
         """
-        Update the parameter size_tree of all nodes along the path.
+        Move to the first node with a key not smaller than the given key. The search goes up from the current node
+        only until the subtree must contain the result, O(log d) for a distance of d nodes.
         Args:
-            node: the end node of the path to be updated
-            delete: True for decreasing, False for increasing
+            key: the key to seek
+
+        Returns:
+            node: the new current node, None if all keys are smaller
 
         """
-        if not delete:
-            node.size_tree += 1
-            while node.parent:
+        key = self.tree.sort_key(key)
+        node = self.node
+        candidate = None
+        if node is None:
+            node = self.tree.root
+        elif node.sort_key < key:
+            # the subtree of a left child is bounded by its parent, the result is inside or the parent itself
+            while node.parent and not (node is node.parent.left_child and node.parent.sort_key >= key):
                 node = node.parent
-                node.size_tree += 1
+            candidate = node.parent
         else:
-            node.size_tree -= 1
-            while node.parent:
+            # the subtree of a right child is bounded by its parent, the result is inside
+            while node.parent and not (node is node.parent.right_child and node.parent.sort_key < key):
                 node = node.parent
-                node.size_tree -= 1
 
-    def __swap_kv(self, node1, node2):
-        """
-        Swap key-value pair of two node.
+        while node is not NIL:
+            if node.sort_key >= key:
+                candidate = node
+                node = node.left_child
+            else:
+                node = node.right_child
 
-        Args:
-            node1: class NodeRBT
-            node2: class NodeRBT
+        self.node = candidate
+        return candidate
 
+    def insert(self, key, value):
         """
-        node1.key, node2.key = node2.key, node1.key
-        node1.value, node2.value = node2.value, node1.value
+        Insert a node, searching its position from the current node, and move to it. O(log d) for a distance of d
+        nodes plus the amortized O(1) fixup.
 
-    def __check_node(self, node):
-        """
-        Check whether a node exists.
-        Args:
-            node: class NodeRBT
+        Returns:
+            node: the inserted node
 
         """
-        if not node or not node.key:
-            raise IndexError("Node doesn't exist!")
+        self.node = self.tree.insert(key, value, finger=self.node)
+        return self.node
 
-    def check_balance(self, output_information=True):
+    def delete(self):
         """
-        Check whether the tree is balance, i.e. all paths have the same number of black nodes along the path.
+        Delete the current node without any search and move to its successor.
+
+        Returns:
+            node: the new current node, None if the deleted node was the largest one
 
         """
-        size_tree = self.root.size_tree
-        num_black_nodes_ref = 0
-
-        # calculate the number of black nodes on the path to the node with the smallest key
-        pointer = self.root
-        while pointer.key:
-            if pointer.color == BLACK:
-                num_black_nodes_ref += 1
-            pointer = pointer.left_child
-
-        for i in range(1, size_tree + 1):
-            node = self.select(i)
-            # check every end node whether the numbers of black nodes are same
-            if not node.left_child.key or not node.right_child.key:
-                num_black_nodes = 0
-                pointer = node
-                while pointer.parent:
-                    if pointer.color == BLACK:
-                        num_black_nodes += 1
-                    pointer = pointer.parent
-
-                # add one because of root
-                num_black_nodes += 1
-                if num_black_nodes != num_black_nodes_ref:
-                    raise ValueError("The tree is not balance!")
+        node = self.node
+        if node is None:
+            raise IndexError("The cursor is not at a node!")
+        successor = self.next()
+        self.tree.delete_node(node)
+        self.node = successor
+        return successor
 
-        if output_information:
-            print("Balance test success!")
 
-    def check_color(self, output_information=True):
+class InvariantReport(object):
+    def __init__(self):
         """
-        Check whether the color of the tree is correct, including root check and check of double reds.
+        Result of RedBlackTree.check_invariants.
+        Attributes:
+            violations: list of (kind, key, message), kind is one of 'root_color', 'double_red', 'black_height',
+                'order', 'size_tree', 'parent' and 'aggregate', key is the key of the node where the violation was found
+            nodes_checked: number of nodes visited
+            black_height: number of black nodes on every path from the root to a leaf, None if unbalanced
 
         """
-        size_tree = self.root.size_tree
-        for i in range(1, size_tree + 1):
-            node = self.select(i)
-            # check from every end node
-            if node.size_tree == 1:
-                pointer = node
-                while pointer.parent:
-                    if pointer.color == RED and pointer.parent.color == RED:
-                        raise ValueError("The tree has double red!")
-                    pointer = pointer.parent
+        self.violations = []
+        self.nodes_checked = 0
+        self.black_height = None
 
-                if pointer.color != BLACK:
-                    raise ValueError("The root is not black!")
-
-        if output_information:
-            print("Color test success!")
+    def __str__(self):
+        return "<class InvariantReport ({} nodes checked, {} violations)>".format(
+            self.nodes_checked, len(self.violations))
+    __repr__ = __str__
 
-    def check_all(self, output_information=True):
+    def __bool__(self):
         """
-        Check balance and the color of the tree.
-        Args:
-            output_information: True for printing the success message, and vice versa
+        True if no violation was found.
 
         """
-        self.check_balance(output_information)
-        self.check_color(output_information)
+        return not self.violations
 
-    def get_node(self, key, print_path=False):
+    def kinds(self):
         """
-        Get the node with the given key.
-        Args:
-            key: the key of the node
-            print_path: True for printing the searching path, and vice versa
-
-        Returns:
-            search_node: class NodeRBT
+        Return the set of kinds of all violations.
 
         """
-        parent_node, search_node = self.__compare(key, method='search', print_path=print_path)
-        self.__check_node(search_node)
+        return {kind for kind, _, _ in self.violations}
 
-        return search_node
 
-    def search(self, key, print_path=False):
+class RedBlackTree(object):
+    def __init__(self, augmentation=None, duplicates='allow', key=None, cmp=None):
         """
-        Search for a certain key. Print the information of the node.
         Args:
-            key: the key of the node to be searched
-            print_path: True for printing the searching path, and vice versa
+            augmentation: class Monoid kept as NodeRBT.aggregate of every subtree for aggregate, None for no aggregates
+            duplicates: policy for inserting an existing key, one of DUPLICATE_POLICIES
+            key: function deriving the sort key of a key like in sorted(), computed once per node and cached as
+                NodeRBT.sort_key, None for ordering the keys themselves. Keys with equal sort keys count as equal.
+            cmp: comparison function of two keys instead of a key function, see functools.cmp_to_key
 
         """
-        _, search_node = self.__compare(key, method='search', print_path=print_path)
-        if not search_node.key:
-            print("Node doesn't exist!")
-        else:
-            print("ID: {}\nValue: {}\nColor: {}".format(search_node.key, search_node.value, search_node.get_color()))
+        if duplicates not in DUPLICATE_POLICIES:
+            raise ValueError("The duplicate policy must be one of {}!".format(DUPLICATE_POLICIES))
+
+        self.root = NIL
+        self.augmentation = augmentation
+        self.duplicates = duplicates
+        self.key_function = sort_key_function(key, cmp)
+        # nodes with the smallest and largest key, NIL if empty, None if unknown after relinking the whole tree
+        self.min_node = None
+        self.max_node = None
+        # instrumentation, see enable_stats and set_timing_hook
+        self.counters = None
+        self.timing_hook = None
+        self.instrumented = []
 
-    def select(self, index, source=None):
+    def __str__(self):
+        return "<class RedBlackTree of size {}>".format(self.root.size_tree)
+    __repr__ = __str__
+
+    @classmethod
+    def build_from_sorted(cls, items, key=None, cmp=None, augmentation=None, duplicates='allow'):
         """
-        Select a certain index of node in an ascending order, i.e. return the node with the ith smallest key.
+        Build a tree from (key, value) pairs in ascending order of keys in O(n), without any comparison,
+        rotation or recoloring. The tree is perfectly balanced, only the nodes on its deepest level are red.
+        Equal keys are merged by the duplicate policy as if the items were inserted in the given order.
         Args:
-            index: ith smallest key
+            items: iterable of (key, value) pairs, sorted by key
+            key: key function of the tree, see RedBlackTree
+            cmp: comparison function of the tree, see RedBlackTree
+            augmentation: augmentation of the tree, see RedBlackTree, the aggregates are computed bottom-up
+            duplicates: duplicate policy of the tree, see RedBlackTree
 
         Returns:
-            check_node: the result of selection, class NodeRBT
+            tree: class RedBlackTree
 
         """
-        if index > self.root.size_tree or index <= 0:
-            raise IndexError("The index is out of range!")
+        tree = cls(augmentation=augmentation, duplicates=duplicates, key=key, cmp=cmp)
+        nodes = [tree.__new_node(item_key, value) for item_key, value in items]
+        for i in range(1, len(nodes)):
+            if nodes[i].sort_key < nodes[i - 1].sort_key:
+                raise ValueError("The items are not sorted!")
 
-        check_node = self.root if not source else source
-
-        while True:
-            size_left_tree = check_node.left_child.size_tree
-            if size_left_tree == index - 1:
-                break
-            elif size_left_tree >= index:
-                check_node = check_node.left_child
-            else:
-                check_node = self.select(index - size_left_tree - 1, source=check_node.right_child)
-                break
+        tree.__link_sorted(tree.__merge_duplicates(nodes))
 
-        return check_node
+        return tree
 
-    def get_predecessor(self, key):
+    @classmethod
+    def from_items(cls, items, presorted=False, key=None, cmp=None, augmentation=None, duplicates='allow'):
         """
-        Get the predecessor the of given node.
+        Build a tree from (key, value) pairs. Unsorted input is sorted by key first, O(n log n).
         Args:
-            key: the key of the node to be searched
+            items: iterable of (key, value) pairs
+            presorted: True if the items are already sorted by key, then the tree is built in O(n)
+            key: key function of the tree, see RedBlackTree
+            cmp: comparison function of the tree, see RedBlackTree
+            augmentation: augmentation of the tree, see RedBlackTree
+            duplicates: duplicate policy of the tree, see RedBlackTree, equal keys are merged in the given order
 
         Returns:
-            pred_node: predecessor of the node, class NodeRBT
+            tree: class RedBlackTree
 
         """
-        parent_node, search_node = self.__compare(key, method='search')
-        self.__check_node(search_node)
-
-        # if the node has a left tree
-        if search_node.left_child.key:
-            pred_node, _ = self.__compare(method='max', source=search_node.left_child)
-
-        # if the node has no left tree
-        else:
-            while search_node.key < parent_node.key:
-                search_node = parent_node
-                parent_node = parent_node.parent
+        if presorted:
+            return cls.build_from_sorted(items, key=key, cmp=cmp, augmentation=augmentation, duplicates=duplicates)
 
-                # if it reaches the root, means there is no predecessor
-                if not parent_node:
-                    return NodeRBT(None, None)
+        tree = cls(augmentation=augmentation, duplicates=duplicates, key=key, cmp=cmp)
+        # the nodes are sorted by their cached sort keys, so the key function runs once per item,
+        # the sort is stable, so equal keys keep the given order
+        nodes = sorted((tree.__new_node(item_key, value) for item_key, value in items), key=SORT_KEY)
+        tree.__link_sorted(tree.__merge_duplicates(nodes))
 
-            pred_node = parent_node
-
-        return pred_node
+        return tree
 
-    def get_successor(self, key):
+    @classmethod
+    def parallel_build(cls, items, workers=None, key=None, cmp=None, augmentation=None, duplicates='allow'):
         """
-        Get the successor the of given node.
+        Build a tree from (key, value) pairs on several cores. The keys are sent to a pool of worker processes as
+        one compact column, every worker sorts the keys of one range between sampled splitters and sends back the
+        sorted order of their indices. Every sorted range is linked into a balanced piece while the workers still
+        sort the next ones, and the pieces are concatenated by black height in O(log n) each. Only the sort runs in
+        parallel: the nodes must be created and linked in this process, and the sort is only about a fifth to a third
+        of from_items. So the build is at most about 1.3 times as fast as from_items however many cores there are,
+        and slower on a single core.
+        Small inputs and a single worker fall back to from_items.
         Args:
-            key: the key of the node to be searched
+            items: iterable of (key, value) pairs, the keys must be picklable
+            workers: number of worker processes, None for os.cpu_count()
+            key: key function of the tree, see RedBlackTree, must be picklable, e.g. not a lambda
+            cmp: comparison function of the tree, see RedBlackTree, must be picklable
+            augmentation: augmentation of the tree, see RedBlackTree
+            duplicates: duplicate policy of the tree, see RedBlackTree, equal keys are merged in the given order
 
         Returns:
-            succ_node: successor of the node, class NodeRBT
+            tree: class RedBlackTree
 
         """
-        parent_node, search_node = self.__compare(key, method='search')
-        self.__check_node(search_node)
-
-        if search_node.right_child.key:
-            succ_node, _ = self.__compare(method='min', source=search_node.right_child)
-        else:
-            while search_node.key > parent_node.key:
-                search_node = parent_node
-                parent_node = parent_node.parent
+        # imported here, ParallelBuild imports this module
+        from ParallelBuild import MIN_PARALLEL_SIZE, sorted_partitions
+        items = items if isinstance(items, list) else list(items)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(items) < MIN_PARALLEL_SIZE:
+            return cls.from_items(items, key=key, cmp=cmp, augmentation=augmentation, duplicates=duplicates)
+
+        tree = None
+        # equal keys fall into the same partition, so they are merged inside one piece
+        for order, sort_keys in sorted_partitions(items, workers, key=key, cmp=cmp):
+            piece = cls(augmentation=augmentation, duplicates=duplicates, key=key, cmp=cmp)
+            if sort_keys is None:
+                nodes = [piece.__new_node(*items[index]) for index in order]
+            else:
+                # the sort keys computed by the worker are reused
+                nodes = [NodeRBT(*items[index]) for index in order]
+                for node, sort_key in zip(nodes, sort_keys):
+                    piece.check_key(node.key)
+                    node.sort_key = sort_key
+            piece.__link_sorted(piece.__merge_duplicates(nodes))
+            tree = piece if tree is None else cls.concatenate(tree, piece)
 
-                # if it reaches the root, means there is no predecessor
-                if not parent_node:
-                    return NodeRBT(None, None)
+        return tree
 
-            succ_node = parent_node
+    def check_key(self, key):
+        """
+        Raise ValueError for a key the tree can't hold. Every node made by the builders, load and join goes through it. RedBlackTree accepts every key, subclasses like IntervalTree override it.
 
-        return succ_node
+        """
 
-    def insert(self, key, value):
+    def __new_node(self, key, value, color=BLACK):
         """
-        Insert a node with key and value.
-        Args:
-            key: key of the node to be inserted
-            value: value of the node to be inserted
+        Return a new node of a checked key, whose sort key is derived from its key by the key function of the tree.
 
         """
-        insert_node = NodeRBT(key, value, color=RED)
+        self.check_key(key)
+        node = NodeRBT(key, value, color)
+        if self.key_function is not None:
+            node.sort_key = self.key_function(key)
 
-        parent_node, _ = self.__compare(key)
+        return node
 
-        # Case 1: root node
-        # if no parent_node, means the insert node is the root
-        if not parent_node:
-            self.root = insert_node
-            self.root.color = BLACK
-            self.root.left_child = NodeRBT(None, None)
-            self.root.right_child = NodeRBT(None, None)
+    def __merge_duplicates(self, nodes):
+        """
+        Merge the nodes of equal keys in a sorted list by the duplicate policy, as if they were inserted in the
+        order of the list. O(n).
 
-        else:
-            insert_node.parent = parent_node
-            insert_node.left_child = NodeRBT(None, None)
-            insert_node.right_child = NodeRBT(None, None)
-            if key <= parent_node.key:
-                parent_node.left_child = insert_node
-            else:
-                parent_node.right_child = insert_node
+        Returns:
+            nodes: list of NodeRBT, with unique keys unless the policy is 'allow'
 
-            # Case 2: parent node is BLACK, do nothing
-            if parent_node.color == BLACK:
-                pass
-            # Case 3: parent node is RED, solve the two-red problem
+        """
+        duplicates = self.duplicates
+        if duplicates == 'allow':
+            return nodes
+
+        merged = []
+        for node in nodes:
+            if merged and merged[-1].sort_key == node.sort_key:
+                if duplicates == 'reject':
+                    raise ValueError("The key {} already exists!".format(node.key))
+                elif duplicates == 'overwrite':
+                    merged[-1].value = node.value
+                else:
+                    merged[-1].value.append(node.value)
             else:
-                self.__fix_double_reds(insert_node)
+                if duplicates == 'multimap':
+                    node.value = deque([node.value])
+                merged.append(node)
 
-        # update the size of tree
-        self.__update_size_tree(insert_node)
+        return merged
 
-    def delete(self, key):
+    def sort_key(self, key):
         """
-        Delete a node with the given key.
-        Args:
-            key: the key of the node to be deleted
+        Return the sort key of a key, which is compared with the NodeRBT.sort_key of the nodes.
 
         """
-        parent_node, search_node = self.__compare(key, method='search')
-        self.__check_node(search_node)
+        return key if self.key_function is None else self.key_function(key)
 
-        # Case 1: the node has no children nodes
-        if (not search_node.left_child.key) and (not search_node.right_child.key):
-            # update the size of tree
-            self.__update_size_tree(search_node, delete=True)
-            if parent_node:
-                if search_node.key <= parent_node.key:
-                    parent_node.left_child = search_node.left_child
-                else:
-                    parent_node.right_child = search_node.right_child       # left and right children are both empty
+    def __link_sorted(self, nodes):
+        """
+        Link the given nodes into a new perfectly balanced tree, replacing the current one. O(n).
+        Args:
+            nodes: list of NodeRBT, sorted by key
 
-                if search_node.color == BLACK:
-                    self.__delete_check(search_node)
+        """
+        # the deepest level is colored red, except that the root must always be black
+        red_depth = len(nodes).bit_length() - 1
+        self.root = self.__build_subtree(nodes, 0, len(nodes), None, 0, red_depth if red_depth > 0 else -1)
+        self.min_node = self.max_node = None
 
-            # if the parent node is None, means it's the root
-            else:
-                self.root = NodeRBT(None, None)
+    def __build_subtree(self, nodes, start, end, parent, depth, red_depth):
+        """
+        Recursively link nodes[start:end] into a subtree, the middle node becomes the root of the subtree.
+        Args:
+            nodes: list of NodeRBT, sorted by key
+            start: first index of the subtree
+            end: last index + 1 of the subtree
+            parent: parent node of the subtree, None for the root
+            depth: depth of the root of the subtree
+            red_depth: depth of the red level
 
-            search_node.reset()
+        Returns:
+            node: root of the subtree, NIL if the subtree is empty
 
-        # Case 2: the node has only one child node
-        elif bool(search_node.left_child.key) != bool(search_node.right_child.key):
-            self.__update_size_tree(search_node, delete=True)
-            child = search_node.left_child if search_node.left_child.key else search_node.right_child
+        """
+        if start >= end:
+            return NIL
+
+        middle = (start + end) // 2
+        node = nodes[middle]
+        node.color = RED if depth == red_depth else BLACK
+        node.parent = parent
+        node.size_tree = end - start
+        node.left_child = self.__build_subtree(nodes, start, middle, node, depth + 1, red_depth)
+        node.right_child = self.__build_subtree(nodes, middle + 1, end, node, depth + 1, red_depth)
+        if self.augmentation is not None:
+            self.__update_aggregate(node)
+
+        return node
+
+    def dump(self, path, structure=True):
+        """
+        Write the tree to a compact binary file: sorted keys and values in columns of int64, float, utf-8, bytes or
+        pickle, and optionally the shape and color bits. See MappedRedBlackTree.py for the layout.
+        Args:
+            path: path of the file
+            structure: True for writing the shape and colors, so that load rebuilds the very same tree
+
+        """
+        # imported here, MappedRedBlackTree imports this module
+        from MappedRedBlackTree import write_snapshot
+        write_snapshot(path, self, structure)
+
+    @classmethod
+    def load(cls, path, mmap=False, key=None, cmp=None, augmentation=None, duplicates='allow'):
+        """
+        Load a tree written by dump in O(n), without any comparison of keys if the file has the structure.
+        Args:
+            path: path of the file
+            mmap: True for a read-only MappedRedBlackTree answering queries straight from the mapped file,
+                False for building a tree, a file dumped by a tree with a key function can't be mapped
+            key: key function of the dumped tree, see RedBlackTree
+            cmp: comparison function of the dumped tree, see RedBlackTree
+            augmentation: augmentation of the tree, see RedBlackTree, the file has no aggregates, they are
+                computed bottom-up
+            duplicates: duplicate policy of the dumped tree, see RedBlackTree, the values are loaded as written,
+                e.g. the deques of 'multimap'
+
+        Returns:
+            tree: class RedBlackTree, or class MappedRedBlackTree if mmap
+
+        """
+        from MappedRedBlackTree import MappedRedBlackTree, read_snapshot, link_structure
+        if mmap:
+            if key is not None or cmp is not None:
+                raise ValueError("A mapped tree binary searches the keys themselves, it has no key function!")
+            if augmentation is not None:
+                raise ValueError("A mapped tree has no aggregates!")
+            return MappedRedBlackTree(path)
+
+        with open(path, 'rb') as file:
+            keys, values, structure, natural_order = read_snapshot(file.read())
+        if not natural_order and key is None and cmp is None:
+            raise ValueError("The snapshot is sorted by a key function, pass it as key or cmp!")
+        tree = cls(augmentation=augmentation, duplicates=duplicates, key=key, cmp=cmp)
+        nodes = [tree.__new_node(item_key, value) for item_key, value in zip(keys.tolist(), values.tolist())]
+        if not structure:
+            tree.__link_sorted(nodes)
+            return tree
+
+        tree.root = link_structure(nodes, *structure)
+        if tree.augmentation is not None:
+            tree.__build_aggregates(tree.root)
+        return tree
+
+    def __build_aggregates(self, node):
+        """
+        Compute the aggregates of all nodes of a subtree bottom-up, O(n).
+
+        """
+        if node is NIL:
+            return
+        self.__build_aggregates(node.left_child)
+        self.__build_aggregates(node.right_child)
+        self.__update_aggregate(node)
+
+    def __iter__(self):
+        """
+        Iterate over all nodes in ascending order of keys.
+
+        """
+        return RedBlackTreeIterator(self)
+
+    def __reversed__(self):
+        """
+        Iterate over all nodes in descending order of keys.
+
+        """
+        return RedBlackTreeIterator(self, reverse=True)
+
+    def keys(self):
+        """
+        Return a view of all keys in ascending order.
+
+        """
+        return RedBlackTreeView(self, 'keys')
+
+    def values(self):
+        """
+        Return a view of all values in ascending order of keys.
+
+        """
+        return RedBlackTreeView(self, 'values')
+
+    def items(self):
+        """
+        Return a view of all (key, value) pairs in ascending order of keys.
+
+        """
+        return RedBlackTreeView(self, 'items')
+
+    def __getitem__(self, item):
+        """
+        Make class as a list, return the node with ith smallest key.
+        Args:
+            item: index of the list
+
+        """
+        return self.select(item)
+
+    @property
+    def size(self):
+        """
+        Return the size of the tree.
+
+        """
+        return self.root.size_tree
+
+    def __len__(self):
+        return self.root.size_tree
+
+    def __contains__(self, key):
+        """
+        Return whether a node with the key exists, O(log n).
+
+        """
+        return self.__search(self.sort_key(key)) is not NIL
+
+    def get(self, key, default=None):
+        """
+        Return the value of a node with the key, or the default if it doesn't exist. O(log n).
+
+        """
+        node = self.__search(self.sort_key(key))
+        return default if node is NIL else node.value
+
+    def __search(self, sort_key):
+        """
+        Search for a certain key.
+        Args:
+            sort_key: sort key of the key to search
+
+        Returns:
+            search_node: the first node with the key on the path from the root, NIL if it doesn't exist
+
+        """
+        node = self.root
+        while node is not NIL:
+            node_key = node.sort_key
+            if sort_key == node_key:
+                return node
+            node = node.left_child if sort_key < node_key else node.right_child
+
+        return node
+
+    def __search_parent(self, sort_key, source=None):
+        """
+        Search for the parent node of the insertion position of a key.
+        Args:
+            sort_key: sort key of the key to be inserted
+            source: root of the subtree to search in, None for the root of the tree
+
+        Returns:
+            parent_node: parent node of the new node, None if the tree is empty
+
+        """
+        parent_node = None
+        node = source if source else self.root
+        while node is not NIL:
+            parent_node = node
+            node = node.left_child if sort_key <= node.sort_key else node.right_child
+
+        return parent_node
+
+    def __first_node(self, sort_key):
+        """
+        Search for the first node whose key is not smaller than a key, i.e. the lower bound of the key.
+        Args:
+            sort_key: sort key of the key to search
+
+        Returns:
+            (first_node, parent_node): the first node with a key not smaller than the key, NIL if there is none,
+                and the last node on the search path, the parent of a new node with the key, None if the tree is empty
+
+        """
+        first_node = NIL
+        parent_node = None
+        node = self.root
+        while node is not NIL:
+            parent_node = node
+            if sort_key <= node.sort_key:
+                first_node = node
+                node = node.left_child
+            else:
+                node = node.right_child
+
+        return first_node, parent_node
+
+    def __nodes(self):
+        """
+        Return the list of all nodes in ascending order of keys, several times faster than iterating over the tree.
+
+        """
+        nodes = []
+        stack = []
+        node = self.root
+        while True:
+            while node is not NIL:
+                stack.append(node)
+                node = node.left_child
+            if not stack:
+                return nodes
+            node = stack.pop()
+            nodes.append(node)
+            node = node.right_child
+
+    def __successor(self, node):
+        """
+        Return the next node in ascending order of keys, NIL after the largest node.
+
+        """
+        if node.right_child is not NIL:
+            return self.__min(node.right_child)
+        while node.parent and node is node.parent.right_child:
+            node = node.parent
+
+        return node.parent or NIL
+
+    def __predecessor(self, node):
+        """
+        Return the previous node in ascending order of keys, NIL before the smallest node.
+
+        """
+        if node.left_child is not NIL:
+            return self.__max(node.left_child)
+        while node.parent and node is node.parent.left_child:
+            node = node.parent
+
+        return node.parent or NIL
+
+    def __min(self, node):
+        """
+        Return the node with the smallest key in the subtree of a non-NIL node.
+
+        """
+        while node.left_child is not NIL:
+            node = node.left_child
+
+        return node
+
+    def __max(self, node):
+        """
+        Return the node with the largest key in the subtree of a non-NIL node.
+
+        """
+        while node.right_child is not NIL:
+            node = node.right_child
+
+        return node
+
+    def __print_path(self, key):
+        """
+        Print the searching path of a key, one edge per line.
+        Args:
+            key: input key to search
+
+        """
+        key = self.sort_key(key)
+        node = self.root
+        while node is not NIL and node.sort_key != key:
+            next_node = node.left_child if key < node.sort_key else node.right_child
+            root_string = "(root)" if not node.parent else ""
+            print(root_string + "({}, {}, {}) -> ({}, {}, {})".format(
+                node.key, node.value, node.get_color(), next_node.key, next_node.value, next_node.get_color()))
+            node = next_node
+
+    def __rotation(self, node, right_rotation=False):
+        """
+        Rotate around a certain node.
+        Args:
+            node: the node to be rotated, class NodeRBT
+            right_rotation: True for right rotation, False for left rotation
+
+        """
+        # left rotation
+        if not right_rotation:
+            # update parent
+            parent = node.parent
+            neighbor = node.right_child
+            if parent:
+                if parent.left_child is node:
+                    parent.left_child = neighbor
+                else:
+                    parent.right_child = neighbor
+            # if no parent, means the grandparent node is the root
+            else:
+                self.root = neighbor
+
+            # update node
+            node.parent = neighbor
+            node.right_child = neighbor.left_child
+
+            # update child tree of neighbor
+            if node.right_child is not NIL:
+                node.right_child.parent = node
+
+            # update neighbor
+            neighbor.parent = parent
+            neighbor.left_child = node
+
+        # right rotation
+        else:
+            # update parent
+            parent = node.parent
+            neighbor = node.left_child
+            if parent:
+                if parent.left_child is node:
+                    parent.left_child = neighbor
+                else:
+                    parent.right_child = neighbor
+            else:
+                self.root = neighbor
+
+            # update node
+            node.parent = neighbor
+            node.left_child = neighbor.right_child
+
+            # update child tree of neighbor
+            if node.left_child is not NIL:
+                node.left_child.parent = node
+
+            # update neighbor
+            neighbor.parent = parent
+            neighbor.right_child = node
+
+        # correct size of tree, the neighbor takes over the whole subtree
+        neighbor.size_tree = node.size_tree
+        node.size_tree = node.left_child.size_tree + node.right_child.size_tree + 1
+        if self.augmentation is not None:
+            neighbor.aggregate = node.aggregate
+            self.__update_aggregate(node)
+
+    def __fix_double_reds(self, node):
+        """
+        Method to fix the problem of double reds, going up the tree as long as the problem moves up.
+        Args:
+            node: the underlying red node, i.e. its parent is also red
+
+        Returns:
+            True if the root was recolored back to black, i.e. the black height of the tree grew by one
+
+        """
+        counters = self.counters
+        while True:
+            parent_node = node.parent
+            grand_parent_node = parent_node.parent
+
+            # Case 3.1: uncle node is RED, the parent is red, so both children of the grand parent have the same color
+            if grand_parent_node.left_child.color == grand_parent_node.right_child.color:
+                grand_parent_node.left_child.color = BLACK
+                grand_parent_node.right_child.color = BLACK
+                grand_parent_node.color = RED
+                if counters is not None:
+                    counters['insert_case_3_1'] += 1
+                    counters['recolorings'] += 3
+
+                # if the grand parent node is the root, change color to BLACK
+                if not grand_parent_node.parent:
+                    grand_parent_node.color = BLACK
+                    if counters is not None:
+                        counters['recolorings'] += 1
+                    return True
+
+                # detect whether the new two-red problem comes up
+                if grand_parent_node.parent.color != RED:
+                    return False
+                node = grand_parent_node
+
+            # Case 3.2: uncle node is BLACK
+            else:
+                parent_is_left = parent_node is grand_parent_node.left_child
+
+                # Case 3.2.1: need first a local rotation
+                if (node is parent_node.left_child) != parent_is_left:
+                    self.__rotation(parent_node, right_rotation=not parent_is_left)
+                    parent_node = node
+                    if counters is not None:
+                        counters['insert_case_3_2_1'] += 1
+
+                # Case 3.2.2: no need for a local rotation
+                self.__rotation(grand_parent_node, right_rotation=parent_is_left)
+                parent_node.color = BLACK
+                grand_parent_node.color = RED
+                if counters is not None:
+                    counters['insert_case_3_2_2'] += 1
+                    counters['recolorings'] += 2
+                return False
+
+    def __delete_check(self, node, parent):
+        """
+        Method to check the problem during deletion, going up the tree as long as the problem moves up.
+        Args:
+            node: problem node during deletion, i.e. the black node (maybe NIL) with one missing black
+            parent: parent node of the problem node, passed explicitly since NIL has no parent
+
+        """
+        counters = self.counters
+        while parent:
+            # the node and its cousin are identified by identity, which also works for NIL and duplicated keys
+            node_is_left = parent.left_child is node
+            cousin = parent.right_child if node_is_left else parent.left_child
+
+            # Case 2: the cousin node is red
+            if cousin.color == RED:
+                self.__rotation(parent, right_rotation=not node_is_left)
+                cousin.color = BLACK
+                parent.color = RED
+                if counters is not None:
+                    counters['delete_case_2'] += 1
+                    counters['recolorings'] += 2
+                continue
+
+            outer_child = cousin.right_child if node_is_left else cousin.left_child
+            inner_child = cousin.left_child if node_is_left else cousin.right_child
+
+            # Case 3: the cousin node is black, its outer child node is red
+            if outer_child.color == RED:
+                self.__rotation(parent, right_rotation=not node_is_left)
+                outer_child.color = BLACK
+                cousin.color = parent.color
+                parent.color = BLACK
+                if counters is not None:
+                    counters['delete_case_3'] += 1
+                    counters['recolorings'] += 3
+                return
+
+            # Case 4: the cousin node is black, its inner child node is red
+            elif inner_child.color == RED:
+                self.__rotation(cousin, right_rotation=node_is_left)
+                inner_child.color = BLACK
+                cousin.color = RED
+                if counters is not None:
+                    counters['delete_case_4'] += 1
+                    counters['recolorings'] += 2
+
+            # Case 5: the cousin node and its children nodes are black, the parent node is red
+            elif parent.color == RED:
+                parent.color = BLACK
+                cousin.color = RED
+                if counters is not None:
+                    counters['delete_case_5'] += 1
+                    counters['recolorings'] += 2
+                return
+
+            # Case 6: the cousin node and its children nodes are black, the parent node is also black
+            else:
+                cousin.color = RED
+                node = parent
+                parent = parent.parent
+                if counters is not None:
+                    counters['delete_case_6'] += 1
+                    counters['recolorings'] += 1
+
+        # Case 1: the node is the root, NIL as the root of an empty tree is already black
+        if node is not NIL:
+            node.color = BLACK
+        if counters is not None:
+            counters['delete_case_1'] += 1
+
+    def __update_size_tree(self, node, delete=False):
+        """
+        Update the parameter size_tree of all nodes along the path.
+        Args:
+            node: the end node of the path to be updated
+            delete: True for decreasing, False for increasing
+
+        """
+        step = -1 if delete else 1
+        while node:
+            node.size_tree += step
+            node = node.parent
+
+    def __refresh(self, nodes):
+        """
+        Recompute size_tree and the aggregates of the given nodes and all their ancestors once, bottom-up, after the
+        nodes were linked without updating their ancestors, or got new values. The rotations in between keep every
+        node right whose subtree holds none of the nodes, so only the union of their paths to the root is visited.
+        Args:
+            nodes: nodes of the tree
+
+        """
+        # mark the nodes on the paths by a size_tree of 0, which no linked node has, every path stops at a marked one
+        for node in nodes:
+            while node and node.size_tree:
+                node.size_tree = 0
+                node = node.parent
+        if self.root is not NIL and not self.root.size_tree:
+            self.__refresh_marked(self.root)
+
+    def __refresh_marked(self, node):
+        """
+        Recompute size_tree and the aggregates of the marked nodes of a subtree, children before their parent.
+
+        """
+        left, right = node.left_child, node.right_child
+        if left is not NIL and not left.size_tree:
+            self.__refresh_marked(left)
+        if right is not NIL and not right.size_tree:
+            self.__refresh_marked(right)
+        node.size_tree = left.size_tree + right.size_tree + 1
+        if self.augmentation is not None:
+            self.__update_aggregate(node)
+
+    def __measure(self, node):
+        """
+        Return the measure of a single node, folded over all values of the node for 'multimap'.
+
+        """
+        augmentation = self.augmentation
+        if self.duplicates == 'multimap':
+            return functools.reduce(augmentation.combine, (augmentation.measure(node.key, value) for value in node.value),
+                                    augmentation.identity)
+        return augmentation.measure(node.key, node.value)
+
+    def __update_aggregate(self, node):
+        """
+        Recompute the aggregate of a node from its children.
+
+        """
+        augmentation = self.augmentation
+        left, right = node.left_child, node.right_child
+        aggregate = self.__measure(node)
+        if left is not NIL:
+            aggregate = augmentation.combine(left.aggregate, aggregate)
+        if right is not NIL:
+            aggregate = augmentation.combine(aggregate, right.aggregate)
+        node.aggregate = aggregate
+
+    def __update_aggregates(self, node):
+        """
+        Recompute the aggregates of all nodes along the path from a node up to the root. Called right after a
+        node is linked or unlinked and before the fixups, whose rotations then keep the aggregates correct.
+
+        """
+        while node:
+            self.__update_aggregate(node)
+            node = node.parent
+
+    def __transplant(self, old_node, new_node):
+        """
+        Replace the subtree rooted at old_node by the subtree rooted at new_node.
+        Args:
+            old_node: class NodeRBT
+            new_node: class NodeRBT, maybe NIL
+
+        """
+        parent = old_node.parent
+        if not parent:
+            self.root = new_node
+        elif parent.left_child is old_node:
+            parent.left_child = new_node
+        else:
+            parent.right_child = new_node
+
+        if new_node is not NIL:
+            new_node.parent = parent
+
+    def __check_node(self, node):
+        """
+        Check whether a node exists.
+        Args:
+            node: class NodeRBT
+
+        """
+        if not node or node is NIL:
+            raise IndexError("Node doesn't exist!")
+
+    def check_invariants(self, stop_at_first=False):
+        """
+        Check all invariants of the tree in one post-order pass in O(n): root color, double reds, black height,
+        BST ordering, size_tree, parent pointers and the aggregates of the augmentation.
+        Args:
+            stop_at_first: True for returning right after the first violation, and vice versa
+
+        Returns:
+            report: class InvariantReport, evaluates to True if the tree is valid
+
+        """
+        report = InvariantReport()
+        violations = report.violations
+
+        root = self.root
+        if root is NIL:
+            report.black_height = 0
+            return report
+
+        if root.color != BLACK:
+            violations.append(('root_color', root.key, "The root is not black!"))
+        if root.parent is not None:
+            violations.append(('parent', root.key, "The root has a parent!"))
+        if violations and stop_at_first:
+            return report
+
+        # results of finished subtrees: (black height, size, min key, max key), a black height of None is unbalanced
+        results = []
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if node is NIL:
+                results.append((0, 0, None, None))
+                continue
+            if not children_done:
+                stack.append((node, True))
+                stack.append((node.right_child, False))
+                stack.append((node.left_child, False))
+                continue
+
+            right_height, right_size, right_min, right_max = results.pop()
+            left_height, left_size, left_min, left_max = results.pop()
+            left, right, key, sort_key = node.left_child, node.right_child, node.key, node.sort_key
+            report.nodes_checked += 1
+            num_violations = len(violations)
+
+            if (left is not NIL and left.parent is not node) or (right is not NIL and right.parent is not node):
+                violations.append(('parent', key, "A child of {} has a wrong parent!".format(key)))
+            if node.color == RED and (left.color == RED or right.color == RED):
+                violations.append(('double_red', key, "The tree has double red at {}!".format(key)))
+            if left_height is None or right_height is None or left_height != right_height:
+                if left_height is not None and right_height is not None:
+                    violations.append(('black_height', key, "The tree is not balance at {}!".format(key)))
+                height = None
+            else:
+                height = left_height + (node.color == BLACK)
+            if (left_max is not None and left_max > sort_key) or (right_min is not None and right_min < sort_key):
+                violations.append(('order', key, "The keys are not in order at {}!".format(key)))
+            size = left_size + right_size + 1
+            if node.size_tree != size:
+                violations.append(('size_tree', key, "The size_tree of {} is {} instead of {}!".format(
+                    key, node.size_tree, size)))
+            if self.augmentation is not None:
+                aggregate = node.aggregate
+                self.__update_aggregate(node)
+                if node.aggregate != aggregate:
+                    violations.append(('aggregate', key, "The aggregate of {} is {} instead of {}!".format(
+                        key, aggregate, node.aggregate)))
+                    node.aggregate = aggregate
+
+            if stop_at_first and len(violations) > num_violations:
+                return report
+            results.append((height, size, sort_key if left_min is None else left_min,
+                            sort_key if right_max is None else right_max))
+
+        report.black_height = results[0][0]
+        return report
+
+    def __raise_violation(self, kinds):
+        """
+        Raise a ValueError for the first violation of the given kinds, if any.
+
+        """
+        for kind, _, message in self.check_invariants().violations:
+            if kind in kinds:
+                raise ValueError(message)
+
+    def check_balance(self, output_information=True):
+        """
+        Check whether the tree is balance, i.e. all paths have the same number of black nodes along the path.
+
+        """
+        self.__raise_violation({'black_height'})
+
+        if output_information:
+            print("Balance test success!")
+
+    def check_color(self, output_information=True):
+        """
+        Check whether the color of the tree is correct, including root check and check of double reds.
+
+        """
+        self.__raise_violation({'root_color', 'double_red'})
+
+        if output_information:
+            print("Color test success!")
+
+    def check_all(self, output_information=True):
+        """
+        Check all invariants of the tree in one pass, see check_invariants.
+        Args:
+            output_information: True for printing the success message, and vice versa
+
+        """
+        report = self.check_invariants(stop_at_first=True)
+        if not report:
+            raise ValueError(report.violations[0][2])
+
+        if output_information:
+            print("Balance test success!")
+            print("Color test success!")
+
+    def enable_stats(self, enabled=True):
+        """
+        Turn the operation counters of stats on or off, and reset them. Disabled counters cost nothing, the
+        counting methods are only installed on the instance while enabled.
+        Args:
+            enabled: True for counting, and vice versa
+
+        """
+        self.counters = dict.fromkeys(STATS_COUNTERS, 0) if enabled else None
+        self.__instrument()
+
+    def stats(self):
+        """
+        Return the operation counters since enable_stats or reset_stats, empty if disabled.
+        comparisons: key comparisons of the searches, rotations_left/rotations_right: rotations,
+        recolorings: color changes during the fixups, size_tree_updates: nodes visited by the size_tree walks,
+        insert_case_*/delete_case_*: hits of the cases of the insert and delete fixups,
+        delete_red_child: deletions fixed by recoloring the child, nodes_allocated/nodes_freed: nodes added to the
+        tree by insert, insert_many and update, or removed by delete, delete_many and delete_range.
+
+        Returns:
+            stats: dict of counter name -> count
+
+        """
+        return dict(self.counters) if self.counters is not None else {}
+
+    def reset_stats(self):
+        """
+        Set all operation counters back to zero.
+
+        """
+        if self.counters is not None:
+            self.counters.update(dict.fromkeys(STATS_COUNTERS, 0))
+
+    def set_timing_hook(self, hook):
+        """
+        Call a function after every public operation of TIMED_OPERATIONS. Costs nothing without a hook.
+        Args:
+            hook: function hook(operation, seconds), None for removing the hook
+
+        """
+        self.timing_hook = hook
+        self.__instrument()
+
+    def __instrument(self):
+        """
+        Replace the methods of the instance by the counting and timing ones according to counters and timing_hook,
+        or restore the plain methods of the class.
+
+        """
+        for name in self.instrumented:
+            delattr(self, name)
+        plain_attributes = set(vars(self))
+
+        if self.counters is not None:
+            self.__search = self.__counted_search
+            self.__search_parent = self.__counted_search_parent
+            self.__rotation = self.__counted_rotation
+            self.__update_size_tree = self.__counted_update_size_tree
+        # operations called by other operations, e.g. insert_many by update, are part of the outermost one
+        running = [False]
+        for name in TIMED_OPERATIONS:
+            if self.timing_hook is not None or (self.counters is not None and name in SIZE_CHANGING_OPERATIONS):
+                setattr(self, name, self.__timed_operation(name, getattr(self, name), running))
+
+        self.instrumented = [name for name in vars(self) if name not in plain_attributes]
+
+    def __timed_operation(self, name, method, running):
+        """
+        Wrap a public operation for the timing hook and the counters of nodes allocated and freed.
+        Args:
+            name: name of the operation
+            method: the plain bound method
+            running: one element list shared by all wrappers of the tree, True during an operation
+
+        """
+        counters, hook = self.counters, self.timing_hook
+        count_nodes = counters is not None and name in SIZE_CHANGING_OPERATIONS
+
+        def timed_operation(*args, **kwargs):
+            if running[0]:
+                return method(*args, **kwargs)
+
+            running[0] = True
+            size = self.root.size_tree
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                running[0] = False
+                if hook is not None:
+                    hook(name, time.perf_counter() - start)
+                if count_nodes:
+                    change = self.root.size_tree - size
+                    counters['nodes_allocated' if change > 0 else 'nodes_freed'] += abs(change)
+
+        return timed_operation
+
+    def __counted_search(self, sort_key):
+        """
+        __search counting the key comparisons.
+
+        """
+        comparisons = 0
+        node = self.root
+        while node is not NIL:
+            comparisons += 1
+            node_key = node.sort_key
+            if sort_key == node_key:
+                break
+            node = node.left_child if sort_key < node_key else node.right_child
+
+        self.counters['comparisons'] += comparisons
+        return node
+
+    def __counted_search_parent(self, sort_key, source=None):
+        """
+        __search_parent counting the key comparisons.
+
+        """
+        comparisons = 0
+        parent_node = None
+        node = source if source else self.root
+        while node is not NIL:
+            comparisons += 1
+            parent_node = node
+            node = node.left_child if sort_key <= node.sort_key else node.right_child
+
+        self.counters['comparisons'] += comparisons
+        return parent_node
+
+    def __counted_rotation(self, node, right_rotation=False):
+        """
+        __rotation counting the left and right rotations.
+
+        """
+        self.counters['rotations_right' if right_rotation else 'rotations_left'] += 1
+        RedBlackTree.__rotation(self, node, right_rotation)
+
+    def __counted_update_size_tree(self, node, delete=False):
+        """
+        __update_size_tree counting the nodes along the path.
+
+        """
+        step = -1 if delete else 1
+        updates = 0
+        while node:
+            node.size_tree += step
+            node = node.parent
+            updates += 1
+
+        self.counters['size_tree_updates'] += updates
+
+    def get_node(self, key, print_path=False):
+        """
+        Get the node with the given key.
+        Args:
+            key: the key of the node
+            print_path: True for printing the searching path, and vice versa
+
+        Returns:
+            search_node: class NodeRBT
+
+        """
+        if print_path:
+            self.__print_path(key)
+        search_node = self.__search(self.sort_key(key))
+        self.__check_node(search_node)
+
+        return search_node
+
+    def search(self, key, print_path=False):
+        """
+        Search for a certain key. Print the information of the node.
+        Args:
+            key: the key of the node to be searched
+            print_path: True for printing the searching path, and vice versa
+
+        """
+        if print_path:
+            self.__print_path(key)
+        search_node = self.__search(self.sort_key(key))
+        if search_node is NIL:
+            print("Node doesn't exist!")
+        else:
+            print("ID: {}\nValue: {}\nColor: {}".format(search_node.key, search_node.value, search_node.get_color()))
+
+    def select(self, index, source=None):
+        """
+        Select a certain index of node in an ascending order, i.e. return the node with the ith smallest key.
+        Args:
+            index: ith smallest key
+            source: root of the subtree to select from, None for the root of the tree
+
+        Returns:
+            check_node: the result of selection, class NodeRBT
+
+        """
+        if index > self.root.size_tree or index <= 0:
+            raise IndexError("The index is out of range!")
+
+        check_node = source if source else self.root
+        while True:
+            size_left_tree = check_node.left_child.size_tree
+            if size_left_tree == index - 1:
+                return check_node
+            elif size_left_tree >= index:
+                check_node = check_node.left_child
+            else:
+                index -= size_left_tree + 1
+                check_node = check_node.right_child
+
+    def cursor(self, key=None):
+        """
+        Return a cursor at the first node with a key not smaller than the given key.
+        Args:
+            key: the key to seek, None for the smallest node
+
+        Returns:
+            cursor: class Cursor
+
+        """
+        cursor = Cursor(self)
+        if key is None:
+            cursor.next()
+        else:
+            cursor.seek(key)
+
+        return cursor
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Lazily iterate over the nodes with lo <= key < hi (bounds adjustable by inclusive). O(log n + k).
+        Args:
+            lo: lower bound of the keys, None for no lower bound
+            hi: upper bound of the keys, None for no upper bound
+            inclusive: tuple of two booleans, whether lo and hi themselves are included
+            reverse: True for descending order, False for ascending order
+
+        Returns:
+            iterator of NodeRBT, class RedBlackTreeIterator
+
+        """
+        return RedBlackTreeIterator(self, reverse=reverse, lo=None if lo is None else self.sort_key(lo),
+                                    hi=None if hi is None else self.sort_key(hi), inclusive=inclusive)
+
+    def __count_less(self, key, inclusive=False):
+        """
+        Count the keys smaller than the given key with the help of size_tree, without visiting them. O(log n).
+        Args:
+            key: the key to compare with
+            inclusive: True for also counting the keys equal to the given key
+
+        Returns:
+            count: number of keys
+
+        """
+        key = self.sort_key(key)
+        count = 0
+        node = self.root
+        while node is not NIL:
+            if node.sort_key < key or (inclusive and node.sort_key == key):
+                count += node.left_child.size_tree + 1
+                node = node.right_child
+            else:
+                node = node.left_child
+
+        return count
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key. The key doesn't need to exist.
+        If it exists, select(rank(key) + 1) returns its node.
+        Args:
+            key: the key to be ranked
+
+        Returns:
+            rank: number of smaller keys
+
+        """
+        return self.__count_less(key)
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Count the keys with lo <= key < hi (bounds adjustable by inclusive) in O(log n).
+        Args:
+            lo: lower bound of the keys, None for no lower bound
+            hi: upper bound of the keys, None for no upper bound
+            inclusive: tuple of two booleans, whether lo and hi themselves are included
+
+        Returns:
+            count: number of keys inside the range
+
+        """
+        count_hi = self.root.size_tree if hi is None else self.__count_less(hi, inclusive=inclusive[1])
+        count_lo = 0 if lo is None else self.__count_less(lo, inclusive=not inclusive[0])
+
+        return max(count_hi - count_lo, 0)
+
+    def aggregate(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Combine the measures of all nodes with lo <= key < hi (bounds adjustable by inclusive) in ascending order,
+        with the aggregates of the augmentation in O(log n).
+        Args:
+            lo: lower bound of the keys, None for no lower bound
+            hi: upper bound of the keys, None for no upper bound
+            inclusive: tuple of two booleans, whether lo and hi themselves are included
+
+        Returns:
+            aggregate: the identity of the augmentation if no key is inside the range
+
+        """
+        augmentation = self.augmentation
+        if augmentation is None:
+            raise ValueError("The tree has no augmentation!")
+        combine = augmentation.combine
+        lo = None if lo is None else self.sort_key(lo)
+        hi = None if hi is None else self.sort_key(hi)
+
+        def below_lo(key):
+            return lo is not None and (key < lo or (not inclusive[0] and key == lo))
+
+        def above_hi(key):
+            return hi is not None and (key > hi or (not inclusive[1] and key == hi))
+
+        # go down to the highest node inside the range, both bounds split off at it
+        node = self.root
+        while node is not NIL and (below_lo(node.sort_key) or above_hi(node.sort_key)):
+            node = node.right_child if below_lo(node.sort_key) else node.left_child
+        if node is NIL:
+            return augmentation.identity
+        middle = self.__measure(node)
+
+        # left of the split node, every node above lo brings itself and its right subtree
+        suffix = augmentation.identity
+        left = node.left_child
+        while left is not NIL:
+            if below_lo(left.sort_key):
+                left = left.right_child
+            else:
+                piece = self.__measure(left)
+                if left.right_child is not NIL:
+                    piece = combine(piece, left.right_child.aggregate)
+                suffix = combine(piece, suffix)
+                left = left.left_child
+
+        # right of the split node, every node below hi brings its left subtree and itself
+        prefix = augmentation.identity
+        right = node.right_child
+        while right is not NIL:
+            if above_hi(right.sort_key):
+                right = right.left_child
+            else:
+                piece = self.__measure(right)
+                if right.left_child is not NIL:
+                    piece = combine(right.left_child.aggregate, piece)
+                prefix = combine(prefix, piece)
+                right = right.right_child
+
+        return combine(combine(suffix, middle), prefix)
+
+    def percentile(self, p):
+        """
+        Return the node at the pth percentile of the keys by the nearest-rank method, i.e. the smallest key with at
+        least p percent of all keys not larger than it. O(log n).
+        Args:
+            p: percentile between 0 and 100
+
+        Returns:
+            node: class NodeRBT
+
+        """
+        if not 0 <= p <= 100:
+            raise ValueError("The percentile must be between 0 and 100!")
+
+        return self.select(max(int(-(-p * self.root.size_tree // 100)), 1))
+
+    def median(self):
+        """
+        Return the node with the median key, the lower one of the two middle keys for an even size. O(log n).
+
+        """
+        return self.select((self.root.size_tree + 1) // 2)
+
+    def nth_after(self, key, k):
+        """
+        Return the node k positions after a key in ascending order, without iterating. The key doesn't need to
+        exist, k = 1 returns the first node with a larger key and k = 0 the last node with a key not larger. O(log n).
+        Args:
+            key: the key to start from
+            k: number of positions, may be negative for going back
+
+        Returns:
+            node: class NodeRBT
+
+        """
+        return self.select(self.__count_less(key, inclusive=True) + k)
+
+    def select_many(self, indices):
+        """
+        Select the nodes of many indices in one traversal. From the node of one index, it goes up only until the
+        subtree contains the next index and then down to it, i.e. O(k log(n / k)) for k indices instead of
+        O(k log n).
+        Args:
+            indices: ascending list of indices, as in select
+
+        Returns:
+            nodes: list of NodeRBT, in the order of the indices
+
+        """
+        if not indices:
+            return []
+        if any(indices[i] > indices[i + 1] for i in range(len(indices) - 1)):
+            raise ValueError("The indices are not sorted!")
+        if indices[0] <= 0 or indices[-1] > self.root.size_tree:
+            raise IndexError("The index is out of range!")
+
+        nodes = []
+        node, position = self.root, self.root.left_child.size_tree + 1
+        for index in indices:
+            # go up until the subtree of the node contains the index, only needed for the larger indices
+            while index > position + node.right_child.size_tree:
+                parent = node.parent
+                if parent.left_child is node:
+                    position += node.right_child.size_tree + 1
+                else:
+                    position -= node.left_child.size_tree + 1
+                node = parent
+
+            # go down to the index
+            while index != position:
+                if index < position:
+                    node = node.left_child
+                    position -= node.right_child.size_tree + 1
+                else:
+                    node = node.right_child
+                    position += node.left_child.size_tree + 1
+            nodes.append(node)
+
+        return nodes
+
+    def get_predecessor(self, key):
+        """
+        Get the predecessor the of given node.
+        Args:
+            key: the key of the node to be searched
+
+        Returns:
+            pred_node: predecessor of the node, class NodeRBT
+
+        """
+        search_node = self.__search(self.sort_key(key))
+        self.__check_node(search_node)
+
+        # if the node has a left tree
+        if search_node.left_child is not NIL:
+            pred_node = self.__max(search_node.left_child)
+
+        # if the node has no left tree, go up until the node is a right child
+        else:
+            parent_node = search_node.parent
+            while parent_node and search_node is parent_node.left_child:
+                search_node = parent_node
+                parent_node = parent_node.parent
+
+            # if it reaches the root, means there is no predecessor
+            if not parent_node:
+                return NodeRBT(None, None)
+
+            pred_node = parent_node
+
+        return pred_node
+
+    def get_successor(self, key):
+        """
+        Get the successor the of given node.
+        Args:
+            key: the key of the node to be searched
+
+        Returns:
+            succ_node: successor of the node, class NodeRBT
+
+        """
+        search_node = self.__search(self.sort_key(key))
+        self.__check_node(search_node)
+
+        if search_node.right_child is not NIL:
+            succ_node = self.__min(search_node.right_child)
+        else:
+            parent_node = search_node.parent
+            while parent_node and search_node is parent_node.right_child:
+                search_node = parent_node
+                parent_node = parent_node.parent
+
+            # if it reaches the root, means there is no successor
+            if not parent_node:
+                return NodeRBT(None, None)
+
+            succ_node = parent_node
+
+        return succ_node
+
+    def insert(self, key, value, finger=None):
+        """
+        Insert a node with key and value. An existing key is handled by the duplicate policy of the tree.
+        Args:
+            key: key of the node to be inserted
+            value: value of the node to be inserted
+            finger: a node of the tree near the key, the search starts from it instead of the root
+
+        Returns:
+            node: the inserted node, or the existing node of the key for the policies 'overwrite' and 'multimap'
+
+        """
+        return self.__insert_key(key, self.sort_key(key), value, finger)
+
+    def __insert_key(self, key, sort_key, value, finger=None):
+        """
+        Insert a key whose sort key is already derived, see insert.
+
+        """
+        if self.duplicates == 'allow':
+            node = NodeRBT(key, value, color=RED)
+            node.sort_key = sort_key
+            return self.__insert_node(node, finger)
+
+        node = self.__search(sort_key)
+        if node is NIL:
+            node = NodeRBT(key, deque([value]) if self.duplicates == 'multimap' else value, color=RED)
+            node.sort_key = sort_key
+            return self.__insert_node(node, finger)
+        elif self.duplicates == 'reject':
+            raise ValueError("The key {} already exists!".format(key))
+        elif self.duplicates == 'overwrite':
+            node.value = value
+        else:
+            node.value.append(value)
+        if self.augmentation is not None:
+            self.__update_aggregates(node)
+
+        return node
+
+    def __insert_node(self, insert_node, finger=None):
+        """
+        Link a new red node into the tree and restore the red-black properties.
+        Args:
+            insert_node: the node to be inserted, class NodeRBT
+            finger: a node of the tree, the search starts near it
+
+        Returns:
+            insert_node: the inserted node
+
+        """
+        key = insert_node.sort_key
+        parent_node = self.__search_parent(key, self.__finger_source(finger, key) if finger else None)
+
+        return self.__link_node(insert_node, parent_node, parent_node is not None and key <= parent_node.sort_key)
+
+    def __link_node(self, insert_node, parent_node, left, refresh=True):
+        """
+        Link a new red node as a child of a given parent and restore the red-black properties.
+        Args:
+            insert_node: the node to be inserted, class NodeRBT
+            parent_node: parent node of the new node, whose child on that side is NIL, None if the tree is empty
+            left: True for linking the node as left child, False as right child
+            refresh: False for leaving size_tree and the aggregates of the ancestors to a later __refresh
+
+        Returns:
+            insert_node: the inserted node
+
+        """
+        insert_node.left_child = NIL
+        insert_node.right_child = NIL
+        # the rotations of the fixup don't count a new node of size 0, it is counted along its final path below
+        insert_node.size_tree = 0 if refresh else 1
+        if self.augmentation is not None:
+            self.__update_aggregate(insert_node)
+
+        # Case 1: root node
+        # if no parent_node, means the insert node is the root
+        if not parent_node:
+            insert_node.parent = None
+            insert_node.size_tree = 1
+            self.root = insert_node
+            self.root.color = BLACK
+            self.min_node = self.max_node = insert_node
+            return insert_node
+
+        insert_node.parent = parent_node
+        # only a left child of the smallest node (a right child of the largest one) becomes the new extreme
+        if left:
+            parent_node.left_child = insert_node
+            if parent_node is self.min_node:
+                self.min_node = insert_node
+        else:
+            parent_node.right_child = insert_node
+            if parent_node is self.max_node:
+                self.max_node = insert_node
+        if refresh and self.augmentation is not None:
+            self.__update_aggregates(parent_node)
+
+        # Case 2: parent node is BLACK, do nothing
+        # Case 3: parent node is RED, solve the two-red problem
+        if parent_node.color == RED:
+            self.__fix_double_reds(insert_node)
+
+        # update the size of tree
+        if refresh:
+            self.__update_size_tree(insert_node)
+
+        return insert_node
+
+    def __finger_source(self, finger, key):
+        """
+        Go up from the finger node to the lowest subtree that must contain the insertion position of the key.
+        This costs O(log d), d being the distance between the finger and the new key.
+        Args:
+            finger: a node of the tree
+            key: sort key of the key to be inserted
+
+        Returns:
+            source: root of the subtree to start the search from
+
+        """
+        source = finger
+        if key >= finger.sort_key:
+            while source.parent:
+                # the subtree of a left child is bounded by its parent, all keys on its left side are not larger
+                if source is source.parent.left_child and key <= source.parent.sort_key:
+                    break
+                source = source.parent
+        else:
+            while source.parent:
+                # the subtree of a right child is bounded by its parent, all keys on its right side are larger
+                if source is source.parent.right_child and key > source.parent.sort_key:
+                    break
+                source = source.parent
 
-            if parent_node:
-                if key <= parent_node.key:
-                    parent_node.left_child = child
+        return source
+
+    def insert_many(self, items):
+        """
+        Insert a batch of (key, value) pairs as if they were inserted one after another. The batch is sorted first.
+        A large batch is merged with the tree and relinked in O(n + m). Otherwise the tree is searched once for every
+        run of new keys between two neighbouring nodes, and the nodes of a run are linked next to each other without
+        any search. For 'reject', nothing is inserted if any key already exists or repeats in the batch.
+        Args:
+            items: iterable of (key, value) pairs
+
+        """
+        batch = [self.__new_node(key, value, color=RED) for key, value in items]
+        batch.sort(key=SORT_KEY)
+        if self.duplicates != 'allow':
+            # the repeated keys of the batch are merged first, so every key is either new or exists once in the tree
+            batch = self.__merge_duplicates(batch)
+
+        if len(batch) * BATCH_REBUILD_FACTOR >= self.size:
+            self.__link_sorted(self.__merge_existing(batch))
+            return
+
+        sort_keys = [node.sort_key for node in batch]
+        if self.duplicates == 'reject':
+            for start, end, following, parent_node in self.__locate(sort_keys):
+                if following is not NIL and sort_keys[end - 1] == following.sort_key:
+                    raise ValueError("The key {} already exists!".format(batch[end - 1].key))
+
+        changed = []
+        for start, end, following, parent_node in self.__locate(sort_keys):
+            if self.duplicates != 'allow' and following is not NIL and sort_keys[end - 1] == following.sort_key:
+                end -= 1
+                if self.duplicates == 'overwrite':
+                    following.value = batch[end].value
+                else:
+                    following.value.extend(batch[end].value)
+                changed.append(following)
+            self.__insert_run(batch, start, end, following, parent_node)
+        if changed and self.augmentation is not None:
+            self.__refresh(changed)
+
+    def __merge_existing(self, batch):
+        """
+        Merge a batch of new nodes sorted by key with all nodes of the tree in O(n + m), a node of the batch with an
+        existing key is handled by the duplicate policy. Nothing is changed before a key is rejected.
+
+        Returns:
+            nodes: list of all nodes to be linked, sorted by key
+
+        """
+        # the sort finds both sorted runs and merges them in linear time, the existing node comes first
+        nodes = sorted(self.__nodes() + batch, key=SORT_KEY)
+        if self.duplicates == 'allow':
+            return nodes
+
+        if self.duplicates == 'reject':
+            for node, following in zip(nodes, itertools.islice(nodes, 1, None)):
+                if node.sort_key == following.sort_key:
+                    raise ValueError("The key {} already exists!".format(following.key))
+
+        merged = []
+        for node in nodes:
+            if merged and merged[-1].sort_key == node.sort_key:
+                if self.duplicates == 'overwrite':
+                    merged[-1].value = node.value
+                else:
+                    merged[-1].value.extend(node.value)
+            else:
+                merged.append(node)
+
+        return merged
+
+    def __insert_run(self, nodes, start, end, following, parent_node=None):
+        """
+        Insert the new red nodes nodes[start:end], sorted by key, right before a node of the tree. The first one is
+        linked next to that node and every further one next to the previous one, without searching. A long run
+        updates size_tree and the aggregates of its ancestors once.
+        Args:
+            nodes: list of NodeRBT
+            start: index of the first node of the run
+            end: index + 1 of the last node of the run
+            following: the node after the run, NIL for after the largest node
+            parent_node: the parent of the first node if it was just searched, see __locate
+
+        """
+        refresh = end - start < MIN_REFRESH_RUN
+        previous = None
+        for index in range(start, end):
+            # the successor of previous is following, so one of both has a free child on the inner side
+            if previous is not None:
+                if previous.right_child is NIL:
+                    parent_node, left = previous, False
                 else:
-                    parent_node.right_child = child
-                child.parent = parent_node
+                    parent_node, left = self.__min(previous.right_child), True
+            elif parent_node is not None:
+                left = nodes[index].sort_key <= parent_node.sort_key
+            elif following is NIL:
+                parent_node, left = (self.__max(self.root) if self.root is not NIL else None), False
+            elif following.left_child is NIL:
+                parent_node, left = following, True
+            else:
+                parent_node, left = self.__max(following.left_child), False
+            previous = self.__link_node(nodes[index], parent_node, left, refresh)
+
+        if not refresh:
+            self.__refresh(nodes[start:end])
+
+    def __locate(self, sort_keys):
+        """
+        Lazily find where the keys of an ascending batch lie in the tree. The keys are grouped into runs between two
+        neighbouring nodes. The node after the previous run is compared first, so that the keys next to each other
+        in the tree cost O(1) and only the others a search from the root. Between two runs, nodes may be inserted
+        before the following node of the previous run.
+        Args:
+            sort_keys: ascending list of sort keys
+
+        Returns:
+            generator of (start, end, following, parent_node), following is the first node with a key not smaller
+                than sort_keys[start], NIL if there is none, sort_keys[start:end] are all keys not larger than its key,
+                and parent_node is the parent of a new node with the first key, None if the tree wasn't searched
 
-            # if no parent node, means it's the root
+        """
+        start = 0
+        following = NIL
+        size = len(sort_keys)
+        while start < size:
+            sort_key = sort_keys[start]
+            parent_node = None
+            if start:
+                following = self.__successor(following)
+                if following is not NIL and sort_key > following.sort_key:
+                    following, parent_node = self.__first_node(sort_key)
             else:
-                child.parent = None
-                self.root = child
+                following, parent_node = self.__first_node(sort_key)
+            if following is NIL:
+                yield start, size, NIL, parent_node
+                return
+            # most runs of a sparse batch hold a single key
+            if start + 1 == size or sort_keys[start + 1] > following.sort_key:
+                end = start + 1
+            else:
+                end = bisect.bisect_right(sort_keys, following.sort_key, start)
+            yield start, end, following, parent_node
+            start = end
+
+    def update(self, mapping):
+        """
+        Set the values of a batch of keys like dict.update. Every existing node with a given key gets the new value,
+        the missing keys are inserted. A large batch is merged with the list of all nodes in O(n + m). The keys of a
+        small one are located like in insert_many, and the aggregates of the changed nodes are updated once.
+        For 'reject', nothing is changed if any key already exists.
+        Args:
+            mapping: dict or iterable of (key, value) pairs, the last value of a repeated key wins
 
-            if search_node.color == BLACK:
-                if child.color == RED:
-                    child.color = BLACK
+        """
+        pairs = mapping.items() if hasattr(mapping, 'items') else mapping
+        key_function = self.key_function
+        if key_function is None:
+            decorated = sorted(pairs, key=operator.itemgetter(0))
+            sort_keys = [key for key, _ in decorated]
+        else:
+            decorated = sorted(((key_function(key), key, value) for key, value in pairs), key=operator.itemgetter(0))
+            sort_keys = [item[0] for item in decorated]
+        batch = decorated
+        if any(map(operator.eq, sort_keys, itertools.islice(sort_keys, 1, None))):
+            # the sort is stable, the last item of equal keys is the last given one
+            last = [index for index in range(len(sort_keys)) if index + 1 == len(sort_keys) or
+                    sort_keys[index] != sort_keys[index + 1]]
+            batch = [decorated[index] for index in last]
+            sort_keys = [sort_keys[index] for index in last]
+        multimap = self.duplicates == 'multimap'
+        if len(batch) * BATCH_REBUILD_FACTOR >= self.size:
+            self.__update_merged(batch, sort_keys)
+            return
+
+        if self.duplicates == 'reject':
+            for start, end, following, parent_node in self.__locate(sort_keys):
+                if following is not NIL and sort_keys[end - 1] == following.sort_key:
+                    raise ValueError("The key {} already exists!".format(batch[end - 1][-2]))
+
+        changed = []
+        for start, end, following, parent_node in self.__locate(sort_keys):
+            if following is not NIL and sort_keys[end - 1] == following.sort_key:
+                end -= 1
+                value = batch[end][-1]
+                node = following
+                # only the policy 'allow' has several nodes of a key
+                while node is not NIL and node.sort_key == sort_keys[end]:
+                    node.value = deque([value]) if multimap else value
+                    if self.augmentation is not None:
+                        changed.append(node)
+                    node = self.__successor(node) if self.duplicates == 'allow' else NIL
+            if start < end:
+                # the new keys are distinct and missing, whatever the duplicate policy
+                nodes = []
+                for index in range(start, end):
+                    node = NodeRBT(batch[index][-2], deque([batch[index][-1]]) if multimap else batch[index][-1],
+                                   color=RED)
+                    node.sort_key = sort_keys[index]
+                    nodes.append(node)
+                self.__insert_run(nodes, 0, len(nodes), following, parent_node)
+
+        if changed:
+            self.__refresh(changed)
+
+    def __update_merged(self, batch, sort_keys):
+        """
+        Set the values of a large batch by merging it with the list of all nodes in O(n + m), the tree is relinked
+        if any key is missing. Nothing is changed before a key is rejected.
+        Args:
+            batch: list of (key, value) or (sort key, key, value) items with distinct keys, sorted by key
+            sort_keys: list of the sort keys of the batch
+
+        """
+        multimap = self.duplicates == 'multimap'
+        nodes = self.__nodes()
+        found = []
+        found_indices = []
+        missing = []
+        count = len(sort_keys)
+        position = 0
+        for node in nodes:
+            sort_key = node.sort_key
+            while position < count and sort_keys[position] < sort_key:
+                missing.append(position)
+                position += 1
+            if position < count and sort_keys[position] == sort_key:
+                found.append(node)
+                found_indices.append(position)
+                position += 1
+            elif position and sort_keys[position - 1] == sort_key:
+                # only the policy 'allow' has several nodes of a key
+                found.append(node)
+                found_indices.append(position - 1)
+        missing.extend(range(position, count))
+
+        if found and self.duplicates == 'reject':
+            raise ValueError("The key {} already exists!".format(batch[found_indices[0]][-2]))
+
+        for node, index in zip(found, found_indices):
+            node.value = deque([batch[index][-1]]) if multimap else batch[index][-1]
+        if missing:
+            new_nodes = []
+            for index in missing:
+                node = NodeRBT(batch[index][-2], deque([batch[index][-1]]) if multimap else batch[index][-1])
+                node.sort_key = sort_keys[index]
+                new_nodes.append(node)
+            # the sort finds both sorted runs and merges them in linear time
+            self.__link_sorted(sorted(nodes + new_nodes, key=SORT_KEY))
+        elif found and self.augmentation is not None:
+            self.__refresh(found)
+
+    def delete_many(self, keys):
+        """
+        Delete a batch of keys, one node per given key. Nothing is deleted if any key doesn't exist.
+        A large batch is removed by relinking the remaining nodes in O(n + m). The nodes of a small one are located
+        like in insert_many, and runs of neighbouring nodes are deleted with delete_range.
+        Args:
+            keys: iterable of keys, a repeated key deletes that many nodes
+
+        """
+        batch = sorted(map(self.sort_key, keys))
+
+        if len(batch) * BATCH_REBUILD_FACTOR >= self.size:
+            remaining = []
+            deleted = []
+            position = 0
+            for node in self.__nodes():
+                if position < len(batch) and node.sort_key == batch[position]:
+                    position += 1
+                    deleted.append(node)
                 else:
-                    self.__delete_check(child)
-            search_node.reset()
+                    remaining.append(node)
+
+            # the sorted merge stops at the first key that doesn't exist
+            if position < len(batch):
+                raise IndexError("Node doesn't exist!")
+
+            self.__link_sorted(remaining)
+            for node in deleted:
+                node.reset()
+            return
+
+        # all nodes are found before the first one is deleted, deleting keeps the identity of the other nodes.
+        # The nodes of a run of equal keys follow each other, and so do the runs located next to each other,
+        # such neighbouring nodes form a group starting at an index of found.
+        found = []
+        group_starts = []
+        after = None
+        for start, end, following, parent_node in self.__locate(batch):
+            if following is not after:
+                group_starts.append(len(found))
+            node = following
+            for index in range(start, end):
+                if node is NIL or node.sort_key != batch[index]:
+                    raise IndexError("Node doesn't exist!")
+                found.append(node)
+                node = self.__successor(node)
+            after = node
+
+        group_starts.append(len(found))
+        for group_start, group_end in zip(group_starts, itertools.islice(group_starts, 1, None)):
+            if group_end - group_start >= MIN_RANGE_DELETE and self.__is_key_range(found[group_start:group_end]):
+                # the range holds exactly the nodes of the group
+                self.delete_range(found[group_start].key, found[group_end - 1].key, inclusive=(True, True))
+            else:
+                for index in range(group_start, group_end):
+                    self.__delete_node(found[index])
+        for node in found:
+            node.reset()
+
+    def __is_key_range(self, run):
+        """
+        Check that a run of neighbouring nodes holds all nodes of its range of keys, i.e. no node next to it has
+        the same key as its first or last node.
+
+        """
+        before, after = self.__predecessor(run[0]), self.__successor(run[-1])
+        return (before is NIL or before.sort_key < run[0].sort_key) and \
+            (after is NIL or after.sort_key > run[-1].sort_key)
+
+    def __empty_like(self):
+        """
+        Return a new empty tree of the same class, augmentation, duplicate policy and key function.
+
+        """
+        tree = type(self)(augmentation=self.augmentation, duplicates=self.duplicates)
+        tree.key_function = self.key_function
+        return tree
+
+    def __take(self):
+        """
+        Move all nodes into a new tree, this tree becomes empty.
+
+        """
+        tree = self.__empty_like()
+        tree.root, self.root = self.root, NIL
+        tree.min_node, tree.max_node = self.min_node, self.max_node
+        self.min_node = self.max_node = NIL
+
+        return tree
+
+    def __black_height(self, node):
+        """
+        Return the number of black nodes on a path from the node (included) down to a NULL leaf (excluded).
+
+        """
+        black_height = 0
+        while node is not NIL:
+            black_height += node.color == BLACK
+            node = node.left_child
+
+        return black_height
+
+    def __detach(self, node, black_height):
+        """
+        Make a subtree an independent red-black tree, its root becomes black.
+        Args:
+            node: root of the subtree
+            black_height: black height of the subtree
 
-        # Case 3: the node has two children nodes
+        Returns:
+            (node, black_height): the subtree and its new black height
+
+        """
+        if node is not NIL:
+            node.parent = None
+            if node.color == RED:
+                node.color = BLACK
+                black_height += 1
+
+        return node, black_height
+
+    def __join_nodes(self, left, left_black_height, pivot, right, right_black_height):
+        """
+        Join two red-black trees with black roots and a detached pivot node in between, in
+        O(|left_black_height - right_black_height| + 1). The result is stored in self.root.
+        Args:
+            left: root of the left tree, all keys not larger than the pivot key
+            left_black_height: black height of the left tree
+            pivot: the node between both trees, class NodeRBT
+            right: root of the right tree, all keys not smaller than the pivot key
+            right_black_height: black height of the right tree
+
+        Returns:
+            black_height: black height of the joined tree
+
+        """
+        pivot.parent = None
+        pivot.left_child = left
+        pivot.right_child = right
+        self.min_node = self.max_node = None
+
+        # both trees have the same black height, the pivot becomes the black root
+        if left_black_height == right_black_height:
+            pivot.color = BLACK
+            pivot.size_tree = left.size_tree + right.size_tree + 1
+            for child in (left, right):
+                if child is not NIL:
+                    child.parent = pivot
+            if self.augmentation is not None:
+                self.__update_aggregate(pivot)
+            self.root = pivot
+            return left_black_height + 1
+
+        # go down along the inner side of the higher tree to the first black node with the same black height
+        # as the lower tree, the pivot replaces that node and takes it as child
+        join_left = left_black_height > right_black_height
+        self.root, node, black_height = (left, left, left_black_height) if join_left else \
+            (right, right, right_black_height)
+        target_black_height = right_black_height if join_left else left_black_height
+        parent = None
+        while node.color != BLACK or black_height != target_black_height:
+            black_height -= node.color == BLACK
+            parent = node
+            node = node.right_child if join_left else node.left_child
+
+        if join_left:
+            pivot.left_child = node
+            parent.right_child = pivot
+        else:
+            pivot.right_child = node
+            parent.left_child = pivot
+        pivot.parent = parent
+        pivot.color = RED
+        pivot.size_tree = pivot.left_child.size_tree + pivot.right_child.size_tree + 1
+        for child in (pivot.left_child, pivot.right_child):
+            if child is not NIL:
+                child.parent = pivot
+
+        # the ancestors of the pivot gain the lower tree and the pivot
+        added_size = (right if join_left else left).size_tree + 1
+        while parent:
+            parent.size_tree += added_size
+            parent = parent.parent
+        if self.augmentation is not None:
+            self.__update_aggregates(pivot)
+
+        joined_black_height = left_black_height if join_left else right_black_height
+        if pivot.parent.color == RED and self.__fix_double_reds(pivot):
+            joined_black_height += 1
+
+        return joined_black_height
+
+    def split(self, key, left_inclusive=False):
+        """
+        Split the tree into the keys smaller than the given key and the keys not smaller than it, in O(log n).
+        The nodes are moved, this tree becomes empty.
+        Args:
+            key: the key to split at
+            left_inclusive: True for moving the keys equal to the given key to the left tree instead
+
+        Returns:
+            (left_tree, right_tree): class RedBlackTree, keys < key and keys >= key (or <= key and > key)
+
+        """
+        key = self.sort_key(key)
+
+        def goes_right(node):
+            return key < node.sort_key if left_inclusive else key <= node.sort_key
+
+        # record the search path and the black height of each node on it
+        path = []
+        node = self.root
+        black_height = self.__black_height(node)
+        while node is not NIL:
+            path.append((node, black_height))
+            black_height -= node.color == BLACK
+            node = node.left_child if goes_right(node) else node.right_child
+
+        # join the pieces bottom-up, each node on the path is the pivot of its side
+        left, left_black_height = NIL, 0
+        right, right_black_height = NIL, 0
+        for node, black_height in reversed(path):
+            child_black_height = black_height - (node.color == BLACK)
+            if goes_right(node):
+                subtree, subtree_black_height = self.__detach(node.right_child, child_black_height)
+                right_black_height = self.__join_nodes(right, right_black_height, node, subtree,
+                                                       subtree_black_height)
+                right = self.root
+            else:
+                subtree, subtree_black_height = self.__detach(node.left_child, child_black_height)
+                left_black_height = self.__join_nodes(subtree, subtree_black_height, node, left, left_black_height)
+                left = self.root
+
+        left_tree = self.__empty_like()
+        left_tree.root = left
+        right_tree = self.__empty_like()
+        right_tree.root = right
+        self.root = NIL
+        self.min_node = self.max_node = NIL
+
+        return left_tree, right_tree
+
+    @classmethod
+    def join(cls, left, pivot, right):
+        """
+        Join two trees and a pivot pair in between into one tree in O(log n). The nodes are moved,
+        both trees become empty.
+        Args:
+            left: class RedBlackTree, all keys not larger than the pivot key
+            pivot: (key, value) pair of the node between both trees
+            right: class RedBlackTree, all keys not smaller than the pivot key
+
+        Returns:
+            tree: the joined tree, class RedBlackTree
+
+        """
+        key, value = pivot
+        if left.duplicates == 'multimap':
+            value = deque([value])
+        return left.__join_trees(left.__new_node(key, value), right)
+
+    @classmethod
+    def concatenate(cls, left, right):
+        """
+        Concatenate two trees into one tree in O(log n). The nodes are moved, both trees become empty.
+        Args:
+            left: class RedBlackTree, all keys not larger than the keys of the right tree
+            right: class RedBlackTree
+
+        Returns:
+            tree: the concatenated tree, class RedBlackTree
+
+        """
+        if right.size == 0:
+            return left.__take()
+
+        # the smallest node of the right tree becomes the pivot, both trees are checked before it is removed
+        pivot = right.__min(right.root)
+        left_max = left.__max(left.root) if left.size else None
+        if left_max and left_max.sort_key > pivot.sort_key:
+            raise ValueError("The keys of the left tree must not be larger than the keys of the right tree!")
+        if left_max and left.duplicates != 'allow' and left_max.sort_key == pivot.sort_key:
+            raise ValueError("The trees share the key {}, which the duplicate policy forbids!".format(pivot.key))
+        right.__delete_node(pivot)
+
+        return left.__join_trees(pivot, right)
+
+    def __join_trees(self, pivot, right):
+        """
+        Join this tree, a detached pivot node and another tree into a new tree.
+
+        """
+        if self.size and self.__max(self.root).sort_key > pivot.sort_key:
+            raise ValueError("The keys of the left tree must not be larger than the pivot key!")
+        if right.size and right.__min(right.root).sort_key < pivot.sort_key:
+            raise ValueError("The keys of the right tree must not be smaller than the pivot key!")
+        if self.duplicates != 'allow' and ((self.size and self.__max(self.root).sort_key == pivot.sort_key) or
+                                           (right.size and right.__min(right.root).sort_key == pivot.sort_key)):
+            raise ValueError("The trees share the key {}, which the duplicate policy forbids!".format(pivot.key))
+
+        tree = self.__empty_like()
+        tree.__join_nodes(self.root, self.__black_height(self.root), pivot, right.root,
+                          right.__black_height(right.root))
+        self.root = NIL
+        right.root = NIL
+        self.min_node = self.max_node = right.min_node = right.max_node = NIL
+
+        return tree
+
+    def delete_range(self, lo=None, hi=None, inclusive=(True, False)):
+        """
+        Delete all keys with lo <= key < hi (bounds adjustable by inclusive) in O(log n), by splitting and
+        concatenating the tree.
+        Args:
+            lo: lower bound of the keys, None for no lower bound
+            hi: upper bound of the keys, None for no upper bound
+            inclusive: tuple of two booleans, whether lo and hi themselves are deleted
+
+        Returns:
+            removed: the deleted nodes as a new tree, class RedBlackTree
+
+        """
+        left, rest = self.split(lo, not inclusive[0]) if lo is not None else (self.__empty_like(), self.__take())
+        removed, right = rest.split(hi, inclusive[1]) if hi is not None else (rest, self.__empty_like())
+        self.root = self.concatenate(left, right).root
+        self.min_node = self.max_node = None
+
+        return removed
+
+    def delete(self, key):
+        """
+        Delete a node with the given key.
+        Args:
+            key: the key of the node to be deleted
+
+        """
+        search_node = self.__search(self.sort_key(key))
+        self.__check_node(search_node)
+        self.__delete_node(search_node)
+        search_node.reset()
+
+    def delete_node(self, node):
+        """
+        Delete a given node of the tree without searching it, e.g. the node of a cursor.
+        Args:
+            node: a node of this tree, class NodeRBT
+
+        """
+        self.__check_node(node)
+        self.__delete_node(node)
+        node.reset()
+
+    def __find_extremes(self):
+        """
+        Find the nodes with the smallest and largest key again after the whole tree was relinked, O(log n).
+
+        """
+        if self.root is NIL:
+            self.min_node = self.max_node = NIL
+        else:
+            self.min_node = self.__min(self.root)
+            self.max_node = self.__max(self.root)
+
+    def peek_min(self):
+        """
+        Return the node with the smallest key in O(1), from the cached pointer kept by insert and delete.
+        Raises IndexError if the tree is empty.
+
+        """
+        if self.min_node is None:
+            self.__find_extremes()
+        if self.min_node is NIL:
+            raise IndexError("The tree is empty!")
+
+        return self.min_node
+
+    def peek_max(self):
+        """
+        Return the node with the largest key in O(1), from the cached pointer kept by insert and delete.
+        Raises IndexError if the tree is empty.
+
+        """
+        if self.max_node is None:
+            self.__find_extremes()
+        if self.max_node is NIL:
+            raise IndexError("The tree is empty!")
+
+        return self.max_node
+
+    def pop_min(self):
+        """
+        Delete the node with the smallest key without searching it, amortized O(1) rebalancing plus the O(log n)
+        size update. Raises IndexError if the tree is empty.
+
+        Returns:
+            (key, value): the deleted entry, the value is the deque of all values for 'multimap'
+
+        """
+        node = self.peek_min()
+        entry = node.key, node.value
+        self.__delete_node(node)
+        node.reset()
+
+        return entry
+
+    def pop_max(self):
+        """
+        Delete the node with the largest key without searching it, amortized O(1) rebalancing plus the O(log n)
+        size update. Raises IndexError if the tree is empty.
+
+        Returns:
+            (key, value): the deleted entry, the value is the deque of all values for 'multimap'
+
+        """
+        node = self.peek_max()
+        entry = node.key, node.value
+        self.__delete_node(node)
+        node.reset()
+
+        return entry
+
+    def count(self, key):
+        """
+        Return the number of values of a key in O(log n).
+
+        """
+        if self.duplicates == 'multimap':
+            node = self.__search(self.sort_key(key))
+            return 0 if node is NIL else len(node.value)
+
+        return self.count_range(key, key, inclusive=(True, True))
+
+    def equal_range(self, key):
+        """
+        Lazily iterate over the (key, value) pairs of a key in O(log n + k), in insertion order for 'multimap'.
+
+        """
+        if self.duplicates == 'multimap':
+            node = self.__search(self.sort_key(key))
+            values = () if node is NIL else node.value
+            return ((node.key, value) for value in values)
+
+        return ((node.key, node.value) for node in self.range(key, key, inclusive=(True, True)))
+
+    def delete_one(self, key):
+        """
+        Delete one value of a key, the oldest one for 'multimap', whose node is deleted with the last value.
+        Args:
+            key: the key of the value to be deleted
+
+        Returns:
+            value: the deleted value
+
+        """
+        node = self.__search(self.sort_key(key))
+        self.__check_node(node)
+        if self.duplicates == 'multimap' and len(node.value) > 1:
+            value = node.value.popleft()
+            if self.augmentation is not None:
+                self.__update_aggregates(node)
+            return value
+
+        value = node.value.popleft() if self.duplicates == 'multimap' else node.value
+        self.delete_node(node)
+        return value
+
+    def delete_all(self, key):
+        """
+        Delete all values of a key in O(log n), by splitting and concatenating the tree for 'allow'.
+        Args:
+            key: the key to be deleted
+
+        Returns:
+            count: number of deleted values
+
+        """
+        if self.duplicates == 'allow':
+            return self.delete_range(key, key, inclusive=(True, True)).size
+
+        node = self.__search(self.sort_key(key))
+        if node is NIL:
+            return 0
+        count = len(node.value) if self.duplicates == 'multimap' else 1
+        self.delete_node(node)
+        return count
+
+    def __delete_node(self, search_node):
+        """
+        Remove a node of the tree and restore the red-black properties. The node itself is left unchanged.
+        Args:
+            search_node: the node to be deleted, class NodeRBT
+
+        """
+        # the nodes keep their identity below, so the neighbor of a deleted extreme becomes the new extreme
+        if search_node is self.min_node:
+            self.min_node = self.__min(search_node.right_child) if search_node.right_child is not NIL else \
+                search_node.parent or NIL
+        if search_node is self.max_node:
+            self.max_node = self.__max(search_node.left_child) if search_node.left_child is not NIL else \
+                search_node.parent or NIL
+
+        # Case 1 and 2: the node has at most one child node, replace it by the child (maybe NIL)
+        if search_node.left_child is NIL or search_node.right_child is NIL:
+            removed_color = search_node.color
+            child = search_node.left_child if search_node.left_child is not NIL else search_node.right_child
+            parent = search_node.parent
+
+            # update the size of tree
+            self.__update_size_tree(search_node, delete=True)
+            self.__transplant(search_node, child)
+
+        # Case 3: the node has two children nodes, move its predecessor node into its place
         else:
-            # swap predecessor and the node
-            pred = self.get_predecessor(key)
+            pred = self.__max(search_node.left_child)
+            removed_color = pred.color
             child = pred.left_child
-            self.__swap_kv(search_node, pred)
 
             # update the size of tree
             self.__update_size_tree(pred, delete=True)
 
-            # delete the node
-            # if the predecessor is the root of the left tree
-            if pred.parent == search_node:
-                search_node.left_child = child
-                child.parent = search_node
+            # if the predecessor is the root of the left tree, it keeps its left tree
+            if pred.parent is search_node:
+                parent = pred
             else:
-                pred.parent.right_child = child
-                child.parent = pred.parent
-
-            if pred.color == BLACK:
-                self.__delete_check(child)
-
-            pred.reset()
+                parent = pred.parent
+                self.__transplant(pred, child)
+                pred.left_child = search_node.left_child
+                pred.left_child.parent = pred
+
+            self.__transplant(search_node, pred)
+            pred.right_child = search_node.right_child
+            pred.right_child.parent = pred
+            pred.color = search_node.color
+            pred.size_tree = search_node.size_tree
+
+        if self.augmentation is not None:
+            self.__update_aggregates(parent)
+
+        # a removed black node leaves one black missing on the path of its child
+        if removed_color == BLACK:
+            if child.color == RED:
+                child.color = BLACK
+                if self.counters is not None:
+                    self.counters['delete_red_child'] += 1
+                    self.counters['recolorings'] += 1
+            else:
+                self.__delete_check(child, parent)
 
     def str_single_path(self, node, _path_str=""):
         """
         Return the information string of a certain path with the given end node.
         Args:
             node: the end node of the path
-            _path_str: path information of last time, only for recursion
+            _path_str: prefix of the returned string
 
         Returns:
             _path_str: final path information
 
         """
-        while node.parent:
-            _path_str = self.str_single_path(node.parent, _path_str)
-            break
-
-        _path_str += " -> "
-        _path_str += str(node.get_info_in_tuple())
+        path = []
+        while node:
+            path.append(" -> " + str(node.get_info_in_tuple()))
+            node = node.parent
 
-        return _path_str
+        return _path_str + "".join(reversed(path))
 
     def show_paths(self):
         """
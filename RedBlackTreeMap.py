@@ -0,0 +1,144 @@
+#################################################################
+# Author: Yuhan Huang
+# Date: 2019.12.30
+# Github homepage: https://github.com/Krokette29
+#################################################################
+
+from collections.abc import MutableMapping, ItemsView, ValuesView
+from RedBlackTree import RedBlackTree
+
+# marks a missing key, None may be a value
+MISSING = object()
+
+
+class RedBlackTreeItems(ItemsView):
+    def __iter__(self):
+        return iter(self._mapping.tree.items())
+
+    def __reversed__(self):
+        return reversed(self._mapping.tree.items())
+
+
+class RedBlackTreeValues(ValuesView):
+    def __iter__(self):
+        return iter(self._mapping.tree.values())
+
+    def __reversed__(self):
+        return reversed(self._mapping.tree.values())
+
+
+class RedBlackTreeMap(MutableMapping):
+    def __init__(self, items=(), hash_index=False):
+        """
+        Ordered mapping on a RedBlackTree with the duplicate policy 'overwrite', iterating in ascending order of
+        keys. With hash_index, a dict from every key to its node answers the point lookups ([], get, in) in O(1),
+        at the cost of one dict entry per key. The ordered operations always use the tree. Every key is looked up
+        in the index before it reaches the tree, so the tree allows duplicates and an insert never searches for an
+        existing key.
+        Args:
+            items: mapping or iterable of (key, value) pairs
+            hash_index: True for keeping the key -> node dict, and vice versa
+
+        """
+        self.__tree = RedBlackTree(duplicates='allow' if hash_index else 'overwrite')
+        self.index = {} if hash_index else None
+        self.update(items)
+
+    def __str__(self):
+        index_string = " with hash index" if self.index is not None else ""
+        return "<class RedBlackTreeMap of size {}{}>".format(len(self), index_string)
+    __repr__ = __str__
+
+    @property
+    def tree(self):
+        """
+        The underlying RedBlackTree, read-only: changing it directly would bypass the hash index.
+
+        """
+        return self.__tree
+
+    def __len__(self):
+        return len(self.tree)
+
+    def __iter__(self):
+        return iter(self.tree.keys())
+
+    def __reversed__(self):
+        return reversed(self.tree.keys())
+
+    def __contains__(self, key):
+        if self.index is not None:
+            return key in self.index
+        return key in self.tree
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def get(self, key, default=None):
+        """
+        Return the value of the key, or the default if it doesn't exist. O(1) with the hash index.
+
+        """
+        if self.index is not None:
+            node = self.index.get(key)
+            return default if node is None else node.value
+        return self.tree.get(key, default)
+
+    def __setitem__(self, key, value):
+        if self.index is not None:
+            node = self.index.get(key)
+            if node is not None:
+                node.value = value
+            else:
+                self.index[key] = self.__tree.insert(key, value)
+        else:
+            self.__tree.insert(key, value)
+
+    def __delitem__(self, key):
+        if self.index is not None:
+            node = self.index.pop(key, None)
+            if node is None:
+                raise KeyError(key)
+            self.tree.delete_node(node)
+        else:
+            try:
+                self.tree.delete(key)
+            except IndexError:
+                raise KeyError(key) from None
+
+    def clear(self):
+        self.__tree = RedBlackTree(duplicates=self.__tree.duplicates)
+        if self.index is not None:
+            self.index.clear()
+
+    def items(self):
+        return RedBlackTreeItems(self)
+
+    def values(self):
+        return RedBlackTreeValues(self)
+
+    def range(self, lo=None, hi=None, inclusive=(True, False), reverse=False):
+        """
+        Lazily iterate over the (key, value) pairs with lo <= key < hi (bounds adjustable by inclusive).
+
+        """
+        return ((node.key, node.value) for node in self.tree.range(lo, hi, inclusive=inclusive, reverse=reverse))
+
+    def select(self, index):
+        """
+        Return the (key, value) pair with the ith smallest key.
+
+        """
+        node = self.tree.select(index)
+        return node.key, node.value
+
+    def rank(self, key):
+        """
+        Return the number of keys smaller than the given key.
+
+        """
+        return self.tree.rank(key)